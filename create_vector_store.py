@@ -1,36 +1,101 @@
 """
 Vector Store Creation Script
 Populate the vector store with documents from data/raw/
+
+The store is built with DOCUMENT_STORE_BACKEND (chroma or faiss) unless --backend is given. A FAISS store can
+also be migrated from the existing Chroma collection without re-embedding, and rebuilt to
+drop the labels of deleted chunks.
+
+Usage:
+    python create_vector_store.py [--backend chroma|faiss]
+    python create_vector_store.py --backend faiss --from-chroma
+    python create_vector_store.py --backend faiss --rebuild
 """
 
+import argparse
 import os
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
+import numpy as np
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
+from ragchallenge.api.embeddings import create_embeddings
+from ragchallenge.api.chunking import link_chunks, section_id
 from ragchallenge.api.config import settings
+from ragchallenge.api.database import get_backend_options
+from ragchallenge.api.interfaces.database import create_vector_store as open_vector_store
 from pathlib import Path
 
-def create_vector_store():
+VECTORSTORE_PATH = "data/vectorstore"
+
+
+def open_faiss_store(embeddings, reset: bool = False):
+    """Open the default FAISS store, removing its files first if ``reset`` is set; Chroma files are kept."""
+    from ragchallenge.api.interfaces.faissindex import FaissVectorStore
+
+    if reset:
+        for name in (FaissVectorStore.INDEX_FILE, FaissVectorStore.DOCSTORE_FILE):
+            if os.path.exists(os.path.join(VECTORSTORE_PATH, name)):
+                os.remove(os.path.join(VECTORSTORE_PATH, name))
+                print(f"🗑️  Removed existing {name}")
+    options = get_backend_options() if settings.document_store_backend == "faiss" else {}
+    return open_vector_store("faiss", embeddings, VECTORSTORE_PATH, **options)
+
+
+def migrate_chroma_to_faiss(collection_name: str = "documentation", batch_size: int = 1000) -> bool:
+    """Copy the Chroma collection with its stored embeddings into a new FAISS store."""
+    print(f"🚚 Migrating Chroma collection '{collection_name}' to FAISS...")
+    try:
+        embeddings = create_embeddings()
+        collection = open_vector_store("chroma", embeddings, VECTORSTORE_PATH, collection_name)._collection
+        ids, texts, metadatas, vectors = [], [], [], []
+        for offset in range(0, collection.count(), batch_size):
+            batch = collection.get(offset=offset, limit=batch_size, include=["documents", "metadatas", "embeddings"])
+            ids.extend(batch["ids"])
+            texts.extend(batch["documents"])
+            metadatas.extend(metadata or {} for metadata in batch["metadatas"])
+            vectors.append(np.asarray(batch["embeddings"], dtype=np.float32))
+        if not ids:
+            print(f"❌ Chroma collection '{collection_name}' is empty, nothing to migrate")
+            return False
+
+        # One add, so an ivfpq index is trained on the whole collection
+        store = open_faiss_store(embeddings, reset=True)
+        store.add_embeddings(texts, np.concatenate(vectors), metadatas=metadatas, ids=ids)
+        print(f"✅ Migrated {len(store)} chunks to {VECTORSTORE_PATH}")
+        return True
+    except Exception as e:
+        print(f"❌ Error migrating vector store: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def rebuild_faiss_store() -> bool:
+    """Rebuild the FAISS index without the labels of deleted and replaced chunks."""
+    store = open_faiss_store(create_embeddings())
+    dropped = store.rebuild()
+    print(f"✅ FAISS index holds {len(store)} chunks ({dropped} dead labels dropped)")
+    return True
+
+
+def create_vector_store(backend: str = "chroma"):
     """Create and populate vector store from raw documents."""
-    print("🚀 Creating Vector Store...")
+    print(f"🚀 Creating Vector Store ({backend})...")
     
     try:
         # Initialize embeddings
         print("📊 Loading embeddings model...")
-        embeddings = HuggingFaceEmbeddings(
-            model_name=settings.embedding_model,
-            model_kwargs={'device': settings.embedding_model_device}
-        )
+        embeddings = create_embeddings()
         print("✅ Embeddings loaded successfully")
         
-        # Initialize text splitter
+        # Initialize text splitter; in "window" mode chunks do not overlap and are linked to their neighbours
+        link_neighbours = settings.chunking_mode == "window"
         text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
-            chunk_overlap=200,
+            chunk_overlap=0 if link_neighbours else 200,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
@@ -38,6 +103,7 @@ def create_vector_store():
         # Load documents from raw directory
         raw_dir = Path("data/raw")
         documents = []
+        ids = []
         
         for file_path in raw_dir.glob("*.md"):
             print(f"📖 Processing {file_path.name}...")
@@ -50,6 +116,7 @@ def create_vector_store():
             chunks = text_splitter.split_text(content)
             
             # Create documents
+            file_documents = []
             for i, chunk in enumerate(chunks):
                 doc = Document(
                     page_content=chunk,
@@ -59,7 +126,10 @@ def create_vector_store():
                         "total_chunks": len(chunks)
                     }
                 )
-                documents.append(doc)
+                file_documents.append(doc)
+            if link_neighbours:
+                ids.extend(link_chunks(file_documents, section=section_id(file_path.name)))
+            documents.extend(file_documents)
             
             print(f"  ✅ Created {len(chunks)} chunks from {file_path.name}")
         
@@ -67,20 +137,28 @@ def create_vector_store():
         
         # Create vector store
         print("🔧 Creating vector store...")
-        vectorstore_path = "data/vectorstore"
-        
-        # Remove existing vectorstore if it exists
-        import shutil
-        if os.path.exists(vectorstore_path):
-            shutil.rmtree(vectorstore_path)
-            print("🗑️  Removed existing vector store")
+        vectorstore_path = VECTORSTORE_PATH
         
-        # Create new vectorstore
-        vectorstore = Chroma.from_documents(
-            documents=documents,
-            embedding=embeddings,
-            persist_directory=vectorstore_path
-        )
+        if backend == "faiss":
+            # Embed everything before the first add, so an ivfpq index is trained on the whole corpus
+            vectorstore = open_faiss_store(embeddings, reset=True)
+            texts = [doc.page_content for doc in documents]
+            vectorstore.add_embeddings(texts, embeddings.embed_documents(texts),
+                                       metadatas=[doc.metadata for doc in documents], ids=ids or None)
+        else:
+            # Remove existing vectorstore if it exists
+            import shutil
+            if os.path.exists(vectorstore_path):
+                shutil.rmtree(vectorstore_path)
+                print("🗑️  Removed existing vector store")
+            
+            # Create new vectorstore
+            vectorstore = Chroma.from_documents(
+                documents=documents,
+                embedding=embeddings,
+                ids=ids or None,
+                persist_directory=vectorstore_path
+            )
         
         print("✅ Vector store created and populated!")
         
@@ -103,7 +181,23 @@ def create_vector_store():
         return False
 
 if __name__ == "__main__":
-    success = create_vector_store()
+    parser = argparse.ArgumentParser(description="Build the default vector store from data/raw/.")
+    parser.add_argument("--backend", choices=["chroma", "faiss"],
+                        default="faiss" if settings.document_store_backend == "faiss" else "chroma")
+    parser.add_argument("--from-chroma", action="store_true",
+                        help="Migrate the existing Chroma collection to FAISS instead of re-embedding data/raw/")
+    parser.add_argument("--collection", default="documentation", help="Chroma collection to migrate")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the FAISS index without deleted chunks")
+    args = parser.parse_args()
+
+    if (args.from_chroma or args.rebuild) and args.backend != "faiss":
+        parser.error("--from-chroma and --rebuild need --backend faiss")
+    if args.rebuild:
+        success = rebuild_faiss_store()
+    elif args.from_chroma:
+        success = migrate_chroma_to_faiss(args.collection)
+    else:
+        success = create_vector_store(args.backend)
     if success:
         print("\n🎉 Vector store created successfully!")
     else:
@@ -9,13 +9,15 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 import PyPDF2
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from langchain_core.output_parsers import StrOutputParser
 from ragchallenge.api.config import settings
+from ragchallenge.api.embeddings import create_embeddings
+from ragchallenge.api.llm import create_gemini_llm
+from ragchallenge.api.llmcache import cached_model
+from ragchallenge.api.relevance import adaptive_search
 from pathlib import Path
 
 class CVSearchSystem:
@@ -47,19 +49,14 @@ class CVSearchSystem:
         
         # Initialize embeddings
         print("📊 Loading embeddings model...")
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=settings.embedding_model,
-            model_kwargs={'device': settings.embedding_model_device}
-        )
+        self.embeddings = create_embeddings()
         
-        # Initialize Gemini LLM
+        # Initialize Gemini LLM through the gateway shared with the API
         print("🤖 Initializing Gemini LLM...")
-        self.llm = ChatGoogleGenerativeAI(
-            model=settings.chat_model,
-            google_api_key=settings.google_api_key,
+        self.llm = cached_model(create_gemini_llm(
             temperature=0.3,  # Lower temperature for more precise CV responses
             max_output_tokens=1024,
-        )
+        ), "cv")
         
         # Create prompt template for CV queries
         self.prompt_template = ChatPromptTemplate.from_messages([
@@ -164,12 +161,15 @@ CV Context:
             return False
     
     def search_cv(self, query: str, k: int = 5) -> dict:
-        """Search CV content and generate intelligent response."""
+        """Search CV content and generate intelligent response from up to k chunks, fewer when their scores fall off."""
         try:
             print(f"🔍 Searching CV for: '{query}'")
             
-            # Retrieve relevant chunks
-            search_results = self.vectorstore.similarity_search(query, k=k)
+            # Retrieve relevant chunks, cut at the minimum score or the first relevance cliff
+            scored_results = adaptive_search(
+                self.vectorstore, self.embeddings.embed_query(query), max_k=k,
+                min_score=settings.retrieval_min_score, score_cliff=settings.retrieval_score_cliff)
+            search_results = [doc for doc, _ in scored_results]
             
             if not search_results:
                 return {
@@ -194,11 +194,12 @@ CV Context:
             
             # Prepare sources information
             sources = []
-            for doc in search_results:
+            for doc, score in scored_results:
                 sources.append({
                     "content": doc.page_content[:150] + "...",
                     "chunk_id": doc.metadata.get("chunk_id", "N/A"),
-                    "source": doc.metadata.get("source", "CV")
+                    "source": doc.metadata.get("source", "CV"),
+                    "score": round(score, 4)
                 })
             
             return {
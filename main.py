@@ -1,10 +1,12 @@
+import argparse
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 import uvicorn
 from fastapi import FastAPI
-from ragchallenge.api.api import app as api_app
+from ragchallenge.api.api import app as api_app, start_background_tasks
+from ragchallenge.api.config import settings
 
 # Create a main FastAPI app (wrapper) to add root route
 main_app = FastAPI(title="RAG Challenge API")
@@ -12,20 +14,35 @@ main_app = FastAPI(title="RAG Challenge API")
 # Include your existing API routes
 main_app.mount("/", api_app)
 
+# Startup events of mounted apps do not run, so start the warmup from the wrapper
+@main_app.on_event("startup")
+async def warm_up_models():
+    start_background_tasks()
+
 # Optional: Add a friendly root endpoint to prevent 404
 @main_app.get("/")
 def read_root():
     return {
         "message": "✅ RAG Challenge API is running!",
         "docs": "Visit /docs for the interactive API documentation",
-        "health": "Visit /health to check system status"
+        "health": "Visit /health to check system status",
+        "ready": "Visit /ready to check whether models are loaded"
     }
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the RAG Challenge API.")
+    parser.add_argument("--workers", type=int, default=settings.api_workers,
+                        help="Worker processes; more than one loads models once and forks")
+    args = parser.parse_args()
+
     print("🔄 Initializing FastAPI server on http://0.0.0.0:8082 ...")
-    uvicorn.run(
-        main_app,
-        host='0.0.0.0',
-        port=8082,
-        log_level='info'
-    )
+    if args.workers > 1:
+        from ragchallenge.api.prefork import serve
+        serve(main_app, host='0.0.0.0', port=8082, workers=args.workers, log_level='info')
+    else:
+        uvicorn.run(
+            main_app,
+            host='0.0.0.0',
+            port=8082,
+            log_level='info'
+        )
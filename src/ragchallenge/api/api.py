@@ -1,12 +1,14 @@
-from ragchallenge.api.interfaces.database import DocumentStore
-from fastapi import FastAPI
+import importlib
+import os
+import time
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from .config import Settings
-# from .routers import service
-from .routers import qa_service
-from .routers import query_service
-from .routers import question_service
-from .routers import document_router
+from . import metrics
+from .tracing import server_timing, trace
+from .warmup import start_warmup
+from .routers import monitoring
 
 # =================== Settings ===================
 
@@ -42,11 +44,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ---------------------------- Startup -------------------------- #
+
+def start_background_tasks():
+    """
+    Start background work: model warmup in every process; pending deletes, scheduled compaction
+    and tiering only in the one worker that holds the background lock.
+    """
+    start_warmup()
+    if "documents" in settings.enabled_routers:
+        from .compaction import start_compaction_scheduler
+        from .deletion import resume_pending
+        from .stores import claim_background_role
+        from .tiering import start_tiering_scheduler
+        if not claim_background_role():
+            return
+        print(f"🧰 Worker {os.getpid()} runs deletes, compaction and tiering")
+        resume_pending()
+        start_compaction_scheduler()
+        start_tiering_scheduler()
+
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Load models in the background; /ready reports when they are available."""
+    start_background_tasks()
+
+# ---------------------------- Metrics Middleware -------------------------- #
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Track in-flight requests and latency per route template (not per raw path, to bound cardinality)."""
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, path=path, status=str(status))
+
+# ---------------------------- Tracing Middleware -------------------------- #
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Open a root span per request and report its stages in the Server-Timing header."""
+    if not settings.tracing_enabled:
+        return await call_next(request)
+
+    incoming_id = request.headers.get("x-trace-id", "")
+    incoming_id = incoming_id if incoming_id.isalnum() and len(incoming_id) <= 64 else None
+    with trace(f"{request.method} {request.url.path}", trace_id=incoming_id) as root:
+        response = await call_next(request)
+        root.set_attribute("status", response.status_code)
+        root.end = time.perf_counter()
+        response.headers["Server-Timing"] = server_timing(root)
+        response.headers["X-Trace-Id"] = root.trace_id
+    return response
+
 # ---------------------------- Include Routers -------------------------- #
 
+# Optional sub modules, imported only when enabled in settings.enabled_routers
+ROUTERS = {
+    "answer": ("qa_service", "Answer Generation"),
+    "query": ("query_service", "Query Expansion"),
+    "questions": ("question_service", "Hypothetical Question Generation"),
+    "documents": ("document_router", "Document Management"),
+    "admin": ("admin_router", "Administration"),
+}
+
 # Register sub modules
-app.include_router(qa_service.router, tags=["Answer Generation"])
-app.include_router(query_service.router, tags=["Query Expansion"])
-app.include_router(question_service.router, tags=[
-                   "Hypothetical Question Generation"])
-app.include_router(document_router.router, tags=["Document Management"])
+for name in filter(None, (part.strip() for part in settings.enabled_routers.split(","))):
+    if name not in ROUTERS:
+        raise ValueError(f"Unknown router '{name}'. Available: {', '.join(ROUTERS)}")
+    module_name, tag = ROUTERS[name]
+    module = importlib.import_module(f".routers.{module_name}", package=__package__)
+    app.include_router(module.router, tags=[tag])
+app.include_router(monitoring.router, tags=["Monitoring"])
@@ -0,0 +1,378 @@
+"""
+Document Catalog Module
+Keeps a small per-tenant sqlite table describing every uploaded document.
+
+Listing documents used to pull the metadata of every chunk out of Chroma and count sources
+in Python, so its cost grew with the size of the tenant's corpus. The catalog holds one row
+per upload (name, content hash, chunk count, byte size, upload time and the range of chunk
+IDs it was stored under) and is updated on upload and delete, so listing, stats and deletes
+only touch the catalog.
+
+Chunks of catalogued uploads get the IDs ``{upload_id}-{n}`` for n in
+``first_chunk..last_chunk``; stores created before the catalog existed are catalogued once
+from their chunk metadata and keep their original random IDs.
+
+The catalog also holds the tenant's tombstones: metadata filters of deleted chunks that are
+hidden from queries until the deletion worker has removed them from the store, and the
+number of chunks removed since the store was last compacted.
+"""
+
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+from typing import List, Optional
+
+from ragchallenge.api.stores import _index_directory, open_tenant_chroma, tenant_cleared, tenant_exists
+
+CATALOG_FILE = "catalog.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    upload_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    sha256 TEXT,
+    chunks INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    uploaded_at REAL NOT NULL,
+    document_type TEXT NOT NULL,
+    first_chunk INTEGER,
+    last_chunk INTEGER,
+    id_scheme TEXT NOT NULL DEFAULT 'range'
+);
+CREATE INDEX IF NOT EXISTS documents_name ON documents (name);
+CREATE TABLE IF NOT EXISTS tombstones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    filters TEXT NOT NULL,
+    chunk_ids TEXT,
+    purge_where TEXT,
+    chunks INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Tombstones per tenant, reloaded when the catalog file changes (it is read on every search)
+_TOMBSTONE_CACHE = {}
+
+
+def catalog_path(user_id: str, storage: Optional[str] = None) -> Path:
+    """Location of a tenant's catalog, next to its flat snapshot."""
+    return _index_directory(user_id, storage) / CATALOG_FILE
+
+
+def new_upload_id() -> str:
+    return uuid.uuid4().hex
+
+
+def chunk_ids(upload_id: str, count: int, first_chunk: int = 0) -> List[str]:
+    """Chunk IDs of an upload stored with the range scheme."""
+    return [f"{upload_id}-{index}" for index in range(first_chunk, first_chunk + count)]
+
+
+def _connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(str(path), timeout=30)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def summarize_chunks(documents: dict, ids: List[str], metadatas: List[dict], texts: List[str],
+                     skip_upload: Optional[str] = None) -> dict:
+    """Add chunks to per-source totals (chunk count, bytes, chunk_id range) for cataloguing by source."""
+    for chunk_id, metadata, text in zip(ids, metadatas or [], texts or []):
+        source = (metadata or {}).get("source")
+        if source is None or (skip_upload and chunk_id.startswith(f"{skip_upload}-")):
+            continue
+        entry = documents.setdefault(source, {"chunks": 0, "bytes": 0, "chunk_ids": [],
+                                              "document_type": metadata.get("document_type", "unknown")})
+        entry["chunks"] += 1
+        entry["bytes"] += len((text or "").encode("utf-8"))
+        if isinstance(metadata.get("chunk_id"), int):
+            entry["chunk_ids"].append(metadata["chunk_id"])
+    return documents
+
+
+def source_rows(documents: dict) -> List[dict]:
+    """Catalog rows with the 'source' ID scheme for totals from ``summarize_chunks``."""
+    now = time.time()
+    return [{"upload_id": new_upload_id(), "name": name, "sha256": None, "chunks": entry["chunks"],
+             "bytes": entry["bytes"], "uploaded_at": now, "document_type": entry["document_type"],
+             "first_chunk": min(entry["chunk_ids"], default=None), "last_chunk": max(entry["chunk_ids"], default=None),
+             "id_scheme": "source"}
+            for name, entry in documents.items()]
+
+
+def _insert_rows(connection: sqlite3.Connection, rows: List[dict]) -> None:
+    connection.executemany(
+        "INSERT OR REPLACE INTO documents (upload_id, name, sha256, chunks, bytes, uploaded_at, document_type, "
+        "first_chunk, last_chunk, id_scheme) VALUES (:upload_id, :name, :sha256, :chunks, :bytes, :uploaded_at, "
+        ":document_type, :first_chunk, :last_chunk, :id_scheme)",
+        rows,
+    )
+    connection.commit()
+
+
+def _backfill(connection: sqlite3.Connection, user_id: str, skip_upload: Optional[str] = None) -> None:
+    """Catalog a store that was created before the catalog, once, from its chunk metadata."""
+    store = open_tenant_chroma(user_id, None)
+    if store is None:
+        return
+    results = store._collection.get(include=["metadatas", "documents"])
+
+    documents = summarize_chunks({}, results["ids"], results.get("metadatas"), results.get("documents"), skip_upload)
+    _insert_rows(connection, source_rows(documents))
+    if documents:
+        print(f"📒 Catalogued {len(documents)} existing documents for {user_id}")
+
+
+def open_catalog(user_id: str, create: bool = False,
+                 skip_upload: Optional[str] = None) -> Optional[sqlite3.Connection]:
+    """
+    Open a tenant's catalog, cataloguing an existing store on first use.
+
+    :param user_id: The tenant.
+    :param create: Create an empty catalog if the tenant has no store yet.
+    :param skip_upload: Upload whose chunks are already stored but catalogued by the caller.
+    :return: A sqlite connection, or None if the tenant has neither a catalog nor a store.
+    """
+    path = catalog_path(user_id)
+    if tenant_cleared(user_id):
+        return None
+    if path.exists():
+        return _connect(path)
+    if not tenant_exists(user_id):
+        return _connect(path) if create else None
+
+    connection = _connect(path)
+    _backfill(connection, user_id, skip_upload)
+    return connection
+
+
+def record_upload(user_id: str, upload_id: str, name: str, sha256: str, chunks: int, size: int,
+                  document_type: str = "uploaded_document") -> None:
+    """Add the catalog row of an upload whose chunks were stored as ``chunk_ids(upload_id, chunks)``."""
+    with closing(open_catalog(user_id, create=True, skip_upload=upload_id)) as connection:
+        connection.execute(
+            "INSERT INTO documents (upload_id, name, sha256, chunks, bytes, uploaded_at, document_type, "
+            "first_chunk, last_chunk) VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)",
+            (upload_id, name, sha256, chunks, size, time.time(), document_type, chunks - 1),
+        )
+        connection.commit()
+
+
+def list_documents(user_id: str, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+    """
+    One page of a tenant's documents ordered by name; repeated uploads of a name are merged.
+
+    :param user_id: The tenant.
+    :param limit: Maximum number of documents to return, all if None.
+    :param offset: Number of documents to skip.
+    """
+    connection = open_catalog(user_id)
+    if connection is None:
+        return []
+    with closing(connection):
+        rows = connection.execute(
+            "SELECT name, SUM(chunks) AS chunks, SUM(bytes) AS bytes, MAX(uploaded_at) AS uploaded_at, "
+            "COUNT(*) AS uploads, MAX(document_type) AS document_type FROM documents "
+            "GROUP BY name ORDER BY name LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        ).fetchall()
+        documents = []
+        for row in rows:
+            document = dict(row)
+            latest = connection.execute(
+                "SELECT sha256, upload_id, first_chunk, last_chunk FROM documents WHERE name = ? "
+                "ORDER BY uploaded_at DESC LIMIT 1", (row["name"],)).fetchone()
+            document.update(dict(latest))
+            documents.append(document)
+        return documents
+
+
+def export_documents(user_id: str) -> List[dict]:
+    """All catalog rows of a tenant, for snapshots."""
+    connection = open_catalog(user_id)
+    if connection is None:
+        return []
+    with closing(connection):
+        return [dict(row) for row in connection.execute("SELECT * FROM documents ORDER BY uploaded_at, upload_id")]
+
+
+def import_documents(user_id: str, rows: List[dict]) -> None:
+    """Add catalog rows of imported chunks; rows with an upload ID that is already catalogued are replaced."""
+    with closing(open_catalog(user_id, create=True)) as connection:
+        _insert_rows(connection, rows)
+
+
+def catalog_stats(user_id: str) -> dict:
+    """Document and chunk totals of a tenant."""
+    connection = open_catalog(user_id)
+    if connection is None:
+        return {"total_documents": 0, "total_chunks": 0, "total_bytes": 0}
+    with closing(connection):
+        row = connection.execute(
+            "SELECT COUNT(DISTINCT name), COALESCE(SUM(chunks), 0), COALESCE(SUM(bytes), 0) FROM documents").fetchone()
+        return {"total_documents": row[0], "total_chunks": row[1], "total_bytes": row[2]}
+
+
+# ---------------------------- Tombstones --------------------------- #
+
+def tombstone_uploads(user_id: str, names: List[str]) -> dict:
+    """
+    Remove documents from the catalog and tombstone their chunks, in one transaction.
+
+    :param user_id: The tenant.
+    :param names: Document names to delete; all uploads of each name are deleted.
+    :return: The deleted names, the names that were not found and the number of chunks.
+    """
+    connection = open_catalog(user_id)
+    if connection is None:
+        return {"deleted": [], "not_found": list(names), "chunks": 0}
+
+    with closing(connection):
+        placeholders = ", ".join("?" * len(names))
+        uploads = [dict(row) for row in connection.execute(
+            f"SELECT * FROM documents WHERE name IN ({placeholders})", list(names))]
+        deleted = sorted({upload["name"] for upload in uploads})
+        if not uploads:
+            return {"deleted": [], "not_found": list(names), "chunks": 0}
+
+        # Uploads wait for pending deletes, so hiding by name cannot hide newer chunks;
+        # catalogued uploads are removed by their ID range, older ones are looked up by name
+        filters = [{"source": {"$in": deleted}}]
+        ids = []
+        legacy_names = set()
+        for upload in uploads:
+            if upload["id_scheme"] == "range":
+                ids.extend(chunk_ids(upload["upload_id"], upload["chunks"], upload["first_chunk"]))
+            else:
+                legacy_names.add(upload["name"])
+
+        purge_where = {"source": {"$in": sorted(legacy_names)}} if legacy_names else None
+        chunks = sum(upload["chunks"] for upload in uploads)
+        with connection:
+            connection.execute(
+                "INSERT INTO tombstones (kind, filters, chunk_ids, purge_where, chunks, created_at) "
+                "VALUES ('documents', ?, ?, ?, ?, ?)",
+                (json.dumps(filters), json.dumps(ids), json.dumps(purge_where) if purge_where else None,
+                 chunks, time.time()),
+            )
+            connection.executemany("DELETE FROM documents WHERE upload_id = ?",
+                                   [(upload["upload_id"],) for upload in uploads])
+        return {"deleted": deleted, "not_found": sorted(set(names) - set(deleted)), "chunks": chunks}
+
+
+def tombstone_filter(user_id: str, where: dict) -> None:
+    """Tombstone every chunk whose metadata matches a flat filter; the catalog is updated on purge."""
+    with closing(open_catalog(user_id, create=True)) as connection, connection:
+        connection.execute(
+            "INSERT INTO tombstones (kind, filters, chunk_ids, purge_where, chunks, created_at) "
+            "VALUES ('filter', ?, NULL, ?, NULL, ?)",
+            (json.dumps([where]), json.dumps(where), time.time()),
+        )
+
+
+def list_tombstones(user_id: str) -> List[dict]:
+    """All tombstones of a tenant with their JSON fields decoded."""
+    path = catalog_path(user_id)
+    if not path.exists():
+        return []
+    with closing(_connect(path)) as connection:
+        tombstones = []
+        for row in connection.execute("SELECT * FROM tombstones ORDER BY id"):
+            tombstone = dict(row)
+            for key in ("filters", "chunk_ids", "purge_where"):
+                tombstone[key] = json.loads(tombstone[key]) if tombstone[key] else None
+            tombstones.append(tombstone)
+        return tombstones
+
+
+def active_tombstones(user_id: str) -> List[dict]:
+    """Tombstones of a tenant, cached until its catalog file changes."""
+    try:
+        stat = catalog_path(user_id).stat()
+    except OSError:
+        return []
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _TOMBSTONE_CACHE.get(user_id)
+    if cached and cached[0] == signature:
+        return cached[1]
+    tombstones = list_tombstones(user_id)
+    _TOMBSTONE_CACHE[user_id] = (signature, tombstones)
+    return tombstones
+
+
+def remove_tombstone(user_id: str, tombstone_id: int) -> None:
+    path = catalog_path(user_id)
+    if not path.exists():
+        return
+    with closing(_connect(path)) as connection, connection:
+        connection.execute("DELETE FROM tombstones WHERE id = ?", (tombstone_id,))
+
+
+def subtract_chunks(user_id: str, removed: dict) -> None:
+    """
+    Update the catalog after a filter delete removed chunks of some documents.
+
+    :param user_id: The tenant.
+    :param removed: Number of removed chunks per document name.
+    """
+    path = catalog_path(user_id)
+    if not path.exists() or not removed:
+        return
+    with closing(_connect(path)) as connection, connection:
+        for name, count in removed.items():
+            row = connection.execute(
+                "SELECT SUM(chunks), SUM(bytes), MAX(document_type) FROM documents WHERE name = ?", (name,)).fetchone()
+            if not row[0]:
+                continue
+            connection.execute("DELETE FROM documents WHERE name = ?", (name,))
+            remaining = row[0] - count
+            if remaining > 0:
+                # Part of the document is left; keep one row located by name from now on
+                connection.execute(
+                    "INSERT INTO documents (upload_id, name, sha256, chunks, bytes, uploaded_at, document_type, "
+                    "first_chunk, last_chunk, id_scheme) VALUES (?, ?, NULL, ?, ?, ?, ?, NULL, NULL, 'source')",
+                    (new_upload_id(), name, remaining, row[1] * remaining // row[0], time.time(), row[2]),
+                )
+
+
+# ---------------------------- Counters --------------------------- #
+
+def add_deleted_chunks(user_id: str, count: int) -> None:
+    """Count chunks removed from the store since its last compaction."""
+    path = catalog_path(user_id)
+    if not path.exists() or not count:
+        return
+    with closing(_connect(path)) as connection, connection:
+        connection.execute(
+            "INSERT INTO counters (name, value) VALUES ('deleted_since_compaction', ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (count,))
+
+
+def deleted_chunks(user_id: str) -> int:
+    path = catalog_path(user_id)
+    if not path.exists():
+        return 0
+    with closing(_connect(path)) as connection:
+        row = connection.execute("SELECT value FROM counters WHERE name = 'deleted_since_compaction'").fetchone()
+        return row[0] if row else 0
+
+
+def reset_deleted_chunks(user_id: str, path: Optional[Path] = None) -> None:
+    """Reset the deleted-chunk counter after compaction and shrink the catalog file."""
+    path = path or catalog_path(user_id)
+    if not path.exists():
+        return
+    with closing(_connect(path)) as connection:
+        with connection:
+            connection.execute("DELETE FROM counters WHERE name = 'deleted_since_compaction'")
+        connection.execute("VACUUM")
@@ -0,0 +1,114 @@
+"""
+Chunking Module
+Overlap-free chunks that know their neighbours, widened back into windows at query time.
+
+Overlapping chunks (e.g. 256 tokens with an overlap of 192) embed and store most text several
+times, only so that a hit carries some of the text around it. In the "window" chunking mode
+chunks do not overlap. Each one records its section (``section_id``: an upload, or a header
+section of a knowledge base document) and its position in that section (``chunk_index``), and
+its ID is derived from both. When a chunk is retrieved, the ``neighbour_window`` chunks before
+and after it are fetched by ID and joined with it, so the prompt sees the surrounding text
+while only one embedding per chunk is computed and stored.
+
+Chunks without these keys (stores built in the "overlap" mode) are returned unchanged.
+"""
+
+import hashlib
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+CHUNKING_MODES = ("overlap", "window")
+SECTION_KEY = "section_id"
+INDEX_KEY = "chunk_index"
+
+
+# ---------------------------- Linking --------------------------- #
+
+def section_id(*parts) -> str:
+    """Stable ID of a section, derived from e.g. its source and position."""
+    return hashlib.sha1("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_id(section: str, index: int) -> str:
+    """ID of the chunk at a position in a section; uploads use the same ``{upload_id}-{n}`` form."""
+    return f"{section}-{index}"
+
+
+def link_chunks(documents: List[Document], section: Optional[str] = None) -> List[str]:
+    """
+    Number chunks within their sections and return their IDs.
+
+    :param documents: Chunks in text order; their metadata is updated in place.
+    :param section: Section of the chunks that do not carry a ``section_id`` yet.
+    :return: The chunk IDs, parallel to ``documents``.
+    """
+    positions = defaultdict(int)
+    ids = []
+    for document in documents:
+        section_key = document.metadata.get(SECTION_KEY) or section
+        if section_key is None:
+            raise ValueError("Every chunk needs a section to be linked to its neighbours")
+        index = positions[section_key]
+        positions[section_key] += 1
+        document.metadata[SECTION_KEY] = section_key
+        document.metadata[INDEX_KEY] = index
+        ids.append(chunk_id(section_key, index))
+    return ids
+
+
+def chunk_position(document: Document) -> Optional[Tuple[str, int]]:
+    """Section and position of a linked chunk, or None for chunks without neighbour links."""
+    metadata = document.metadata or {}
+    section, index = metadata.get(SECTION_KEY), metadata.get(INDEX_KEY)
+    if section is None or not isinstance(index, int) or isinstance(index, bool):
+        return None
+    return section, index
+
+
+# ---------------------------- Neighbour Expansion --------------------------- #
+
+def expand_neighbours(store, documents: Iterable[Document], window: int) -> List[Document]:
+    """
+    Widen retrieved chunks by the ``window`` chunks before and after each one.
+
+    Neighbours are fetched with one ``get_by_ids`` call. Text that an earlier hit already
+    brought in is not repeated, so a hit inside an earlier window is dropped.
+
+    :param store: The vector store the chunks were retrieved from.
+    :param documents: Retrieved chunks, best first.
+    :param window: Neighbours added on each side; 0 returns the chunks unchanged.
+    :return: One document per remaining hit with the joined text of its window.
+    """
+    documents = list(documents)
+    positions = [chunk_position(document) for document in documents]
+    if window <= 0 or not any(positions):
+        return documents
+
+    wanted = sorted({chunk_id(section, neighbour) for section, index in filter(None, positions)
+                     for neighbour in range(max(0, index - window), index + window + 1)
+                     if neighbour != index})
+    try:
+        neighbours = {chunk_position(document): document for document in store.get_by_ids(wanted)}
+    except NotImplementedError:
+        print(f"⚠️  {type(store).__name__} cannot fetch chunks by ID, neighbour windows are skipped")
+        return documents
+
+    expanded, covered = [], set()
+    for document, position in zip(documents, positions):
+        if position is None:
+            expanded.append(document)
+            continue
+        if position in covered:
+            continue
+        section, index = position
+        parts = []
+        for neighbour in range(max(0, index - window), index + window + 1):
+            key = (section, neighbour)
+            chunk = document if neighbour == index else neighbours.get(key)
+            if chunk is not None and key not in covered:
+                covered.add(key)
+                parts.append(chunk.page_content)
+        expanded.append(Document(page_content="\n".join(parts), metadata=dict(document.metadata), id=document.id))
+    return expanded
@@ -0,0 +1,344 @@
+"""
+Compaction Module
+Rebuilds fragmented tenant stores and shrinks their sqlite files.
+
+Chroma only marks deleted vectors in the HNSW graph, and sqlite keeps freed pages in the
+file, so stores that see many upload/delete cycles get slower to search and never shrink.
+A tenant is compacted when the chunks deleted since its last compaction reach
+``compaction_deleted_ratio`` of the live ones, or when its sqlite file has more than
+``compaction_free_page_ratio`` free pages:
+
+- live chunks are copied, embeddings included, into a fresh store next to the old one
+  (a new directory, or a new collection on the same shard client);
+- the fresh store is swapped in while no search uses the tenant, and only if no write
+  happened meanwhile, so a failed or raced compaction leaves the old store untouched;
+- shard files shared by several tenants are vacuumed.
+
+Deletes put tenants on a candidate list; a scheduler thread checks them every
+``compaction_interval_seconds`` and the admin router runs compaction on demand. A lock file
+makes sure only one process compacts at a time.
+
+Usage:
+    python -m ragchallenge.api.compaction --user-id <user_id> [--force]
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+from ragchallenge.api import catalog
+from ragchallenge.api.config import settings
+from ragchallenge.api.stores import (
+    DIRECTORY_COLLECTION, _source_signature, exclusive, get_tenant_client, invalidate_user_vectorstore,
+    mark_tenant_changed, open_tenant_chroma, release_chroma_system, tenant_collection_name, tenant_exists,
+    tenant_shard, tenant_shard_path, tenant_write_lock, user_vectorstore_path)
+
+COPY_BATCH_SIZE = 1000
+SQLITE_FILE = "chroma.sqlite3"
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def _compaction_root() -> Path:
+    return Path(settings.tenant_store_root) / "compaction"
+
+
+def _candidate_path(user_id: str) -> Path:
+    return _compaction_root() / "candidates" / f"{tenant_collection_name(user_id)}.json"
+
+
+def mark_candidate(user_id: str) -> None:
+    """Put a tenant on the list the scheduler checks for fragmentation."""
+    path = _candidate_path(user_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"user_id": user_id}), encoding="utf-8")
+
+
+def candidates() -> List[str]:
+    directory = _compaction_root() / "candidates"
+    if not directory.exists():
+        return []
+    user_ids = []
+    for path in directory.glob("*.json"):
+        try:
+            user_ids.append(json.loads(path.read_text(encoding="utf-8"))["user_id"])
+        except (OSError, ValueError, KeyError):
+            continue
+    return sorted(user_ids)
+
+
+def _remove_candidate(user_id: str) -> None:
+    try:
+        os.remove(_candidate_path(user_id))
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def _process_lock():
+    """Lock file held while compacting, so only one process (worker) compacts at a time."""
+    path = _compaction_root() / "compaction.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as file:
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise RuntimeError("Compaction is already running in another process")
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+
+# ---------------------------- Fragmentation --------------------------- #
+
+def sqlite_free_ratio(path: Path) -> float:
+    """Share of pages in a sqlite file that are free (reclaimed only by VACUUM)."""
+    if not path.exists():
+        return 0.0
+    with closing(sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)) as connection:
+        pages = connection.execute("PRAGMA page_count").fetchone()[0]
+        free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+    return free / pages if pages else 0.0
+
+
+def _directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file()) if path.exists() else 0
+
+
+def _sqlite_path(user_id: str) -> Path:
+    if settings.tenant_storage == "collection":
+        return tenant_shard_path(tenant_shard(user_id)) / SQLITE_FILE
+    return user_vectorstore_path(user_id) / SQLITE_FILE
+
+
+def _source_collection(user_id: str):
+    """The tenant's Chroma collection itself, not its flat snapshot."""
+    return open_tenant_chroma(user_id, None)._collection
+
+
+def fragmentation(user_id: str) -> dict:
+    """
+    Measure how fragmented a tenant's store is and whether it should be compacted.
+
+    :param user_id: The tenant.
+    :return: Live and deleted chunk counts, file sizes and the reasons to compact, if any.
+    """
+    if not tenant_exists(user_id):
+        return {"user_id": user_id, "exists": False, "needs_compaction": False, "reasons": []}
+
+    live = _source_collection(user_id).count()
+    deleted = catalog.deleted_chunks(user_id)
+    sqlite_path = _sqlite_path(user_id)
+    report = {
+        "user_id": user_id,
+        "exists": True,
+        "live_chunks": live,
+        "deleted_chunks": deleted,
+        "deleted_ratio": round(deleted / max(live, 1), 3),
+        "sqlite_bytes": sqlite_path.stat().st_size if sqlite_path.exists() else 0,
+        "sqlite_free_ratio": round(sqlite_free_ratio(sqlite_path), 3),
+    }
+    if settings.tenant_storage == "directory":
+        report["store_bytes"] = _directory_size(user_vectorstore_path(user_id))
+
+    reasons = []
+    if deleted >= settings.compaction_min_deleted and report["deleted_ratio"] >= settings.compaction_deleted_ratio:
+        reasons.append("deleted_ratio")
+    if report["sqlite_free_ratio"] >= settings.compaction_free_page_ratio:
+        reasons.append("sqlite_free_pages")
+    report["reasons"] = reasons
+    report["needs_compaction"] = bool(reasons)
+    return report
+
+
+# ---------------------------- Rebuild --------------------------- #
+
+def _copy_collection(source, target) -> int:
+    count = source.count()
+    for offset in range(0, count, COPY_BATCH_SIZE):
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=COPY_BATCH_SIZE, offset=offset)
+        if batch["ids"]:
+            target.add(ids=batch["ids"], embeddings=batch["embeddings"],
+                       documents=batch["documents"], metadatas=batch["metadatas"])
+    return count
+
+
+def _rebuild_directory(user_id: str) -> dict:
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    directory = user_vectorstore_path(user_id)
+    source = _source_collection(user_id)
+    signature = _source_signature(user_id)
+
+    build = _compaction_root() / f"build-{uuid.uuid4().hex}"
+    client = chromadb.PersistentClient(path=str(build), settings=ChromaSettings(anonymized_telemetry=False))
+    try:
+        target = client.create_collection(DIRECTORY_COLLECTION, metadata=source.metadata)
+        copied = _copy_collection(source, target)
+        if target.count() != source.count():
+            raise RuntimeError(f"Copied {target.count()} of {source.count()} chunks")
+    except Exception:
+        client.close()
+        shutil.rmtree(build, ignore_errors=True)
+        raise
+    client.close()
+
+    with exclusive(user_id, settings.deletion_drain_timeout):
+        if _source_signature(user_id) != signature:
+            shutil.rmtree(build, ignore_errors=True)
+            raise RuntimeError("Store changed during compaction, will retry")
+
+        # The catalog lives in the tenant directory; carry it over (flat snapshots are rebuilt)
+        if catalog.catalog_path(user_id).exists():
+            shutil.copy2(catalog.catalog_path(user_id), build / catalog.CATALOG_FILE)
+            catalog.reset_deleted_chunks(user_id, build / catalog.CATALOG_FILE)
+
+        invalidate_user_vectorstore(user_id)
+        release_chroma_system(directory)
+        trash = _compaction_root() / f"trash-{uuid.uuid4().hex}"
+        os.replace(directory, trash)
+        os.replace(build, directory)
+        invalidate_user_vectorstore(user_id)
+
+    shutil.rmtree(trash, ignore_errors=True)
+    return {"copied_chunks": copied, "store_bytes": _directory_size(directory)}
+
+
+def _rebuild_collection(user_id: str) -> dict:
+    client = get_tenant_client(tenant_shard(user_id))
+    name = tenant_collection_name(user_id)
+    source = client.get_collection(name)
+    signature = _source_signature(user_id)
+
+    temporary = f"compact-{uuid.uuid4().hex[:24]}"
+    target = client.create_collection(temporary, metadata=source.metadata)
+    try:
+        copied = _copy_collection(source, target)
+        if target.count() != source.count():
+            raise RuntimeError(f"Copied {target.count()} of {source.count()} chunks")
+
+        with exclusive(user_id, settings.deletion_drain_timeout):
+            if _source_signature(user_id) != signature:
+                raise RuntimeError("Store changed during compaction, will retry")
+            invalidate_user_vectorstore(user_id)
+            client.delete_collection(name)
+            target.modify(name=name)
+            mark_tenant_changed(user_id)
+    except Exception:
+        try:
+            client.delete_collection(temporary)
+        except Exception:
+            pass
+        raise
+
+    catalog.reset_deleted_chunks(user_id)
+    return {"copied_chunks": copied}
+
+
+def vacuum_shard(shard: int) -> dict:
+    """VACUUM a shard's sqlite file; skipped if another connection is busy with it."""
+    path = tenant_shard_path(shard) / SQLITE_FILE
+    before = path.stat().st_size if path.exists() else 0
+    try:
+        with closing(sqlite3.connect(str(path), timeout=5)) as connection:
+            connection.execute("VACUUM")
+    except sqlite3.OperationalError as e:
+        return {"shard": shard, "vacuumed": False, "error": str(e)}
+    return {"shard": shard, "vacuumed": True, "bytes_before": before, "bytes_after": path.stat().st_size}
+
+
+def compact_tenant(user_id: str, force: bool = False) -> dict:
+    """
+    Compact one tenant if it is fragmented (or always with ``force``).
+
+    :param user_id: The tenant.
+    :param force: Rebuild even if the store is below the fragmentation thresholds.
+    :return: The fragmentation report before compaction and what was done.
+    """
+    report = fragmentation(user_id)
+    if not report["exists"]:
+        _remove_candidate(user_id)
+        return report
+    if not report["needs_compaction"] and not force:
+        _remove_candidate(user_id)
+        return {**report, "compacted": False}
+
+    start = time.perf_counter()
+    with _process_lock(), tenant_write_lock(user_id):
+        if settings.tenant_storage == "collection":
+            result = {}
+            if force or "deleted_ratio" in report["reasons"]:
+                result = _rebuild_collection(user_id)
+            if force or "sqlite_free_pages" in report["reasons"]:
+                result["vacuum"] = vacuum_shard(tenant_shard(user_id))
+        else:
+            result = _rebuild_directory(user_id)
+
+    _remove_candidate(user_id)
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    print(f"🧹 Compacted store of {user_id} in {result['seconds']:.2f}s ({', '.join(report['reasons']) or 'forced'})")
+    return {**report, "compacted": True, "result": result}
+
+
+def compact_candidates(force: bool = False) -> List[dict]:
+    """Check every candidate tenant and compact the fragmented ones."""
+    results = []
+    for user_id in candidates():
+        try:
+            results.append(compact_tenant(user_id, force=force))
+        except Exception as e:
+            print(f"⚠️  Compaction of {user_id} failed: {e}")
+            results.append({"user_id": user_id, "compacted": False, "error": str(e)})
+    return results
+
+
+# ---------------------------- Scheduler --------------------------- #
+
+def _scheduler() -> None:
+    while True:
+        time.sleep(settings.compaction_interval_seconds)
+        compact_candidates()
+
+
+def start_compaction_scheduler() -> None:
+    """Check candidates every ``compaction_interval_seconds`` in a background thread (0 disables)."""
+    global _SCHEDULER
+    if settings.compaction_interval_seconds <= 0:
+        return
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None or not _SCHEDULER.is_alive():
+            _SCHEDULER = threading.Thread(target=_scheduler, name="compaction-scheduler", daemon=True)
+            _SCHEDULER.start()
+
+
+# ---------------------------- Entry Point --------------------------- #
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact fragmented tenant stores.")
+    parser.add_argument("--user-id", help="Compact one tenant instead of all candidates")
+    parser.add_argument("--force", action="store_true", help="Compact even below the thresholds")
+    parser.add_argument("--report", action="store_true", help="Only print the fragmentation report")
+    args = parser.parse_args()
+
+    user_ids = [args.user_id] if args.user_id else candidates()
+    for user_id in user_ids:
+        if args.report:
+            print(json.dumps(fragmentation(user_id)))
+        else:
+            print(json.dumps(compact_tenant(user_id, force=args.force)))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,10 +12,86 @@ class Settings(BaseSettings):
     license_url: str = ""
     data_dir: str = ""
     embedding_model: str = ""
-    embedding_model_device: str = ""
+    embedding_model_device: str = "cpu"
+    embedding_backend: str = "torch"  # "torch", "onnx" or "remote"
+    embedding_service_socket: str = "data/embeddings.sock"
+    embedding_service_backend: str = "torch"  # Model backend inside the embedding service
+    onnx_model_dir: str = "data/onnx"
+    onnx_quantize: bool = False
+    onnx_num_threads: int = 0  # 0 = one thread per physical core
     chat_model: str = ""
     chat_model_task: str = ""
     google_api_key: str = ""
+    llm_provider: str = "gemini"  # "gemini", "mock" or "stub"
+    stub_llm_latency_median_ms: float = 800.0
+    stub_llm_latency_sigma: float = 0.5
+    stub_llm_tokens_per_second: float = 50.0
+    stub_llm_output_tokens: int = 64
+    stub_llm_error_rate: float = 0.0
+    chunking_mode: str = "overlap"  # "overlap" or "window" (overlap-free chunks, widened at query time)
+    neighbour_window: int = 1  # Chunks added before and after each hit of a "window" store
+    retrieval_max_k: int = 4  # Most chunks per query; fewer are used when their scores fall off, 1 opts out
+    retrieval_min_score: float = 0.0  # Cosine similarity a chunk needs to be used
+    retrieval_score_cliff: float = 0.05  # A chunk scoring this much below the previous one ends the selection
+    relevance_gate: bool = False  # Answer without the LLM when no chunk reaches relevance_gate_min_score
+    # Calibrate on questions with benchmarks/relevance_gate.py before turning the gate on; 0.0 keeps it off
+    relevance_gate_min_score: float = 0.0
+    llm_requests_per_minute: float = 60.0  # Per model, across the process; 0 disables rate limiting
+    llm_burst: int = 10
+    llm_max_concurrency: int = 8
+    llm_rate_limit_max_wait_seconds: float = 30.0
+    llm_max_retries: int = 3
+    llm_retry_base_seconds: float = 0.5
+    llm_retry_max_seconds: float = 8.0
+    llm_circuit_failures: int = 5  # Retryable failures in a row that open the circuit, 0 disables
+    llm_circuit_reset_seconds: float = 30.0
+    llm_circuit_fallback: str = "mock"  # "mock" answers with the mock LLM while the circuit is open, "fail" raises
+    llm_hedge: bool = False  # Send a second request when the first has not answered within the hedge delay
+    llm_hedge_quantile: float = 0.95  # Hedge delay: this quantile of recent times to first token
+    llm_hedge_min_delay_seconds: float = 0.25
+    llm_hedge_min_samples: int = 20  # Calls observed before the first hedge is sent
+    llm_hedge_max_ratio: float = 0.1  # Hedges per primary call at most
+    llm_cache_chains: str = "answer,paraphrase,questions,cv"  # Chains whose LLM responses are cached, "" disables
+    llm_cache_path: str = "data/llm_cache.sqlite3"
+    llm_cache_ttl_seconds: float = 604800.0
+    llm_cache_max_entries: int = 50000
+    tenant_storage: str = "directory"  # "directory" or "collection"
+    tenant_store_root: str = "data/tenant_stores"
+    tenant_shards: int = 4
+    tombstone_overfetch: int = 20  # Extra results per filter tombstone with an unknown chunk count
+    tombstone_max_overfetch: int = 200
+    deletion_grace_seconds: float = 2.0  # Delay before deleted chunks are removed from disk
+    deletion_drain_timeout: float = 30.0
+    deletion_poll_seconds: float = 5.0  # How often the background process picks up deletes of other workers
+    compaction_interval_seconds: float = 3600.0  # 0 disables scheduled compaction
+    compaction_deleted_ratio: float = 0.25  # Deleted chunks per live chunk that trigger a rebuild
+    compaction_min_deleted: int = 50
+    compaction_free_page_ratio: float = 0.3  # Free sqlite pages that trigger a rebuild or VACUUM
+    cold_store_root: str = "data/cold_stores"
+    tiering_idle_days: float = 30.0  # Stores not accessed for this long move to the cold tier, 0 disables
+    tiering_interval_seconds: float = 86400.0
+    admin_token: str = ""  # Required in the X-Admin-Token header of /admin routes; empty disables them
+    vector_backend: str = "auto"  # "auto", "chroma" or "flat"
+    flat_index_max_chunks: int = 5000
+    vector_quantization: str = "none"  # "none", "int8" or "binary"; shrinks RAM, the float32 matrix stays on disk
+    quantization_rescore_factor: int = 8  # Same default as flatindex.DEFAULT_RESCORE_FACTOR
+    document_store_backend: str = "chroma"  # "chroma", "faiss" or "flat"
+    faiss_index_type: str = "flat"  # "flat", "hnsw" or "ivfpq"
+    faiss_nlist: int = 4096
+    faiss_pq_m: int = 48
+    faiss_hnsw_m: int = 32
+    faiss_nprobe: int = 16
+    faiss_ef_search: int = 64
+    faiss_mmap: bool = True
+    faiss_rebuild_ratio: float = 0.25  # Share of deleted or replaced labels that triggers an index rebuild
+    warmup_on_startup: bool = True
+    warmup_retry_seconds: float = 30.0  # Retry a failed warmup after this long, 0 never
+    api_workers: int = 1  # > 1 forks workers after loading models once
+    torch_threads_per_worker: int = 0  # 0 = cpu_count // api_workers
+    enabled_routers: str = "answer,query,questions,documents,admin"
+    tracing_enabled: bool = True
+    tracing_exporter: str = "none"  # "none", "console" or "file"
+    tracing_file: str = "data/traces/traces.jsonl"
 
     class Config:
         env_file = ".env"
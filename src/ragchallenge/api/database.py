@@ -1,10 +1,37 @@
 from ragchallenge.api.interfaces.database import DocumentStore
 from ragchallenge.api.config import settings
+from ragchallenge.api.embeddings import create_embeddings
 
 # ---------------------------- Load Database --------------------------- #
 
 # Lazy load database to avoid startup issues
 DATABASE = None
+EMBEDDINGS = None
+
+
+def get_backend_options() -> dict:
+    """Backend-specific options for the configured document store backend."""
+    if settings.document_store_backend == "faiss":
+        return {
+            "index_type": settings.faiss_index_type,
+            "nlist": settings.faiss_nlist,
+            "pq_m": settings.faiss_pq_m,
+            "hnsw_m": settings.faiss_hnsw_m,
+            "nprobe": settings.faiss_nprobe,
+            "ef_search": settings.faiss_ef_search,
+            "mmap": settings.faiss_mmap,
+            "rebuild_ratio": settings.faiss_rebuild_ratio,
+        }
+    return {}
+
+
+def get_document_embeddings():
+    """Lazy-load the normalized embedding model the default knowledge base was built with."""
+    global EMBEDDINGS
+    if EMBEDDINGS is None:
+        EMBEDDINGS = create_embeddings(normalize=True)
+    return EMBEDDINGS
+
 
 def get_database():
     """Lazy-load the database when needed."""
@@ -13,7 +40,10 @@ def get_database():
         DATABASE = DocumentStore(
             model_name=settings.embedding_model,
             persist_directory="data/vectorstore",  # Use the populated vectorstore
-            device=settings.embedding_model_device
+            device=settings.embedding_model_device,
+            backend=settings.document_store_backend,
+            backend_options=get_backend_options(),
+            embedding_model=get_document_embeddings(),
         )
-        print(f"📊 Loaded vector database with {len(DATABASE.vector_store.get()['ids'])} documents")
+        print(f"📊 Loaded vector database with {DATABASE.count_documents()} documents")
     return DATABASE
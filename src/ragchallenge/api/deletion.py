@@ -0,0 +1,239 @@
+"""
+Deletion Module
+Deletes documents and whole tenants in two phases: tombstone now, remove from disk later.
+
+A delete request only writes a tombstone to the tenant catalog (or marks the tenant cleared)
+and returns, and queries stop returning the chunks right away. A background worker then waits
+a short grace period and until no search in any worker process uses the store, removes the
+chunks or the whole store, and drops the tombstones. Pending work is recorded on disk; only
+the background process (see ``stores.claim_background_role``) runs the worker, and it scans
+for pending deletes written by other workers every ``deletion_poll_seconds``.
+
+Uploads to a tenant first finish its pending deletes, so a tombstone never hides newer chunks.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import List, Optional
+
+from ragchallenge.api import catalog, compaction, metrics
+from ragchallenge.api.config import settings
+from ragchallenge.api.filters import chroma_where, validate_filter
+from ragchallenge.api.stores import (
+    delete_tenant, delete_user_chunks, exclusive, invalidate_user_vectorstore, is_background_process,
+    open_tenant_chroma, pending_deletion_directory, pending_deletion_path, read_pending_deletion, tenant_exists,
+    tenant_write_lock)
+
+PURGE_BATCH_SIZE = 5000
+RETRY_DELAY_SECONDS = 5.0
+
+_QUEUE = queue.Queue()
+_QUEUED = set()
+_QUEUE_LOCK = threading.Lock()
+_WORKER = None
+_POLLER = None
+
+metrics.PENDING_DELETES.set_function(lambda: len(_QUEUED))
+
+
+# ---------------------------- Scheduling --------------------------- #
+
+def _write_pending(user_id: str, clear: bool = False) -> None:
+    path = pending_deletion_path(user_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pending = {
+        "user_id": user_id,
+        "clear": clear or read_pending_deletion(user_id).get("clear", False),
+        "not_before": time.time() + settings.deletion_grace_seconds,
+    }
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(pending, file)
+    os.replace(temporary, path)
+
+
+def _remove_pending(user_id: str) -> None:
+    try:
+        os.remove(pending_deletion_path(user_id))
+    except FileNotFoundError:
+        pass
+
+
+def _schedule(user_id: str) -> None:
+    """Queue a tenant's pending deletes; other processes leave them to the background process."""
+    global _WORKER
+    if not is_background_process():
+        return
+    with _QUEUE_LOCK:
+        if _WORKER is None or not _WORKER.is_alive():
+            _WORKER = threading.Thread(target=_worker, name="deletion-worker", daemon=True)
+            _WORKER.start()
+        if user_id in _QUEUED:
+            return
+        _QUEUED.add(user_id)
+    _QUEUE.put(user_id)
+
+
+def _worker() -> None:
+    while True:
+        user_id = _QUEUE.get()
+        with _QUEUE_LOCK:
+            _QUEUED.discard(user_id)
+
+        delay = read_pending_deletion(user_id).get("not_before", 0) - time.time()
+        if delay > 0:
+            time.sleep(min(delay, settings.deletion_grace_seconds))
+        try:
+            purge(user_id)
+        except Exception as e:
+            print(f"⚠️  Removing deleted data of {user_id} failed, retrying: {e}")
+            time.sleep(RETRY_DELAY_SECONDS)
+            _schedule(user_id)
+
+
+def _schedule_pending() -> int:
+    directory = pending_deletion_directory()
+    if not directory.exists():
+        return 0
+    count = 0
+    for path in directory.glob("*.json"):
+        try:
+            user_id = json.loads(path.read_text(encoding="utf-8"))["user_id"]
+        except (OSError, ValueError, KeyError):
+            continue
+        _schedule(user_id)
+        count += 1
+    return count
+
+
+def _poller() -> None:
+    while True:
+        time.sleep(settings.deletion_poll_seconds)
+        _schedule_pending()
+
+
+def resume_pending() -> int:
+    """
+    Schedule deletes that a previous process tombstoned but did not remove, then keep picking up
+    those of other workers. Returns the number found now; does nothing outside the background process.
+    """
+    global _POLLER
+    if not is_background_process():
+        return 0
+    count = _schedule_pending()
+    if count:
+        print(f"🗑️  Resuming {count} pending deletes")
+    with _QUEUE_LOCK:
+        if settings.deletion_poll_seconds > 0 and (_POLLER is None or not _POLLER.is_alive()):
+            _POLLER = threading.Thread(target=_poller, name="deletion-poller", daemon=True)
+            _POLLER.start()
+    return count
+
+
+# ---------------------------- Deletes --------------------------- #
+
+def delete_documents(user_id: str, names: Optional[List[str]] = None, where: Optional[dict] = None) -> dict:
+    """
+    Delete documents by name and/or every chunk matching a metadata filter, in one call.
+
+    The chunks are hidden from queries when this returns; they are removed from disk in the
+    background.
+
+    :param user_id: The tenant.
+    :param names: Document names to delete.
+    :param where: Flat metadata filter, e.g. ``{"document_type": "uploaded_document"}``.
+    :return: Deleted and unknown names and the number of chunks hidden by name.
+    """
+    if where is not None:
+        validate_filter(where)
+
+    result = {"user_id": user_id, "deleted_documents": [], "not_found": [], "tombstoned_chunks": 0,
+              "filter": where}
+    with tenant_write_lock(user_id):
+        if names:
+            tombstoned = catalog.tombstone_uploads(user_id, sorted(set(names)))
+            result.update(deleted_documents=tombstoned["deleted"], not_found=tombstoned["not_found"],
+                          tombstoned_chunks=tombstoned["chunks"])
+            metrics.TOMBSTONED_CHUNKS.inc(tombstoned["chunks"])
+        if where is not None:
+            catalog.tombstone_filter(user_id, where)
+
+    if result["deleted_documents"] or where is not None:
+        _write_pending(user_id)
+        _schedule(user_id)
+    return result
+
+
+def clear_tenant(user_id: str) -> bool:
+    """Hide a tenant's whole store at once and remove it in the background. Returns False if it had none."""
+    if not tenant_exists(user_id):
+        return False
+    _write_pending(user_id, clear=True)
+    invalidate_user_vectorstore(user_id)
+    _schedule(user_id)
+    return True
+
+
+def finish_pending(user_id: str) -> None:
+    """Remove a tenant's pending deletes now, e.g. before new documents are added."""
+    if pending_deletion_path(user_id).exists():
+        purge(user_id)
+
+
+# ---------------------------- Purge --------------------------- #
+
+def _purge_tombstone(user_id: str, tombstone: dict) -> int:
+    store = open_tenant_chroma(user_id, None)
+    if store is None:
+        return 0
+
+    ids = list(tombstone["chunk_ids"] or [])
+    if tombstone["purge_where"]:
+        results = store._collection.get(where=chroma_where(tombstone["purge_where"]), include=["metadatas"])
+        ids.extend(results["ids"])
+        if tombstone["kind"] == "filter":
+            removed = defaultdict(int)
+            for metadata in results["metadatas"]:
+                removed[(metadata or {}).get("source")] += 1
+            catalog.subtract_chunks(user_id, removed)
+
+    for start in range(0, len(ids), PURGE_BATCH_SIZE):
+        delete_user_chunks(user_id, ids[start:start + PURGE_BATCH_SIZE], None)
+    return len(ids)
+
+
+def purge(user_id: str) -> dict:
+    """
+    Remove a tenant's tombstoned chunks, or its whole store if it was cleared, from disk.
+
+    Runs while no search in any worker uses the store; raises TimeoutError if running
+    searches take longer than ``deletion_drain_timeout``.
+    """
+    with tenant_write_lock(user_id):
+        if not pending_deletion_path(user_id).exists():
+            return {"user_id": user_id, "purged_chunks": 0}
+
+        with exclusive(user_id, settings.deletion_drain_timeout):
+            start = time.perf_counter()
+            if read_pending_deletion(user_id).get("clear"):
+                removed = delete_tenant(user_id)
+                _remove_pending(user_id)
+                print(f"🗑️  Removed store of {user_id} in {time.perf_counter() - start:.2f}s")
+                return {"user_id": user_id, "cleared": removed}
+
+            purged = 0
+            for tombstone in catalog.list_tombstones(user_id):
+                purged += _purge_tombstone(user_id, tombstone)
+                catalog.remove_tombstone(user_id, tombstone["id"])
+            if not catalog.list_tombstones(user_id):
+                _remove_pending(user_id)
+
+        catalog.add_deleted_chunks(user_id, purged)
+        compaction.mark_candidate(user_id)
+        metrics.PURGED_CHUNKS.inc(purged)
+        print(f"🗑️  Removed {purged} deleted chunks of {user_id} in {time.perf_counter() - start:.2f}s")
+        return {"user_id": user_id, "purged_chunks": purged}
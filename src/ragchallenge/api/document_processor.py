@@ -3,23 +3,31 @@ Document Processing Module
 Handles document upload, processing, and vector store management for RAG system.
 """
 
+import bisect
+import hashlib
 import os
 import tempfile
+import time
 import uuid
+from itertools import accumulate
 from pathlib import Path
 from typing import List, Optional
 import aiofiles
 from fastapi import UploadFile, HTTPException
+from starlette.concurrency import run_in_threadpool
 
 # Document processing imports
 import PyPDF2
 from docx import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.schema import Document as LangchainDocument
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document as LangchainDocument
 from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
 
+from . import catalog, chunking, deletion, metrics, tiering
 from .config import Settings
+from .embeddings import create_embeddings
+from .stores import add_user_documents, tenant_exists, tenant_location, tenant_write_lock
+from .tracing import span
 
 
 class DocumentProcessor:
@@ -30,10 +38,11 @@ class DocumentProcessor:
         self.upload_dir = Path("data/uploads")
         self.upload_dir.mkdir(exist_ok=True)
         
-        # Initialize text splitter
+        # Initialize text splitter; overlap-free chunks are widened by their neighbours at query time
+        self.link_neighbours = config.chunking_mode == "window"
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
-            chunk_overlap=200,
+            chunk_overlap=0 if self.link_neighbours else 200,
             length_function=len,
             separators=["\n\n", "\n", " ", ""]
         )
@@ -44,10 +53,7 @@ class DocumentProcessor:
     def get_embeddings(self):
         """Lazy-load embeddings when needed."""
         if self.embeddings is None:
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=self.config.embedding_model,
-                model_kwargs={'device': self.config.embedding_model_device}
-            )
+            self.embeddings = create_embeddings()
         return self.embeddings
     
     async def save_upload_file(self, upload_file: UploadFile) -> str:
@@ -64,18 +70,27 @@ class DocumentProcessor:
         
         return str(file_path)
     
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file."""
+    def file_sha256(self, file_path: str) -> str:
+        """Return the SHA-256 hex digest of a saved upload."""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def extract_pages_from_pdf(self, file_path: str) -> List[str]:
+        """Extract the text of each page of a PDF file."""
         try:
             with open(file_path, 'rb') as file:
                 reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                return text
+                return [(page.extract_text() or "") + "\n" for page in reader.pages]
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Error processing PDF: {str(e)}")
     
+    def extract_text_from_pdf(self, file_path: str) -> str:
+        """Extract text from PDF file."""
+        return "".join(self.extract_pages_from_pdf(file_path))
+    
     def extract_text_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX file."""
         try:
@@ -115,29 +130,131 @@ class DocumentProcessor:
                 detail=f"Unsupported file type: {file_extension}. Supported types: PDF, DOCX, TXT, MD"
             )
     
-    def create_documents_from_text(self, text: str, filename: str) -> List[LangchainDocument]:
-        """Split text into chunks and create LangChain documents."""
+    def create_documents_from_text(self, text: str, filename: str,
+                                   page_starts: Optional[List[int]] = None) -> List[LangchainDocument]:
+        """
+        Split text into chunks and create LangChain documents.
+        
+        :param text: The extracted text.
+        :param filename: Document name, stored as the chunks' source.
+        :param page_starts: Offset in the text where each page starts (PDFs); chunks then get
+            the 1-based ``page`` and ``page_end`` they span, for page-range filters.
+        """
         chunks = self.text_splitter.split_text(text)
         documents = []
+        start = 0
         
         for i, chunk in enumerate(chunks):
-            doc = LangchainDocument(
-                page_content=chunk,
-                metadata={
-                    "source": filename,
-                    "chunk_id": i,
-                    "document_type": "uploaded_document"
-                }
-            )
+            metadata = {
+                "source": filename,
+                "chunk_id": i,
+                "document_type": "uploaded_document"
+            }
+            if page_starts:
+                # Chunks are in text order, so each one is searched for after the previous start
+                found = text.find(chunk, start)
+                start = found if found >= 0 else start
+                metadata["page"] = bisect.bisect_right(page_starts, start)
+                metadata["page_end"] = bisect.bisect_right(page_starts, start + max(len(chunk) - 1, 0))
+                start += 1
+            doc = LangchainDocument(page_content=chunk, metadata=metadata)
             documents.append(doc)
         
         return documents
     
     def create_user_vectorstore(self, user_id: str) -> str:
-        """Create a user-specific vector store directory."""
-        user_vectorstore_dir = Path(f"data/user_vectorstores/{user_id}")
-        user_vectorstore_dir.mkdir(parents=True, exist_ok=True)
-        return str(user_vectorstore_dir)
+        """Return where a user's documents are stored (directory or shared collection)."""
+        return tenant_location(user_id)
+    
+    def store_in_default_vectorstore(self, documents: List[LangchainDocument], vectorstore_path: str, embeddings,
+                                     ids: Optional[List[str]] = None) -> None:
+        """Add documents to the shared augmented vector store (uploads without a user ID)."""
+        try:
+            vectorstore = Chroma(
+                persist_directory=vectorstore_path,
+                embedding_function=embeddings
+            )
+            
+            # Add documents to vectorstore
+            vectorstore.add_documents(documents, ids=ids)
+            
+            # Persist the vectorstore
+            vectorstore.persist()
+            
+        except Exception as vs_error:
+            # If vectorstore doesn't exist, create it
+            Chroma.from_documents(
+                documents,
+                embeddings,
+                ids=ids,
+                persist_directory=vectorstore_path
+            )
+    
+    def store_saved_file(self, file_path: str, filename: str, file_extension: str,
+                         user_id: Optional[str] = None) -> dict:
+        """Extract, chunk, embed and store a saved upload; blocking, so async callers use a thread."""
+        # Extract text from file; PDF pages are kept apart so chunks know their pages
+        page_starts = None
+        with span("extract_text", extension=file_extension):
+            if file_extension == '.pdf':
+                pages = self.extract_pages_from_pdf(file_path)
+                page_starts = list(accumulate((len(page) for page in pages[:-1]), initial=0))
+                text = "".join(pages)
+            else:
+                text = self.extract_text_from_file(file_path, filename)
+
+        if not text.strip():
+            raise HTTPException(status_code=400, detail="No text content found in the file")
+
+        # Create documents
+        with span("chunking"):
+            documents = self.create_documents_from_text(text, filename, page_starts)
+
+        # Determine vector store path
+        if user_id:
+            vectorstore_path = self.create_user_vectorstore(user_id)
+        else:
+            # Use default augmented vectorstore
+            vectorstore_path = self.config.data_dir
+
+        # Get embeddings
+        with span("load_embeddings"):
+            embeddings = self.get_embeddings()
+        start = time.perf_counter()
+
+        # Load existing vectorstore or create new one
+        with span("embed_and_store", chunks=len(documents)):
+            if user_id:
+                # Uploads to a frozen tenant add to its restored store
+                tiering.ensure_hot(user_id)
+                with tenant_write_lock(user_id):
+                    # Remove pending deletes first so their tombstones cannot hide the new chunks
+                    deletion.finish_pending(user_id)
+                    upload_id = catalog.new_upload_id()
+                    if self.link_neighbours:
+                        chunking.link_chunks(documents, section=upload_id)
+                    add_user_documents(user_id, documents, embeddings,
+                                       ids=catalog.chunk_ids(upload_id, len(documents)))
+                    catalog.record_upload(user_id, upload_id, filename,
+                                          self.file_sha256(file_path), len(documents),
+                                          os.path.getsize(file_path))
+            else:
+                ids = chunking.link_chunks(documents, section=uuid.uuid4().hex) if self.link_neighbours else None
+                self.store_in_default_vectorstore(documents, vectorstore_path, embeddings, ids=ids)
+
+        elapsed = time.perf_counter() - start
+        metrics.INGESTED_CHUNKS.inc(len(documents))
+        metrics.INGESTION_SECONDS.observe(elapsed)
+        metrics.INGESTION_THROUGHPUT.set(len(documents) / max(elapsed, 1e-9))
+
+        return {
+            "status": "success",
+            "message": f"Successfully processed {filename}",
+            "document_name": filename,
+            "chunks_created": len(documents),
+            "vectorstore_path": vectorstore_path,
+            "text_preview": text[:200] + "..." if len(text) > 200 else text
+        }
     
     async def process_and_store_document(self, upload_file: UploadFile, user_id: Optional[str] = None) -> dict:
         """Process uploaded document and add to vector store."""
@@ -153,58 +270,13 @@ class DocumentProcessor:
                 )
             
             # Save uploaded file
-            file_path = await self.save_upload_file(upload_file)
+            with span("save_upload"):
+                file_path = await self.save_upload_file(upload_file)
             
             try:
-                # Extract text from file
-                text = self.extract_text_from_file(file_path, upload_file.filename)
-                
-                if not text.strip():
-                    raise HTTPException(status_code=400, detail="No text content found in the file")
-                
-                # Create documents
-                documents = self.create_documents_from_text(text, upload_file.filename)
-                
-                # Determine vector store path
-                if user_id:
-                    vectorstore_path = self.create_user_vectorstore(user_id)
-                else:
-                    # Use default augmented vectorstore
-                    vectorstore_path = self.config.data_dir
-                
-                # Get embeddings
-                embeddings = self.get_embeddings()
-                
-                # Load existing vectorstore or create new one
-                try:
-                    vectorstore = Chroma(
-                        persist_directory=vectorstore_path,
-                        embedding_function=embeddings
-                    )
-                    
-                    # Add documents to vectorstore
-                    vectorstore.add_documents(documents)
-                    
-                    # Persist the vectorstore
-                    vectorstore.persist()
-                    
-                except Exception as vs_error:
-                    # If vectorstore doesn't exist, create it
-                    vectorstore = Chroma.from_documents(
-                        documents,
-                        embeddings,
-                        persist_directory=vectorstore_path
-                    )
-                
-                return {
-                    "status": "success",
-                    "message": f"Successfully processed {upload_file.filename}",
-                    "document_name": upload_file.filename,
-                    "chunks_created": len(documents),
-                    "vectorstore_path": vectorstore_path,
-                    "text_preview": text[:200] + "..." if len(text) > 200 else text
-                }
-                
+                # Extraction, embedding and tier restores block, so they run off the event loop
+                return await run_in_threadpool(self.store_saved_file, file_path, upload_file.filename,
+                                               file_extension, user_id)
             finally:
                 # Clean up uploaded file
                 if os.path.exists(file_path):
@@ -215,73 +287,41 @@ class DocumentProcessor:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Error processing document: {str(e)}")
     
-    def list_user_documents(self, user_id: str) -> List[dict]:
-        """List documents in user's vector store."""
-        user_vectorstore_path = Path(f"data/user_vectorstores/{user_id}")
-        
-        if not user_vectorstore_path.exists():
-            return []
-        
+    def list_user_documents(self, user_id: str, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+        """List one page of the documents in a user's vector store, read from the tenant catalog."""
         try:
-            vectorstore = Chroma(
-                persist_directory=str(user_vectorstore_path),
-                embedding_function=self.get_embeddings()
-            )
-            
-            # Get all documents
-            collection = vectorstore._collection
-            results = collection.get()
-            
-            # Extract unique document sources
-            documents = {}
-            for metadata in results.get('metadatas', []):
-                if metadata and 'source' in metadata:
-                    source = metadata['source']
-                    if source not in documents:
-                        documents[source] = {
-                            "name": source,
-                            "chunks": 0,
-                            "document_type": metadata.get('document_type', 'unknown')
-                        }
-                    documents[source]["chunks"] += 1
-            
-            return list(documents.values())
-            
+            tiering.ensure_hot(user_id)
+            return catalog.list_documents(user_id, limit=limit, offset=offset)
         except Exception as e:
             return []
     
     def delete_user_document(self, user_id: str, document_name: str) -> dict:
         """Delete a specific document from user's vector store."""
-        user_vectorstore_path = Path(f"data/user_vectorstores/{user_id}")
-        
-        if not user_vectorstore_path.exists():
+        return self.delete_user_documents(user_id, names=[document_name])
+    
+    def delete_user_documents(self, user_id: str, names: Optional[List[str]] = None,
+                              where: Optional[dict] = None) -> dict:
+        """Delete documents by name and/or metadata filter; chunks are hidden at once and removed in the background."""
+        if not names and not where:
+            raise HTTPException(status_code=400, detail="Provide document names or a metadata filter")
+        tiering.ensure_hot(user_id)
+        if not tenant_exists(user_id):
             raise HTTPException(status_code=404, detail="User vector store not found")
         
         try:
-            vectorstore = Chroma(
-                persist_directory=str(user_vectorstore_path),
-                embedding_function=self.get_embeddings()
-            )
-            
-            # Get collection and delete documents by source
-            collection = vectorstore._collection
-            
-            # Find documents with matching source
-            results = collection.get(where={"source": document_name})
-            
-            if not results.get('ids'):
-                raise HTTPException(status_code=404, detail="Document not found")
-            
-            # Delete the documents
-            collection.delete(ids=results['ids'])
-            
-            return {
-                "status": "success",
-                "message": f"Successfully deleted {document_name}",
-                "deleted_chunks": len(results['ids'])
-            }
-            
-        except HTTPException:
-            raise
+            result = deletion.delete_documents(user_id, names=names, where=where)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error deleting document: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Error deleting documents: {str(e)}")
+        
+        if names and not where and not result["deleted_documents"]:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        deleted = ", ".join(result["deleted_documents"]) or "documents matching the filter"
+        return {
+            "status": "success",
+            "message": f"Successfully deleted {deleted}",
+            "deleted_chunks": result["tombstoned_chunks"],
+            **result
+        }
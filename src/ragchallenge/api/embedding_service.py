@@ -0,0 +1,287 @@
+"""
+Embedding Service Module
+Standalone embedding daemon shared by all processes on a node, served over a Unix socket.
+
+The daemon owns the only copy of the embedding model and batches texts from all connected
+clients (API workers, the CV search system, scripts) into one queue, so a burst of small
+requests is encoded as a few large batches. ``RemoteEmbeddings`` is the LangChain client;
+select it everywhere with ``EMBEDDING_BACKEND=remote``.
+
+Wire format (little endian, one request/response pair at a time per connection):
+
+    request:  b"EMB1" | flags u8 (bit 0 = normalize) | count u32 | count x (length u32 | utf-8 bytes)
+    response: status u8 (0 = ok) | count u32 | dim u32 | count * dim float32
+    error:    status u8 (1)      | length u32 | utf-8 message
+
+Usage:
+    python -m ragchallenge.api.embedding_service --socket data/embeddings.sock
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import struct
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+MAGIC = b"EMB1"
+FLAG_NORMALIZE = 1
+REQUEST_HEADER = struct.Struct("<4sBI")
+RESPONSE_HEADER = struct.Struct("<BII")
+ERROR_HEADER = struct.Struct("<BI")
+LENGTH = struct.Struct("<I")
+MAX_TEXTS_PER_REQUEST = 4096
+MAX_TEXT_BYTES = 1 << 20
+
+
+# ---------------------------- Protocol --------------------------- #
+
+def encode_request(texts: List[str], normalize: bool) -> bytes:
+    parts = [REQUEST_HEADER.pack(MAGIC, FLAG_NORMALIZE if normalize else 0, len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(LENGTH.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def encode_response(vectors: np.ndarray) -> bytes:
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    return RESPONSE_HEADER.pack(0, vectors.shape[0], vectors.shape[1]) + vectors.tobytes()
+
+
+def encode_error(message: str) -> bytes:
+    data = message.encode("utf-8")
+    return ERROR_HEADER.pack(1, len(data)) + data
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Embedding service closed the connection")
+        received += count
+    return bytes(buffer)
+
+
+# ---------------------------- Server --------------------------- #
+
+class EmbeddingServer:
+    """Asyncio Unix-socket server that batches embedding requests from many clients."""
+
+    def __init__(self, embedding_model: Embeddings, socket_path: str, max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0):
+        """
+        Initialize the EmbeddingServer class.
+
+        :param embedding_model: A local embedding model returning non-normalized vectors.
+        :param socket_path: Path of the Unix socket to listen on.
+        :param max_batch_size: Maximum number of texts encoded per model call.
+        :param max_wait_ms: How long to wait for more texts before encoding a partial batch.
+        """
+        self.embedding_model = embedding_model
+        self.socket_path = socket_path
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.queue: Optional[asyncio.Queue] = None
+        self.batches = 0
+        self.texts = 0
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[List[str], bool]:
+        magic, flags, count = REQUEST_HEADER.unpack(await reader.readexactly(REQUEST_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Bad magic, not an embedding request")
+        if count > MAX_TEXTS_PER_REQUEST:
+            raise ValueError(f"Too many texts in one request ({count} > {MAX_TEXTS_PER_REQUEST})")
+        texts = []
+        for _ in range(count):
+            (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+            if length > MAX_TEXT_BYTES:
+                raise ValueError(f"Text too long ({length} bytes)")
+            texts.append((await reader.readexactly(length)).decode("utf-8"))
+        return texts, bool(flags & FLAG_NORMALIZE)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    texts, normalize = await self._read_request(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                except ValueError as e:
+                    writer.write(encode_error(str(e)))
+                    await writer.drain()
+                    break
+
+                if not texts:
+                    writer.write(encode_response(np.zeros((0, 0), dtype=np.float32)))
+                    await writer.drain()
+                    continue
+
+                futures = []
+                for text in texts:
+                    future = loop.create_future()
+                    await self.queue.put((text, future))
+                    futures.append(future)
+                try:
+                    vectors = np.asarray(await asyncio.gather(*futures), dtype=np.float32).reshape(len(texts), -1)
+                except Exception as e:
+                    writer.write(encode_error(f"{type(e).__name__}: {e}"))
+                    await writer.drain()
+                    continue
+
+                if normalize and len(vectors):
+                    vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+                writer.write(encode_response(vectors))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def batch_loop(self) -> None:
+        """Collect queued texts into batches and encode them off the event loop, one batch at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await loop.run_in_executor(None, self.embedding_model.embed_documents, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.texts += len(texts)
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def serve(self) -> None:
+        self.queue = asyncio.Queue()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+
+        server = await asyncio.start_unix_server(self.handle_client, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        print(f"✅ Embedding service listening on {self.socket_path}")
+        batcher = asyncio.create_task(self.batch_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+# ---------------------------- Client --------------------------- #
+
+class RemoteEmbeddings(Embeddings):
+    """LangChain embeddings client for the embedding service; keeps one connection per thread."""
+
+    def __init__(self, socket_path: str = "data/embeddings.sock", normalize: bool = False,
+                 timeout: float = 60.0, connect_timeout: float = 30.0):
+        """
+        Initialize the RemoteEmbeddings class.
+
+        :param socket_path: Path of the embedding service socket.
+        :param normalize: Return unit-length vectors.
+        :param timeout: Seconds to wait for a response.
+        :param connect_timeout: Seconds to keep retrying while the service is starting.
+        """
+        self.socket_path = socket_path
+        self.normalize = normalize
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+                return sock
+            except (FileNotFoundError, ConnectionRefusedError):
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise ConnectionError(f"Embedding service is not running at {self.socket_path}")
+                time.sleep(0.2)
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        sock = getattr(self._local, "sock", None)
+        for attempt in range(2):
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                sock.sendall(encode_request(texts, self.normalize))
+                status = _recv_exactly(sock, 1)[0]
+                if status != 0:
+                    (length,) = LENGTH.unpack(_recv_exactly(sock, LENGTH.size))
+                    raise RuntimeError(f"Embedding service error: {_recv_exactly(sock, length).decode('utf-8')}")
+                count, dimension = struct.unpack("<II", _recv_exactly(sock, 8))
+                data = _recv_exactly(sock, count * dimension * 4)
+                return np.frombuffer(data, dtype="<f4").reshape(count, dimension)
+            except (ConnectionError, BrokenPipeError, socket.timeout):
+                # The service may have restarted; reconnect once before giving up
+                sock.close()
+                sock = self._local.sock = None
+                if attempt:
+                    raise
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), MAX_TEXTS_PER_REQUEST):
+            vectors.extend(self._request(list(texts[start:start + MAX_TEXTS_PER_REQUEST])).tolist())
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._request([text])[0].tolist()
+
+
+# ---------------------------- Entry Point --------------------------- #
+
+def main():
+    from ragchallenge.api.config import settings
+    from ragchallenge.api.embeddings import create_embeddings
+
+    parser = argparse.ArgumentParser(description="Serve the embedding model over a Unix socket.")
+    parser.add_argument("--socket", default=settings.embedding_service_socket)
+    parser.add_argument("--backend", default=settings.embedding_service_backend, help="'torch' or 'onnx'")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"📊 Loading {settings.embedding_model} ({args.backend})...")
+    model = create_embeddings(normalize=False, backend=args.backend)
+    server = EmbeddingServer(model, args.socket, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        print(f"🛑 Embedding service stopped after {server.batches} batches ({server.texts} texts)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+
+from ragchallenge.api.config import settings
+
+# ---------------------------- Load Embeddings --------------------------- #
+
+
+def create_embeddings(normalize: bool = False, backend: Optional[str] = None) -> Embeddings:
+    """
+    Create the embedding model selected by ``settings.embedding_backend``.
+
+    :param normalize: Return unit-length vectors. Must match how the target store was built:
+                      the default knowledge base is normalized, user stores are not.
+    :param backend: Override the configured backend ("torch", "onnx" or "remote").
+    """
+    backend = backend or settings.embedding_backend
+    if backend == "remote":
+        from ragchallenge.api.embedding_service import RemoteEmbeddings
+        return RemoteEmbeddings(socket_path=settings.embedding_service_socket, normalize=normalize)
+
+    if backend == "onnx":
+        from ragchallenge.api.interfaces.onnxembeddings import OnnxEmbeddings
+        return OnnxEmbeddings(
+            model_name=settings.embedding_model,
+            cache_dir=settings.onnx_model_dir,
+            quantize=settings.onnx_quantize,
+            num_threads=settings.onnx_num_threads,
+            normalize=normalize,
+        )
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(
+        model_name=settings.embedding_model,
+        model_kwargs={'device': settings.embedding_model_device},
+        encode_kwargs={'normalize_embeddings': normalize},
+    )
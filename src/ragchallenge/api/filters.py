@@ -0,0 +1,113 @@
+"""
+Metadata Filter Module
+One small filter language for chunk metadata, shared by retrieval and deletes.
+
+A filter is a dict of metadata keys, all of which must match:
+
+- a plain value matches by equality, ``None`` only if the key is absent;
+- ``{"$in": [values]}`` matches by membership;
+- ``{"$gte": n, "$lte": m}`` (also ``$gt`` and ``$lt``) matches numeric ranges, e.g. pages.
+
+Stores in this package (flat, FAISS and tenant handles) take these filters as they are;
+LangChain's Chroma store needs them translated with ``chroma_where``.
+"""
+
+from typing import List, Optional
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+
+def validate_filter(where: dict) -> dict:
+    """Check a metadata filter: flat keys with scalar values, ``{"$in": [...]}`` or numeric ranges."""
+    if not where:
+        raise ValueError("The metadata filter must not be empty")
+    for key, condition in where.items():
+        if key.startswith("$"):
+            raise ValueError(f"Unsupported filter key '{key}', use flat metadata keys")
+        if isinstance(condition, dict):
+            if set(condition) == {"$in"}:
+                if not isinstance(condition["$in"], list) or not condition["$in"]:
+                    raise ValueError(f"Condition of '{key}' must be a value or {{\"$in\": [values]}}")
+            elif not condition or not set(condition) <= set(RANGE_OPERATORS) or not all(
+                    isinstance(bound, (int, float)) and not isinstance(bound, bool) for bound in condition.values()):
+                raise ValueError(f"Condition of '{key}' must be {{\"$in\": [values]}} or numeric "
+                                 f"bounds ({', '.join(RANGE_OPERATORS)})")
+        elif not isinstance(condition, (str, int, float, bool)):
+            raise ValueError(f"Condition of '{key}' must be a string, number or boolean")
+    return where
+
+
+def in_range(value, condition: dict) -> bool:
+    """Whether a value lies within the bounds of a range condition."""
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return False
+    return (("$gt" not in condition or value > condition["$gt"])
+            and ("$gte" not in condition or value >= condition["$gte"])
+            and ("$lt" not in condition or value < condition["$lt"])
+            and ("$lte" not in condition or value <= condition["$lte"]))
+
+
+def metadata_matches(metadata: dict, where: dict) -> bool:
+    """Whether chunk metadata matches a filter."""
+    metadata = metadata or {}
+    for key, condition in where.items():
+        value = metadata.get(key)
+        if condition is None:
+            if value is not None:
+                return False
+        elif isinstance(condition, dict):
+            if "$in" in condition:
+                if value not in condition["$in"]:
+                    return False
+            elif not in_range(value, condition):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def chroma_where(where: dict) -> dict:
+    """Translate a filter into a Chroma where clause (one operator per clause)."""
+    clauses = []
+    for key, condition in where.items():
+        if isinstance(condition, dict) and "$in" not in condition:
+            clauses.extend({key: {operator: bound}} for operator, bound in condition.items())
+        else:
+            clauses.append({key: condition})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def build_filter(sources: Optional[List[str]] = None, document_types: Optional[List[str]] = None,
+                 page_from: Optional[int] = None, page_to: Optional[int] = None) -> Optional[dict]:
+    """
+    Filter for the retrieval options of the API.
+
+    :param sources: Only chunks of these documents (by name).
+    :param document_types: Only chunks of these document types.
+    :param page_from: Only chunks ending on or after this page (PDF uploads).
+    :param page_to: Only chunks starting on or before this page (PDF uploads).
+    :return: A filter, or None if no option is set.
+    """
+    where = {}
+    if sources:
+        where["source"] = {"$in": list(sources)}
+    if document_types:
+        where["document_type"] = {"$in": list(document_types)}
+    # A chunk may span pages, so it matches if any of its pages is in the range
+    if page_from is not None:
+        where["page_end"] = {"$gte": page_from}
+    if page_to is not None:
+        where["page"] = {"$lte": page_to}
+    return validate_filter(where) if where else None
+
+
+def search_options(store, where: Optional[dict]) -> dict:
+    """Keyword arguments that apply a filter to a search on the given vector store."""
+    if not where:
+        return {}
+    from langchain_chroma import Chroma
+    from langchain_community.vectorstores import Chroma as CommunityChroma
+
+    if isinstance(store, (Chroma, CommunityChroma)):
+        return {"filter": chroma_where(where)}
+    return {"filter": where}
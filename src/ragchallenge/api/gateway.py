@@ -0,0 +1,451 @@
+"""
+LLM Gateway Module
+One way out to remote chat models: pooled clients, rate limiting, retries and circuit breaking.
+
+Every chat model that calls a remote API (Gemini, the Hugging Face endpoint, the stub used in
+load tests) is wrapped in ``LLMGateway``. All wrappers of the same model name share one set of
+guards:
+
+- clients are pooled by model and generation parameters (``pooled_client``), so callers with
+  the same configuration share one client and its connections;
+- a token bucket admits ``llm_requests_per_minute`` calls with bursts of ``llm_burst``, and at
+  most ``llm_max_concurrency`` calls run at once; a call that would wait longer than
+  ``llm_rate_limit_max_wait_seconds`` for a token fails at once instead;
+- retryable errors (429 / quota exhausted, 5xx, timeouts) are retried up to ``llm_max_retries``
+  times with full-jitter exponential backoff; a quota error also pauses the bucket, so
+  concurrent callers back off together instead of each running into the same 429;
+- after ``llm_circuit_failures`` retryable failures in a row the circuit opens: calls fail
+  fast with ``CircuitOpenError``, or go to the fallback model (the mock LLM by default), until
+  one trial call after ``llm_circuit_reset_seconds`` succeeds;
+- with ``llm_hedge`` enabled, calls are streamed, and a call that has produced no token after
+  the ``llm_hedge_quantile`` of recent times to first token is sent a second time. The first
+  attempt to finish wins; the other one stops at its next chunk and its stream is closed.
+  Hedges need a free rate limit token and concurrency slot, and ``llm_hedge_max_ratio`` caps
+  them relative to primary calls.
+
+Outcomes are counted in ``rag_llm_calls_total``; waits for a token in ``rag_llm_rate_limit_wait_seconds``;
+hedges in ``rag_llm_hedges_total``.
+"""
+
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from ragchallenge.api import metrics
+from ragchallenge.api.config import settings
+
+_CLIENTS: Dict[Hashable, Any] = {}
+_CLIENT_LOCK = threading.Lock()
+
+_GUARDS: Dict[str, "ModelGuard"] = {}
+_GUARD_LOCK = threading.Lock()
+
+_HEDGE_POOL: Optional[ThreadPoolExecutor] = None
+_HEDGE_POOL_LOCK = threading.Lock()
+
+# Times to first token kept per model for the hedge delay
+LATENCY_WINDOW = 500
+# The hedge budget never holds more than the hedges earned by this many primary calls
+HEDGE_BUDGET_CALLS = 100
+
+RETRYABLE_ERROR = re.compile(
+    r"\b(429|500|502|503|504)\b|resource.?exhausted|rate.?limit|quota|unavailable|overloaded|timed? ?out|deadline",
+    re.IGNORECASE)
+QUOTA_ERROR = re.compile(r"\b429\b|resource.?exhausted|rate.?limit|quota", re.IGNORECASE)
+
+
+class CircuitOpenError(RuntimeError):
+    """The model failed repeatedly and is not called until its circuit closes again."""
+
+
+class RateLimitExceeded(RuntimeError):
+    """No request token would become available within the allowed wait."""
+
+
+# ---------------------------- Client Pool --------------------------- #
+
+def pooled_client(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """Return the client created for this key, creating it with ``factory`` on first use."""
+    with _CLIENT_LOCK:
+        if key not in _CLIENTS:
+            _CLIENTS[key] = factory()
+        return _CLIENTS[key]
+
+
+# ---------------------------- Guards --------------------------- #
+
+class TokenBucket:
+    """Token bucket that hands out reservations, so waiting happens outside the lock."""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float) -> float:
+        """
+        Take one token and return how long to wait before using it.
+
+        :param max_wait: Longest acceptable wait; no token is taken if it would be longer.
+        :raises RateLimitExceeded: If the token would only be available after ``max_wait``.
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1.0 - self._tokens) / self.rate)
+            if wait > max_wait:
+                raise RateLimitExceeded(f"No LLM request token within {max_wait:.1f}s")
+            # Tokens may go negative: later callers queue up behind this reservation
+            self._tokens -= 1.0
+            return wait
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for about ``seconds``, e.g. after the upstream reported a quota error."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets one trial call through after a cool-down."""
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; in the half-open state only one trial call does."""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release_trial(self) -> None:
+        """Give back a trial call that never reached the model, so the next call can be the trial."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures, self._opened_at, self._trial_running = 0, None, False
+
+    def record_failure(self) -> bool:
+        """Count a failed call; returns True if this opened the circuit."""
+        with self._lock:
+            self._failures += 1
+            was_open = self._opened_at is not None
+            if self._trial_running or (self.failure_threshold > 0 and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+            return self._opened_at is not None and not was_open
+
+
+class LatencyWindow:
+    """The most recent latencies of a model, for quantiles over current behaviour."""
+
+    def __init__(self, size: int):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 1) -> Optional[float]:
+        """The ``q`` quantile of the window, or None while it holds fewer than ``min_samples``."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples or len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class HedgeBudget:
+    """Earns ``ratio`` hedges per primary call, so hedging adds at most that share of extra load."""
+
+    def __init__(self, ratio: float):
+        self.ratio = max(0.0, ratio)
+        self.capacity = self.ratio * HEDGE_BUDGET_CALLS
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def spend(self) -> bool:
+        """Take one hedge from the budget; False if it has none left."""
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+
+    def refund(self) -> None:
+        with self._lock:
+            self._tokens += 1.0
+
+
+class ModelGuard:
+    """Rate limiter, concurrency limit, circuit breaker and hedging state shared by all gateways of one model."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.bucket = TokenBucket(settings.llm_requests_per_minute / 60.0, settings.llm_burst)
+        self.concurrency = threading.BoundedSemaphore(max(1, settings.llm_max_concurrency))
+        self.breaker = CircuitBreaker(settings.llm_circuit_failures, settings.llm_circuit_reset_seconds)
+        self.first_token = LatencyWindow(LATENCY_WINDOW)
+        self.hedge_budget = HedgeBudget(settings.llm_hedge_max_ratio)
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long a call may go without a first token before it is hedged; None until enough calls were seen."""
+        delay = self.first_token.quantile(settings.llm_hedge_quantile, settings.llm_hedge_min_samples)
+        if delay is None:
+            return None
+        delay = max(settings.llm_hedge_min_delay_seconds, delay)
+        metrics.LLM_HEDGE_DELAY_SECONDS.set(delay, model=self.model_name)
+        return delay
+
+    def admit_hedge(self) -> bool:
+        """Take what a hedge needs without waiting: budget, a rate limit token and a concurrency slot."""
+        if not self.hedge_budget.spend():
+            return False
+        if not self.concurrency.acquire(blocking=False):
+            self.hedge_budget.refund()
+            return False
+        try:
+            self.bucket.reserve(0.0)
+        except RateLimitExceeded:
+            self.concurrency.release()
+            self.hedge_budget.refund()
+            return False
+        return True
+
+
+def get_guard(model_name: str) -> ModelGuard:
+    with _GUARD_LOCK:
+        if model_name not in _GUARDS:
+            _GUARDS[model_name] = ModelGuard(model_name)
+        return _GUARDS[model_name]
+
+
+def hedge_pool() -> ThreadPoolExecutor:
+    """Threads that run the attempts of hedged calls while their callers wait for the first to finish."""
+    global _HEDGE_POOL
+    with _HEDGE_POOL_LOCK:
+        if _HEDGE_POOL is None:
+            _HEDGE_POOL = ThreadPoolExecutor(max_workers=max(8, 4 * settings.llm_max_concurrency),
+                                             thread_name_prefix="llm-hedge")
+        return _HEDGE_POOL
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an LLM error is worth retrying: quota and rate limits, server errors and timeouts."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return bool(RETRYABLE_ERROR.search(f"{type(error).__name__}: {error}"))
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number ``attempt`` (0-based)."""
+    return random.uniform(0.0, min(settings.llm_retry_max_seconds, settings.llm_retry_base_seconds * 2 ** attempt))
+
+
+# ---------------------------- Gateway Model --------------------------- #
+
+class LLMGateway(BaseChatModel):
+    """
+    Chat model that sends every call of the wrapped model through the guards of its model name.
+
+    Works in any LangChain chain in place of the wrapped model.
+    """
+
+    model: Any
+    model_name: str
+    fallback: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "llm_gateway"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, **(getattr(self.model, "_identifying_params", None) or {})}
+
+    def _call_fallback(self, messages: List[BaseMessage], reason: str) -> AIMessage:
+        if self.fallback is None:
+            metrics.LLM_CALLS.inc(model=self.model_name, outcome="rejected")
+            raise CircuitOpenError(f"LLM circuit for {self.model_name} is open ({reason})")
+        metrics.LLM_CALLS.inc(model=self.model_name, outcome="fallback")
+        result = self.fallback.invoke(messages)
+        # Marked so that callers such as the response cache do not keep the fallback's answer
+        return AIMessage(content=getattr(result, "content", str(result)), response_metadata={"fallback": True})
+
+    def _call(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> AIMessage:
+        guard = get_guard(self.model_name)
+        for attempt in range(settings.llm_max_retries + 1):
+            if not guard.breaker.allow():
+                return self._call_fallback(messages, "too many failures")
+
+            try:
+                wait = guard.bucket.reserve(settings.llm_rate_limit_max_wait_seconds)
+            except RateLimitExceeded:
+                # A half-open circuit would otherwise wait forever for this trial's outcome
+                guard.breaker.release_trial()
+                metrics.LLM_CALLS.inc(model=self.model_name, outcome="rate_limited")
+                raise
+            metrics.LLM_RATE_LIMIT_WAIT_SECONDS.observe(wait, model=self.model_name)
+            time.sleep(wait)
+            try:
+                if settings.llm_hedge:
+                    result = self._hedged_invoke(guard, messages, stop=stop, **kwargs)
+                else:
+                    with guard.concurrency:
+                        result = self.model.invoke(messages, stop=stop, **kwargs)
+            except Exception as e:
+                retryable = is_retryable(e)
+                # Only outages count towards the circuit; a rejected request shows the model is reachable
+                if not retryable:
+                    guard.breaker.record_success()
+                elif guard.breaker.record_failure():
+                    print(f"🔌 LLM circuit for {self.model_name} opened after repeated failures: {e}")
+                metrics.LLM_CIRCUIT_OPEN.set(float(guard.breaker.state != "closed"), model=self.model_name)
+                if not retryable or attempt == settings.llm_max_retries:
+                    metrics.LLM_CALLS.inc(model=self.model_name, outcome="error")
+                    raise
+                delay = backoff_seconds(attempt)
+                if QUOTA_ERROR.search(str(e)):
+                    guard.bucket.pause(delay)
+                metrics.LLM_CALLS.inc(model=self.model_name, outcome="retry")
+                print(f"🔁 Retrying {self.model_name} in {delay:.2f}s after: {e}")
+                time.sleep(delay)
+                continue
+
+            guard.breaker.record_success()
+            metrics.LLM_CIRCUIT_OPEN.set(0.0, model=self.model_name)
+            metrics.LLM_CALLS.inc(model=self.model_name, outcome="success")
+            return result if isinstance(result, AIMessage) else AIMessage(content=getattr(result, "content", str(result)))
+
+    def _stream_attempt(self, guard: ModelGuard, messages: List[BaseMessage], responded: threading.Event,
+                        cancelled: threading.Event, stop: Optional[List[str]] = None, **kwargs: Any) -> AIMessage:
+        """
+        Stream one attempt of a hedged call into a message. Runs on the hedge pool.
+
+        The caller has taken a concurrency slot for the attempt, which is released here.
+
+        :param responded: Set on the first chunk, or when the attempt ends without one.
+        :param cancelled: Set once another attempt won; streaming stops at the next chunk.
+        """
+        started = time.monotonic()
+        message = None
+        try:
+            stream = self.model.stream(messages, stop=stop, **kwargs)
+            try:
+                for chunk in stream:
+                    if not responded.is_set():
+                        guard.first_token.record(time.monotonic() - started)
+                        responded.set()
+                    if cancelled.is_set():
+                        break
+                    message = chunk if message is None else message + chunk
+            finally:
+                stream.close()
+        finally:
+            responded.set()
+            guard.concurrency.release()
+        if message is None:
+            return AIMessage(content="")
+        return AIMessage(content=message.content, response_metadata=getattr(message, "response_metadata", {}))
+
+    def _hedged_invoke(self, guard: ModelGuard, messages: List[BaseMessage],
+                       stop: Optional[List[str]] = None, **kwargs: Any) -> AIMessage:
+        """
+        Call the model and send the call again if it has no first token within the hedge delay.
+
+        :return: The answer of whichever attempt finishes first without an error.
+        :raises Exception: The error of the primary attempt if no attempt succeeds.
+        """
+        pool = hedge_pool()
+        cancelled = threading.Event()
+        responded = threading.Event()
+        delay = guard.hedge_delay()
+
+        guard.concurrency.acquire()
+        attempts = [pool.submit(self._stream_attempt, guard, messages, responded, cancelled, stop=stop, **kwargs)]
+        guard.hedge_budget.earn()
+        if delay is not None and not responded.wait(delay):
+            if guard.admit_hedge():
+                metrics.LLM_HEDGES.inc(model=self.model_name, outcome="sent")
+                attempts.append(pool.submit(self._stream_attempt, guard, messages, threading.Event(), cancelled,
+                                            stop=stop, **kwargs))
+            else:
+                metrics.LLM_HEDGES.inc(model=self.model_name, outcome="skipped")
+
+        errors = {}
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for attempt in done:
+                try:
+                    result = attempt.result()
+                except Exception as e:
+                    errors[attempt] = e
+                    continue
+                cancelled.set()
+                if len(attempts) > 1:
+                    outcome = "won" if attempt is attempts[1] else "lost"
+                    metrics.LLM_HEDGES.inc(model=self.model_name, outcome=outcome)
+                return result
+        raise errors.get(attempts[0]) or next(iter(errors.values()))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self._call(messages, stop=stop, **kwargs))])
+
+
+def gateway(model: Any, model_name: str, fallback: Any = None) -> LLMGateway:
+    """
+    Wrap a chat model in the gateway.
+
+    :param model: The chat model that calls the remote API.
+    :param model_name: Name the rate limit, concurrency limit and circuit are shared under.
+    :param fallback: Optional model answering while the circuit is open, e.g. the mock LLM.
+    """
+    return LLMGateway(model=model, model_name=model_name, fallback=fallback)
+
+
+def gateway_status() -> List[dict]:
+    """Circuit state of every model that has been called through the gateway."""
+    with _GUARD_LOCK:
+        guards = list(_GUARDS.values())
+    return [{"model": guard.model_name, "circuit": guard.breaker.state} for guard in guards]
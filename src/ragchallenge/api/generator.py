@@ -1,7 +1,8 @@
 
-from langchain.schema import HumanMessage, SystemMessage
-from langchain.prompts import ChatPromptTemplate
-from ragchallenge.api.llm import LLM
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from ragchallenge.api.llm import get_llm
+from ragchallenge.api.llmcache import cached_model
 from ragchallenge.api.interfaces.generator import HypotheticalQuestionGenerator
 
 # ---------------------------- Load Paraphraser --------------------------- #
@@ -25,5 +26,20 @@ prompt_template_hypothetical = ChatPromptTemplate.from_messages(
     [(msg.role, msg.content) for msg in messages_hypothetical]
 )
 
-QUESTION_GENERATOR = HypotheticalQuestionGenerator(
-    model=LLM, prompt_template=prompt_template_hypothetical)
+# Lazy-load the question generator together with the chat model
+_QUESTION_GENERATOR = None
+
+
+def get_question_generator() -> HypotheticalQuestionGenerator:
+    """Create the HypotheticalQuestionGenerator on first use."""
+    global _QUESTION_GENERATOR
+    if _QUESTION_GENERATOR is None:
+        _QUESTION_GENERATOR = HypotheticalQuestionGenerator(
+            model=cached_model(get_llm(), "questions"), prompt_template=prompt_template_hypothetical)
+    return _QUESTION_GENERATOR
+
+
+def __getattr__(name):
+    if name == "QUESTION_GENERATOR":
+        return get_question_generator()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
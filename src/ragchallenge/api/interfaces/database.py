@@ -1,37 +1,116 @@
 import os
 import re
-from typing import List
+from typing import Callable, Dict, List, Optional
 from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from langchain.schema import Document
-from transformers import BertTokenizer
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import Embeddings
 from langchain_chroma import Chroma
+from langchain_core.vectorstores import VectorStore
 
+from ragchallenge.api.chunking import SECTION_KEY, link_chunks, section_id
+
+
+# ---------------------------- Vector Backends --------------------------- #
+
+# A vector backend is any factory that returns a LangChain VectorStore, called as
+# factory(embedding_function, persist_directory, collection_name, **options).
+VECTOR_BACKENDS: Dict[str, Callable[..., VectorStore]] = {}
+
+
+def register_vector_backend(name: str, factory: Callable[..., VectorStore]) -> None:
+    """Register a vector backend factory under the given name."""
+    VECTOR_BACKENDS[name] = factory
+
+
+def create_vector_store(backend: str, embedding_function, persist_directory: str,
+                        collection_name: str = "documentation", **options) -> VectorStore:
+    """
+    Create a vector store with the named backend.
+
+    :param backend: Name of a registered backend, e.g. "chroma", "faiss" or "flat".
+    :param embedding_function: The embedding model used by the store.
+    :param persist_directory: Directory the store persists to.
+    :param collection_name: Collection name, for backends that support several per directory.
+    :param options: Backend-specific options (e.g. FAISS index type).
+    """
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend '{backend}'. Available: {', '.join(VECTOR_BACKENDS)}")
+    return VECTOR_BACKENDS[backend](embedding_function, persist_directory, collection_name, **options)
+
+
+def _create_chroma_store(embedding_function, persist_directory, collection_name, **options):
+    return Chroma(collection_name=collection_name, embedding_function=embedding_function,
+                  persist_directory=persist_directory)
+
+
+def _create_faiss_store(embedding_function, persist_directory, collection_name, **options):
+    from ragchallenge.api.interfaces.faissindex import FaissVectorStore
+    return FaissVectorStore(embedding_function=embedding_function, persist_directory=persist_directory, **options)
+
+
+def _create_flat_store(embedding_function, persist_directory, collection_name, **options):
+    from ragchallenge.api.interfaces.flatindex import FlatVectorStore
+    if FlatVectorStore.exists(persist_directory):
+        return FlatVectorStore.load(persist_directory, embedding_function, **options)
+    return FlatVectorStore(embedding_function=embedding_function, persist_directory=persist_directory)
+
+
+register_vector_backend("chroma", _create_chroma_store)
+register_vector_backend("faiss", _create_faiss_store)
+register_vector_backend("flat", _create_flat_store)
+
+
+# ---------------------------- Document Store --------------------------- #
 
 class DocumentStore:
     """Class to load, process, split documents, and create a vector store."""
 
-    def __init__(self, model_name: str = "thenlper/gte-small", device="mps", persist_directory: str = "../data/vectorstore"):
-        """Initialize the DocumentStore class with an embedding model and Chroma vector store."""
+    def __init__(self, model_name: str = "thenlper/gte-small", device="mps", persist_directory: str = "../data/vectorstore",
+                 backend: str = "chroma", backend_options: Optional[dict] = None,
+                 embedding_model: Optional[Embeddings] = None):
+        """
+        Initialize the DocumentStore class with an embedding model and a vector store.
+
+        :param model_name: The Hugging Face embedding model to use.
+        :param device: The device to run the embedding model on.
+        :param persist_directory: Directory the vector store persists to.
+        :param backend: Name of the vector backend ("chroma", "faiss" or "flat").
+        :param backend_options: Backend-specific options, e.g. the FAISS index type.
+        :param embedding_model: Optional prebuilt embedding model (e.g. ONNX); overrides model_name and device.
+        """
 
-        # Initialize the HuggingFaceEmbeddings model
-        self.embedding_model = HuggingFaceEmbeddings(
-            # multi_process=True,
-            model_name=model_name,
-            model_kwargs={'device': device},
-            encode_kwargs={'normalize_embeddings': True},
-        )
+        # Initialize the HuggingFaceEmbeddings model unless one was provided
+        if embedding_model is None:
+            from langchain_huggingface import HuggingFaceEmbeddings
+            embedding_model = HuggingFaceEmbeddings(
+                # multi_process=True,
+                model_name=model_name,
+                model_kwargs={'device': device},
+                encode_kwargs={'normalize_embeddings': True},
+            )
+        self.embedding_model = embedding_model
 
-        # Initialize the Chroma vector store
-        self.vector_store = Chroma(
-            collection_name="documentation",
+        # Initialize the vector store with the selected backend
+        self.vector_store = create_vector_store(
+            backend,
             embedding_function=self.embedding_model,
             persist_directory=persist_directory,
+            collection_name="documentation",
+            **(backend_options or {}),
         )
 
-        self.tokenizer = BertTokenizer.from_pretrained(
-            "bert-base-uncased", clean_up_tokenization_spaces=True)
+        # Only needed for token-based splitting when building a store, loaded on first use
+        self._tokenizer = None
+
+    @property
+    def tokenizer(self):
+        """The BERT tokenizer used for token-count splitting."""
+        if self._tokenizer is None:
+            from transformers import BertTokenizer
+            self._tokenizer = BertTokenizer.from_pretrained(
+                "bert-base-uncased", clean_up_tokenization_spaces=True)
+        return self._tokenizer
 
     def validate_directory(self, directory_path: str) -> None:
         """Validate the directory path."""
@@ -149,11 +228,18 @@ class DocumentStore:
         )
         return text_splitter.split_documents(documents)
 
-    def add_documents_to_vector_store(self, documents: List[Document]) -> None:
-        """Add documents to the Chroma vector store."""
-        self.vector_store.add_documents(documents)
+    def add_documents_to_vector_store(self, documents: List[Document], ids: Optional[List[str]] = None) -> None:
+        """Add documents to the vector store."""
+        self.vector_store.add_documents(documents, ids=ids)
+
+    def link_sections(self, documents: List[Document]) -> List[Document]:
+        """Give each header section a stable section ID, so its chunks can be linked to their neighbours."""
+        return [document.model_copy(update={"metadata": {
+            **document.metadata, SECTION_KEY: section_id(document.metadata.get("source", ""), position)}})
+            for position, document in enumerate(documents)]
 
-    def process_and_add_documents(database, documents: List[Document], header: str = "##", chunk_size: int = 192, chunk_overlap: int = 64) -> None:
+    def process_and_add_documents(database, documents: List[Document], header: str = "##", chunk_size: int = 192,
+                                  chunk_overlap: int = 64, link_neighbours: bool = False) -> None:
         """
         Split documents by header, chunk them by token count, and add the resulting documents to the vector store.
 
@@ -162,12 +248,16 @@ class DocumentStore:
         :param header: The header by which to split the documents.
         :param chunk_size: The maximum number of tokens in each chunk.
         :param chunk_overlap: The number of tokens to overlap between chunks.
+        :param link_neighbours: Store overlap-free chunks with section and position links instead
+            (``chunk_overlap`` is ignored); neighbours are added back at query time.
         """
         # Split the documents by header
         split_documents = database.split_documents_by_header(
             documents, header=header)
         print("Number of documents after splitting by header: ",
               len(split_documents))
+        if link_neighbours:
+            split_documents, chunk_overlap = database.link_sections(split_documents), 0
 
         # Chunk the split documents by token count
         documents_chunked = database.split_documents_by_token_count(
@@ -175,7 +265,14 @@ class DocumentStore:
         print("Number of documents after chunking: ", len(documents_chunked))
 
         # Add the chunked documents to the vector store
-        database.add_documents_to_vector_store(documents_chunked)
+        ids = link_chunks(documents_chunked) if link_neighbours else None
+        database.add_documents_to_vector_store(documents_chunked, ids=ids)
+
+    def count_documents(self) -> int:
+        """Return the number of chunks in the vector store without loading them."""
+        if isinstance(self.vector_store, Chroma):
+            return self.vector_store._collection.count()
+        return len(self.vector_store)
 
     def query_vector_store(self, query: str, k: int = 5) -> List[Document]:
         """Query the vector store using a user query and return the top-k results."""
@@ -0,0 +1,369 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from ragchallenge.api.filters import metadata_matches
+
+try:
+    import faiss
+except ImportError:  # pragma: no cover - faiss-cpu is an optional backend
+    faiss = None
+
+
+class FaissVectorStore(VectorStore):
+    """
+    Vector store backed by a FAISS index for large corpora.
+
+    Supports exact ("flat"), graph ("hnsw") and compressed inverted-file ("ivfpq") indexes over
+    L2-normalized vectors with inner-product (cosine) scoring. Texts and metadata are kept in a
+    sqlite side table keyed by the FAISS label, so only the index itself needs to be in memory,
+    and the index file can be memory-mapped on load.
+
+    Deleted and replaced chunks keep their label in the index until ``rebuild`` drops them;
+    it runs automatically once they exceed ``rebuild_ratio`` of the index.
+    """
+
+    INDEX_FILE = "faiss.index"
+    DOCSTORE_FILE = "faiss_docstore.sqlite3"
+    INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+    def __init__(self, embedding_function: Embeddings, persist_directory: Optional[str] = None,
+                 index_type: str = "flat", nlist: int = 4096, pq_m: int = 48, hnsw_m: int = 32,
+                 nprobe: int = 16, ef_search: int = 64, mmap: bool = True, rebuild_ratio: float = 0.25):
+        """
+        Initialize the FaissVectorStore, loading an existing index from ``persist_directory`` if present.
+
+        :param embedding_function: The embedding model used for queries and new texts.
+        :param persist_directory: Directory the index and docstore are saved to.
+        :param index_type: One of "flat", "hnsw" or "ivfpq".
+        :param nlist: Number of IVF cells (ivfpq only).
+        :param pq_m: Number of PQ sub-quantizers; must divide the embedding dimension (ivfpq only).
+        :param hnsw_m: Graph degree (hnsw only).
+        :param nprobe: Number of IVF cells visited per query (ivfpq only).
+        :param ef_search: Search queue size (hnsw only).
+        :param mmap: Memory-map the index file instead of reading it into RAM.
+        :param rebuild_ratio: Share of dead labels (deleted or replaced chunks) that triggers a rebuild, 0 never.
+        """
+        if faiss is None:
+            raise ImportError("The FAISS backend requires the 'faiss-cpu' package.")
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type '{index_type}'. Choose one of: {', '.join(self.INDEX_TYPES)}")
+
+        self.embedding_function = embedding_function
+        self.persist_directory = persist_directory
+        self.index_type = index_type
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.rebuild_ratio = rebuild_ratio
+
+        self.index = None
+        self._read_only = False
+        self._lock = threading.RLock()
+        # Bumped whenever labels are renumbered, so a search can tell its hits belong to an old index
+        self._generation = 0
+
+        docstore_path = os.path.join(persist_directory, self.DOCSTORE_FILE) if persist_directory else ":memory:"
+        if persist_directory:
+            os.makedirs(persist_directory, exist_ok=True)
+        self._docstore = sqlite3.connect(docstore_path, check_same_thread=False)
+        self._docstore.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "label INTEGER PRIMARY KEY, id TEXT UNIQUE, text TEXT, metadata TEXT, deleted INTEGER DEFAULT 0)"
+        )
+        self._docstore.commit()
+
+        index_path = os.path.join(persist_directory, self.INDEX_FILE) if persist_directory else None
+        if index_path and os.path.exists(index_path):
+            self._load_index(index_path, mmap)
+
+    # ---------------------------- Helpers --------------------------- #
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def __len__(self) -> int:
+        return self._docstore.execute("SELECT COUNT(*) FROM chunks WHERE deleted = 0").fetchone()[0]
+
+    @property
+    def dead_labels(self) -> int:
+        """Labels in the index without a live chunk, i.e. deleted or replaced ones."""
+        if self.index is None:
+            return 0
+        return self.index.ntotal - len(self)
+
+    def _load_index(self, index_path: str, mmap: bool) -> None:
+        """Read the index, memory-mapped if requested and supported by the index type."""
+        self.index = None
+        if mmap:
+            try:
+                self.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                self._read_only = True
+            except RuntimeError:
+                self.index = None
+        if self.index is None:
+            self.index = faiss.read_index(index_path)
+            self._read_only = False
+        self._apply_search_params()
+
+    def _apply_search_params(self) -> None:
+        if self.index_type == "ivfpq":
+            faiss.extract_index_ivf(self.index).nprobe = self.nprobe
+        elif self.index_type == "hnsw":
+            self.index.hnsw.efSearch = self.ef_search
+
+    def _create_index(self, dimension: int):
+        """Create an empty index of the configured type."""
+        if self.index_type == "flat":
+            return faiss.IndexFlatIP(dimension)
+        if self.index_type == "hnsw":
+            return faiss.IndexHNSWFlat(dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        if dimension % self.pq_m:
+            raise ValueError(f"pq_m={self.pq_m} must divide the embedding dimension {dimension}.")
+        quantizer = faiss.IndexFlatIP(dimension)
+        return faiss.IndexIVFPQ(quantizer, dimension, self.nlist, self.pq_m, 8, faiss.METRIC_INNER_PRODUCT)
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        """Return the vectors as a C-contiguous float32 matrix with unit-length rows."""
+        matrix = np.ascontiguousarray(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    # ---------------------------- Writes --------------------------- #
+
+    def add_embeddings(self, texts: List[str], embeddings, metadatas: Optional[List[dict]] = None,
+                       ids: Optional[List[str]] = None) -> List[str]:
+        """Add precomputed embeddings without re-embedding."""
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        vectors = self.normalize(embeddings)
+
+        with self._lock:
+            if self._read_only:
+                # Memory-mapped indexes cannot grow; switch to an in-memory copy first
+                self._load_index(os.path.join(self.persist_directory, self.INDEX_FILE), mmap=False)
+            if self.index is None:
+                self.index = self._create_index(vectors.shape[1])
+                self._apply_search_params()
+            if not self.index.is_trained:
+                if len(vectors) < self.nlist:
+                    raise ValueError(
+                        f"IVF-PQ training needs at least nlist={self.nlist} vectors, got {len(vectors)}. "
+                        "Add a larger first batch or lower FAISS_NLIST.")
+                self.index.train(vectors)
+
+            # FAISS labels are sequential, so the next label is the current index size
+            start = self.index.ntotal
+            self.index.add(vectors)
+            self._docstore.executemany(
+                "INSERT OR REPLACE INTO chunks (label, id, text, metadata) VALUES (?, ?, ?, ?)",
+                [(start + offset, doc_id, text, json.dumps(metadata or {}))
+                 for offset, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas))],
+            )
+            self._docstore.commit()
+
+            if not self._rebuild_if_needed() and self.persist_directory:
+                self.save()
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Embed and add texts to the index."""
+        texts = list(texts)
+        if not texts:
+            return []
+        embeddings = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Delete documents by ID.
+
+        Not every FAISS index type supports removal (HNSW does not), so rows are marked as deleted
+        in the docstore and filtered out of search results until the next rebuild.
+        """
+        if not ids:
+            return False
+        with self._lock:
+            cursor = self._docstore.executemany("UPDATE chunks SET deleted = 1 WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self._docstore.commit()
+            self._rebuild_if_needed()
+        return cursor.rowcount > 0
+
+    def _reconstruct(self, labels: np.ndarray) -> np.ndarray:
+        """Stored vectors of the given labels; approximate for ivfpq, whose codes are lossy."""
+        if self.index_type == "ivfpq":
+            faiss.extract_index_ivf(self.index).make_direct_map()
+        return np.ascontiguousarray(self.index.reconstruct_batch(labels), dtype=np.float32)
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the index from the live chunks, dropping the labels of deleted and replaced ones.
+
+        Vectors are taken from the index itself, so nothing is re-embedded; an ivfpq index keeps
+        its trained quantizer. Live chunks are renumbered in their current order.
+
+        :return: Number of labels dropped.
+        """
+        with self._lock:
+            dropped = self.dead_labels
+            if dropped == 0:
+                return 0
+            if self._read_only:
+                self._load_index(os.path.join(self.persist_directory, self.INDEX_FILE), mmap=False)
+
+            labels = np.array([row[0] for row in self._docstore.execute(
+                "SELECT label FROM chunks WHERE deleted = 0 ORDER BY label")], dtype=np.int64)
+            vectors = self._reconstruct(labels) if len(labels) else np.zeros((0, self.index.d), dtype=np.float32)
+            if self.index_type == "ivfpq":
+                index = faiss.clone_index(self.index)
+                index.reset()
+            else:
+                index = self._create_index(self.index.d)
+            if len(vectors):
+                index.add(vectors)
+
+            # Ascending order never renumbers a row onto a label that is still taken
+            self._docstore.execute("DELETE FROM chunks WHERE deleted = 1")
+            self._docstore.executemany("UPDATE chunks SET label = ? WHERE label = ?",
+                                       [(new, int(old)) for new, old in enumerate(labels) if new != old])
+            self.index = index
+            self._generation += 1
+            self._apply_search_params()
+            if self.persist_directory:
+                # Write the new index before committing the new labels, so only the rename is left between them
+                index_path = os.path.join(self.persist_directory, self.INDEX_FILE)
+                faiss.write_index(self.index, f"{index_path}.tmp")
+                self._docstore.commit()
+                os.replace(f"{index_path}.tmp", index_path)
+            else:
+                self._docstore.commit()
+        print(f"🧹 Rebuilt FAISS index: dropped {dropped} dead labels, {len(labels)} chunks remain")
+        return dropped
+
+    def _rebuild_if_needed(self) -> bool:
+        """Rebuild once dead labels exceed ``rebuild_ratio`` of the index; True if it did."""
+        if self.rebuild_ratio <= 0 or self.index is None or not self.index.ntotal:
+            return False
+        if self.dead_labels <= self.rebuild_ratio * self.index.ntotal:
+            return False
+        return self.rebuild() > 0
+
+    def save(self) -> None:
+        """Write the index atomically to the persist directory."""
+        index_path = os.path.join(self.persist_directory, self.INDEX_FILE)
+        with self._lock:
+            faiss.write_index(self.index, f"{index_path}.tmp")
+            os.replace(f"{index_path}.tmp", index_path)
+
+    # ---------------------------- Search --------------------------- #
+
+    def _fetch(self, labels: List[int]) -> dict:
+        placeholders = ",".join("?" * len(labels))
+        rows = self._docstore.execute(
+            f"SELECT label, id, text, metadata FROM chunks WHERE deleted = 0 AND label IN ({placeholders})", labels
+        ).fetchall()
+        return {label: Document(page_content=text, metadata=json.loads(metadata), id=doc_id)
+                for label, doc_id, text, metadata in rows}
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        """Documents with the given IDs; unknown and deleted IDs are skipped."""
+        ids = list(ids)
+        if not ids:
+            return []
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._docstore.execute(
+                f"SELECT id, text, metadata FROM chunks WHERE deleted = 0 AND id IN ({placeholders})", ids
+            ).fetchall()
+        return [Document(page_content=text, metadata=json.loads(metadata), id=doc_id) for doc_id, text, metadata in rows]
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        """
+        Return the top-k documents for a query vector.
+
+        :param embedding: The query embedding.
+        :param k: Number of documents to return.
+        :param filter: Optional metadata filter (see the filters module), applied to the hits.
+        :return: List of (Document, inner-product score) tuples, most similar first.
+        """
+        query = self.normalize(embedding)
+
+        # Over-fetch until enough non-deleted, matching hits are found or the whole index was covered
+        fetch_k = k
+        while True:
+            with self._lock:
+                index, generation = self.index, self._generation
+            if index is None or index.ntotal == 0 or k <= 0:
+                return []
+            # The FAISS search runs outside the lock, so searches overlap
+            scores, labels = index.search(query, min(fetch_k, index.ntotal))
+            hits = [(int(label), float(score)) for label, score in zip(labels[0], scores[0]) if label >= 0]
+            with self._lock:
+                if generation != self._generation:
+                    # A rebuild renumbered the labels after this search; search the new index
+                    continue
+                documents = self._fetch([label for label, _ in hits]) if hits else {}
+            results = [(documents[label], score) for label, score in hits
+                       if label in documents and (not filter or metadata_matches(documents[label].metadata, filter))]
+            if len(results) >= k or fetch_k >= index.ntotal:
+                return results[:k]
+            fetch_k *= 2
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are inner products of unit vectors (cosine); clip into the [0, 1] relevance range
+        return lambda score: min(1.0, max(0.0, score))
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, **kwargs: Any) -> "FaissVectorStore":
+        store = cls(embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+# Example usage of the class
+if __name__ == "__main__":
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    embeddings = HuggingFaceEmbeddings(model_name="thenlper/gte-small", model_kwargs={'device': 'cpu'})
+
+    store = FaissVectorStore.from_texts(
+        [
+            "Conda is an open-source package management system.",
+            "Git is a distributed version control system.",
+            "Regular expressions describe search patterns in text.",
+        ],
+        embedding=embeddings,
+        index_type="hnsw",
+    )
+
+    for doc, score in store.similarity_search_with_score("How do I manage packages?", k=2):
+        print(f"{score:.3f}  {doc.page_content}")
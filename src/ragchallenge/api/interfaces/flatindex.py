@@ -0,0 +1,459 @@
+import json
+import os
+import uuid
+from collections import defaultdict
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+from ragchallenge.api.filters import in_range
+from ragchallenge.api.interfaces.quantization import (
+    DEFAULT_RESCORE_FACTOR, QUANTIZATION_MODES, hamming_distances, int8_scores, quantize_binary, quantize_int8, recall_at_k, top_k)
+
+# Reads of an index that another process saves meanwhile start over with the new generation
+LOAD_ATTEMPTS = 3
+
+
+class FlatVectorStore(VectorStore):
+    """
+    Exact (brute-force) vector store for small collections.
+
+    All vectors live in one contiguous, L2-normalized float32 matrix with a parallel ID array,
+    so a query is a single matrix-vector product followed by ``argpartition``. The matrix is
+    persisted as ``.npy`` and memory-mapped on load.
+
+    With ``quantization`` set to "int8" or "binary", only the compact codes are kept in RAM and
+    scanned; the best ``k * rescore_factor`` candidates are then rescored exactly against the
+    memory-mapped float32 rows, so only those pages are touched. Quantization saves RAM, not
+    disk: the float32 matrix stays on disk for rescoring, and the codes are stored next to it.
+
+    Searches with a metadata ``filter`` (see the filters module) look the matching rows up in
+    an index from metadata values to rows, built on the first filtered search, and score only
+    those rows.
+    """
+
+    VECTORS_FILE = "flat_vectors.npy"
+    IDS_FILE = "flat_ids.npy"
+    DOCUMENTS_FILE = "flat_documents.jsonl"
+    CODES_FILE = "flat_codes_{mode}.npy"
+    SCALE_FILE = "flat_scale.npy"
+    INDEX_FILE = "flat_index.json"
+
+    def __init__(self, embedding_function: Embeddings, persist_directory: Optional[str] = None,
+                 vectors: Optional[np.ndarray] = None, ids: Optional[np.ndarray] = None,
+                 texts: Optional[List[str]] = None, metadatas: Optional[List[dict]] = None,
+                 quantization: str = "none", rescore_factor: int = DEFAULT_RESCORE_FACTOR,
+                 codes: Optional[np.ndarray] = None, scale: Optional[np.ndarray] = None):
+        """
+        Initialize the FlatVectorStore.
+
+        :param embedding_function: The embedding model used for queries and new texts.
+        :param persist_directory: Optional directory the index is saved to and loaded from.
+        :param vectors: Optional (n, d) matrix of normalized float32 vectors.
+        :param ids: Optional array of n document IDs, parallel to ``vectors``.
+        :param texts: Optional list of n document texts.
+        :param metadatas: Optional list of n metadata dicts.
+        :param quantization: "none", "int8" or "binary" codes for the first search pass.
+        :param rescore_factor: Candidates per requested result that are rescored exactly.
+        :param codes: Optional precomputed quantized codes, parallel to ``vectors``.
+        :param scale: Optional per-dimension scales for int8 codes.
+        """
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization '{quantization}'. Choose one of: {', '.join(QUANTIZATION_MODES)}")
+
+        self.embedding_function = embedding_function
+        self.persist_directory = persist_directory
+        self._vectors = vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+        self._ids = ids if ids is not None else np.empty(0, dtype=str)
+        self._texts = list(texts or [])
+        self._metadatas = list(metadatas or [{} for _ in self._texts])
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self._codes, self._scale = codes, scale
+        if self._codes is None or len(self._codes) != len(self._ids):
+            self._build_codes()
+        self._metadata_index = None
+        self._row_index = None
+
+    # ---------------------------- Helpers --------------------------- #
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        """Return the vectors as a C-contiguous float32 matrix with unit-length rows."""
+        matrix = np.ascontiguousarray(np.atleast_2d(np.asarray(vectors, dtype=np.float32)))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _build_codes(self) -> None:
+        """(Re)compute the quantized codes from the float32 matrix; the metadata and ID indexes are rebuilt lazily."""
+        self._codes, self._scale, self._metadata_index, self._row_index = None, None, None, None
+        if self.quantization == "none" or len(self) == 0:
+            return
+        if self.quantization == "int8":
+            self._codes, self._scale = quantize_int8(np.asarray(self._vectors))
+        else:
+            self._codes = quantize_binary(np.asarray(self._vectors))
+
+    def memory_usage(self) -> dict:
+        """Bytes of the float32 matrix and of the quantized codes scanned per query; on disk both are kept."""
+        vector_bytes = int(self._vectors.nbytes)
+        code_bytes = int(self._codes.nbytes) if self._codes is not None else vector_bytes
+        return {
+            "quantization": self.quantization,
+            "vector_bytes": vector_bytes,
+            "vectors_memory_mapped": isinstance(self._vectors, np.memmap),
+            "code_bytes": code_bytes,
+            "compression": round(vector_bytes / code_bytes, 1) if code_bytes else 1.0,
+            "disk_bytes": vector_bytes + (code_bytes if self._codes is not None else 0),
+        }
+
+    def _to_document(self, row: int) -> Document:
+        return Document(page_content=self._texts[row], metadata=dict(self._metadatas[row] or {}), id=str(self._ids[row]))
+
+    # ---------------------------- Writes --------------------------- #
+
+    def add_embeddings(self, texts: List[str], embeddings, metadatas: Optional[List[dict]] = None,
+                       ids: Optional[List[str]] = None) -> List[str]:
+        """Add precomputed embeddings (e.g. exported from Chroma) without re-embedding."""
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        new_vectors = self.normalize(embeddings)
+
+        # Appending copies the (possibly memory-mapped) matrix into RAM once
+        self._vectors = new_vectors if len(self) == 0 else np.vstack([self._vectors, new_vectors])
+        self._ids = np.concatenate([self._ids, np.asarray(ids, dtype=str)])
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas)
+        self._build_codes()
+
+        if self.persist_directory:
+            self.save(self.persist_directory)
+        return ids
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Embed and add texts to the index."""
+        texts = list(texts)
+        if not texts:
+            return []
+        embeddings = self.embedding_function.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas=metadatas, ids=ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete documents by ID."""
+        if not ids:
+            return False
+        keep = ~np.isin(self._ids, np.asarray(ids, dtype=str))
+        if keep.all():
+            return False
+        rows = np.flatnonzero(keep)
+        self._vectors = np.ascontiguousarray(self._vectors[rows])
+        self._ids = self._ids[rows]
+        self._texts = [self._texts[row] for row in rows]
+        self._metadatas = [self._metadatas[row] for row in rows]
+        self._build_codes()
+
+        if self.persist_directory:
+            self.save(self.persist_directory)
+        return True
+
+    # ---------------------------- Metadata Index --------------------------- #
+
+    def _build_metadata_index(self) -> dict:
+        """Map every scalar metadata value to the sorted rows carrying it, per key."""
+        postings = defaultdict(lambda: defaultdict(list))
+        for row, metadata in enumerate(self._metadatas):
+            for key, value in (metadata or {}).items():
+                if isinstance(value, (str, int, float, bool)):
+                    postings[key][value].append(row)
+        return {key: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+                for key, values in postings.items()}
+
+    def filter_rows(self, where: dict) -> np.ndarray:
+        """Sorted rows whose metadata matches a filter, looked up in the metadata index."""
+        if self._metadata_index is None:
+            self._metadata_index = self._build_metadata_index()
+
+        def union(arrays: list) -> np.ndarray:
+            return np.unique(np.concatenate(arrays)) if arrays else np.empty(0, dtype=np.int64)
+
+        rows = np.arange(len(self), dtype=np.int64)
+        for key, condition in where.items():
+            postings = self._metadata_index.get(key, {})
+            if condition is None:
+                matched = np.setdiff1d(rows, union(list(postings.values())), assume_unique=True)
+            elif isinstance(condition, dict) and "$in" in condition:
+                matched = union([postings[value] for value in condition["$in"] if value in postings])
+            elif isinstance(condition, dict):
+                matched = union([found for value, found in postings.items() if in_range(value, condition)])
+            else:
+                matched = postings.get(condition, np.empty(0, dtype=np.int64))
+            rows = np.intersect1d(rows, matched, assume_unique=True)
+            if not len(rows):
+                break
+        return rows
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        """Documents with the given IDs; unknown IDs are skipped."""
+        if self._row_index is None:
+            self._row_index = {str(doc_id): row for row, doc_id in enumerate(self._ids)}
+        rows = (self._row_index.get(doc_id) for doc_id in ids)
+        return [self._to_document(row) for row in rows if row is not None]
+
+    # ---------------------------- Search --------------------------- #
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[dict] = None,
+                                               **kwargs: Any) -> List[Tuple[Document, float]]:
+        """
+        Return the top-k documents for a query vector.
+
+        :param embedding: The query embedding.
+        :param k: Number of documents to return.
+        :param filter: Optional metadata filter; only matching rows are scored, exactly.
+        :return: List of (Document, cosine similarity) tuples, most similar first.
+        """
+        if len(self) == 0 or k <= 0:
+            return []
+        query = self.normalize(embedding)[0]
+        if filter:
+            # Sorted rows keep reads from the memory map sequential
+            candidates = self.filter_rows(filter)
+            scores = np.asarray(self._vectors[candidates]) @ query
+            order = top_k(scores, k)
+            rows, scores = candidates[order], scores[order]
+        else:
+            rows, scores = self._search_rows(query, k)
+        return [(self._to_document(int(row)), float(score)) for row, score in zip(rows, scores)]
+
+    def _search_rows(self, query: np.ndarray, k: int, exact: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the top-k row indices and their exact cosine similarities for a normalized query."""
+        if exact or self._codes is None:
+            scores = self._vectors @ query
+            rows = top_k(scores, k)
+            return rows, scores[rows]
+
+        # First pass over the compact codes
+        num_candidates = k * self.rescore_factor
+        if self.quantization == "int8":
+            candidates = top_k(int8_scores(self._codes, self._scale, query), num_candidates)
+        else:
+            query_code = quantize_binary(query[np.newaxis, :])[0]
+            candidates = top_k(hamming_distances(self._codes, query_code), num_candidates, largest=False)
+
+        # Exact rescoring of the candidates; sorted rows keep reads from the memory map sequential
+        candidates = np.sort(candidates)
+        exact_scores = np.asarray(self._vectors[candidates]) @ query
+        order = top_k(exact_scores, k)
+        return candidates[order], exact_scores[order]
+
+    def check_recall(self, k: int = 10, num_queries: int = 100, seed: int = 0) -> dict:
+        """
+        Measure recall@k of the quantized search against exact float32 search.
+
+        Queries are stored vectors with Gaussian noise added, so results do not trivially match themselves.
+
+        :param k: Number of results compared per query.
+        :param num_queries: Number of sampled queries.
+        :param seed: Random seed for sampling and noise.
+        :return: Dict with the mean recall@k and the memory usage of the index.
+        """
+        report = {"k": k, "num_queries": 0, "recall_at_k": 1.0, **self.memory_usage()}
+        if len(self) == 0 or self._codes is None:
+            return report
+
+        rng = np.random.default_rng(seed)
+        sample = rng.choice(len(self), size=min(num_queries, len(self)), replace=False)
+        queries = np.asarray(self._vectors[np.sort(sample)])
+        queries = self.normalize(queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32))
+
+        recalls = [recall_at_k(self._search_rows(query, k, exact=True)[0], self._search_rows(query, k)[0])
+                   for query in queries]
+        report.update(num_queries=len(recalls), recall_at_k=round(float(np.mean(recalls)), 4))
+        return report
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_with_score_by_vector(embedding, k=k, **kwargs)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Scores are already cosine similarities; clip into the [0, 1] relevance range
+        return lambda score: min(1.0, max(0.0, score))
+
+    # ---------------------------- Persistence --------------------------- #
+
+    def save(self, directory: str) -> None:
+        """
+        Persist the index as .npy matrices plus a JSONL file of texts and metadata.
+
+        Every save writes a new generation of files and then replaces the index file that names
+        them and their row count, so a reader in another process loads either the old or the new
+        generation, never a mix of both. Files of older generations are removed afterwards;
+        readers that memory-mapped them keep their open copies.
+        """
+        os.makedirs(directory, exist_ok=True)
+        generation = uuid.uuid4().hex[:12]
+        files = {}
+
+        def write(key: str, filename: str, writer) -> None:
+            name = filename.replace(".", f".{generation}.", 1)
+            with open(os.path.join(directory, name), "wb") as file:
+                writer(file)
+            files[key] = name
+
+        def write_documents(file) -> None:
+            for text, metadata in zip(self._texts, self._metadatas):
+                record = {"text": text, "metadata": metadata or {}}
+                file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+        write("documents", self.DOCUMENTS_FILE, write_documents)
+        write("ids", self.IDS_FILE, lambda file: np.save(file, self._ids))
+        write("vectors", self.VECTORS_FILE,
+              lambda file: np.save(file, np.ascontiguousarray(self._vectors, dtype=np.float32)))
+        if self._codes is not None:
+            write(f"codes_{self.quantization}", self.CODES_FILE.format(mode=self.quantization),
+                  lambda file: np.save(file, self._codes))
+        if self._scale is not None:
+            write("scale", self.SCALE_FILE, lambda file: np.save(file, self._scale))
+
+        # The index file is replaced last: it is what makes the new generation visible
+        index = {"generation": generation, "rows": len(self), "files": files}
+        temporary = os.path.join(directory, f"{self.INDEX_FILE}.tmp")
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(index, file)
+        os.replace(temporary, os.path.join(directory, self.INDEX_FILE))
+
+        current = set(files.values())
+        for name in os.listdir(directory):
+            if name.startswith("flat_") and name.endswith((".npy", ".jsonl")) and name not in current:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        """Check whether a persisted flat index is present in the directory."""
+        return os.path.exists(os.path.join(directory, cls.INDEX_FILE)) or all(
+            os.path.exists(os.path.join(directory, name)) for name in (cls.VECTORS_FILE, cls.IDS_FILE, cls.DOCUMENTS_FILE))
+
+    @classmethod
+    def _read_index(cls, directory: str) -> dict:
+        """The index file of the current generation; indexes saved before generations existed get one made up."""
+        try:
+            with open(os.path.join(directory, cls.INDEX_FILE), "r", encoding="utf-8") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            files = {"documents": cls.DOCUMENTS_FILE, "ids": cls.IDS_FILE, "vectors": cls.VECTORS_FILE,
+                     "scale": cls.SCALE_FILE}
+            files.update({f"codes_{mode}": cls.CODES_FILE.format(mode=mode) for mode in QUANTIZATION_MODES})
+            return {"generation": None, "rows": None, "files": files}
+
+    @classmethod
+    def load(cls, directory: str, embedding_function: Embeddings, mmap: bool = True,
+             quantization: str = "none", rescore_factor: int = DEFAULT_RESCORE_FACTOR) -> "FlatVectorStore":
+        """
+        Load a persisted index.
+
+        :param directory: Directory containing the index files.
+        :param embedding_function: The embedding model used for queries.
+        :param mmap: Memory-map the vector matrix instead of reading it into RAM.
+        :param quantization: "none", "int8" or "binary"; codes are read from disk or rebuilt if missing.
+        :param rescore_factor: Candidates per requested result that are rescored exactly.
+        :raises ValueError: If the files of the index do not hold the same number of rows.
+        """
+        for attempt in range(LOAD_ATTEMPTS):
+            index = cls._read_index(directory)
+            try:
+                return cls._load_generation(directory, index, embedding_function, mmap, quantization, rescore_factor)
+            except FileNotFoundError:
+                # A writer replaced the generation between reading the index and opening its files
+                if attempt == LOAD_ATTEMPTS - 1 or index["generation"] is None:
+                    raise
+
+    @classmethod
+    def _load_generation(cls, directory: str, index: dict, embedding_function: Embeddings, mmap: bool,
+                         quantization: str, rescore_factor: int) -> "FlatVectorStore":
+        files = index["files"]
+
+        def path(key: str) -> Optional[str]:
+            return os.path.join(directory, files[key]) if key in files else None
+
+        vectors = np.load(path("vectors"), mmap_mode="r" if mmap else None)
+        ids = np.load(path("ids"))
+
+        # Quantized codes are read fully into RAM, they are what every query scans
+        codes, scale = None, None
+        codes_path = path(f"codes_{quantization}")
+        if quantization != "none" and codes_path and os.path.exists(codes_path):
+            codes = np.load(codes_path)
+            if quantization == "int8":
+                scale_path = path("scale")
+                scale = np.load(scale_path) if scale_path and os.path.exists(scale_path) else None
+                codes = codes if scale is not None else None
+
+        texts, metadatas = [], []
+        with open(path("documents"), "r", encoding="utf-8") as file:
+            for line in file:
+                record = json.loads(line)
+                texts.append(record["text"])
+                metadatas.append(record["metadata"])
+
+        rows = {"documents": len(texts), "ids": len(ids), "vectors": vectors.shape[0]}
+        if codes is not None:
+            rows["codes"] = codes.shape[0]
+        if index["rows"] is not None:
+            rows["index"] = index["rows"]
+        if len(set(rows.values())) > 1:
+            raise ValueError(f"Flat index in {directory} is inconsistent, rows per file: {rows}")
+
+        return cls(embedding_function=embedding_function, persist_directory=directory,
+                   vectors=vectors, ids=ids, texts=texts, metadatas=metadatas,
+                   quantization=quantization, rescore_factor=rescore_factor, codes=codes, scale=scale)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   ids: Optional[List[str]] = None, persist_directory: Optional[str] = None,
+                   **kwargs: Any) -> "FlatVectorStore":
+        store = cls(embedding_function=embedding, persist_directory=persist_directory, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+# Example usage of the class
+if __name__ == "__main__":
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    embeddings = HuggingFaceEmbeddings(model_name="thenlper/gte-small", model_kwargs={'device': 'cpu'})
+
+    store = FlatVectorStore.from_texts(
+        [
+            "Conda is an open-source package management system.",
+            "Git is a distributed version control system.",
+            "Regular expressions describe search patterns in text.",
+        ],
+        embedding=embeddings,
+    )
+
+    for doc, score in store.similarity_search_with_score("How do I manage packages?", k=2):
+        print(f"{score:.3f}  {doc.page_content}")
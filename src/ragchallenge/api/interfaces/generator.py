@@ -1,9 +1,9 @@
 import os
 from typing import List
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import SystemMessage, HumanMessage
-from langchain_huggingface import ChatHuggingFace
-from langchain_huggingface import HuggingFaceEndpoint
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from ragchallenge.api.tracing import span
 
 
 class HypotheticalQuestionGenerator:
@@ -38,8 +38,9 @@ class HypotheticalQuestionGenerator:
         input_dict = {"text": document}
 
         # Invoke the chain to get the hypothetical questions
-        hypothetical_questions = self.hypothetical_question_chain.invoke(
-            input_dict)
+        with span("llm.generate_questions"):
+            hypothetical_questions = self.hypothetical_question_chain.invoke(
+                input_dict)
 
         return hypothetical_questions
 
@@ -50,6 +51,8 @@ class HypotheticalQuestionGenerator:
 
 # Example usage of the class
 if __name__ == "__main__":
+    from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
     # Define the prompt template to generate hypothetical questions
     messages_hypothetical = [
         SystemMessage(
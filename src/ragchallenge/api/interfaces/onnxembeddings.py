@@ -0,0 +1,194 @@
+import inspect
+import os
+import re
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Minimum cosine similarity to the PyTorch embeddings, by quantization: float32 exports should
+# be numerically identical; int8 trades a little accuracy for speed
+TOLERANCE = {False: 0.9999, True: 0.99}
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings computed with ONNX Runtime on CPU.
+
+    The Hugging Face encoder is exported to ONNX once (optionally with dynamic int8 weight
+    quantization) and cached on disk; afterwards only ``onnxruntime`` and the tokenizer are needed.
+    Mean pooling over the attention mask reproduces the sentence-transformers output of gte-small,
+    so vectors stay compatible with stores built by ``HuggingFaceEmbeddings``.
+    """
+
+    def __init__(self, model_name: str = "thenlper/gte-small", cache_dir: str = "data/onnx",
+                 quantize: bool = False, num_threads: int = 0, normalize: bool = False,
+                 batch_size: int = 32, max_length: int = 512):
+        """
+        Initialize the OnnxEmbeddings class, exporting the model if no cached export exists.
+
+        :param model_name: The Hugging Face encoder to export.
+        :param cache_dir: Directory for the exported (and quantized) ONNX files.
+        :param quantize: Use dynamic int8 quantization of the weights.
+        :param num_threads: Intra-op threads for ONNX Runtime, 0 for one per physical core.
+        :param normalize: Return unit-length vectors.
+        :param batch_size: Number of texts encoded per session run.
+        :param max_length: Maximum number of tokens per text.
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+        model_dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9._-]", "_", model_name))
+        self.model_path = self.export(model_name, model_dir, quantize=quantize)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = num_threads or self.physical_cores()
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(self.model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    @staticmethod
+    def physical_cores() -> int:
+        """Number of physical cores; hyper-threads rarely help GEMM-bound inference."""
+        try:
+            import psutil
+            return psutil.cpu_count(logical=False) or os.cpu_count() or 1
+        except ImportError:
+            return max(1, (os.cpu_count() or 2) // 2)
+
+    @staticmethod
+    def export(model_name: str, model_dir: str, quantize: bool = False) -> str:
+        """
+        Export the encoder to ONNX (and quantize it) unless a cached file already exists.
+
+        :param model_name: The Hugging Face encoder to export.
+        :param model_dir: Directory for the exported files.
+        :param quantize: Also write a dynamically int8-quantized copy and return its path.
+        :return: Path of the ONNX file to load.
+        """
+        model_path = os.path.join(model_dir, "model.onnx")
+        quantized_path = os.path.join(model_dir, "model_int8.onnx")
+
+        if not os.path.exists(model_path):
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
+            print(f"📦 Exporting {model_name} to ONNX...")
+            os.makedirs(model_dir, exist_ok=True)
+            tokenizer = AutoTokenizer.from_pretrained(model_name)
+            model = AutoModel.from_pretrained(model_name).eval()
+            sample = tokenizer(["export sample"], return_tensors="pt")
+            # Positional inputs must follow forward(), which differs from the tokenizer's key order
+            parameters = list(inspect.signature(model.forward).parameters)
+            input_names = sorted(sample.keys(), key=parameters.index)
+            dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+            with torch.no_grad():
+                torch.onnx.export(
+                    model,
+                    tuple(sample[name] for name in input_names),
+                    f"{model_path}.tmp",
+                    input_names=input_names,
+                    output_names=["last_hidden_state"],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=17,
+                )
+            os.replace(f"{model_path}.tmp", model_path)
+
+        if not quantize:
+            return model_path
+
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            print(f"🗜️  Quantizing {model_path} to int8...")
+            quantize_dynamic(model_path, f"{quantized_path}.tmp", weight_type=QuantType.QInt8)
+            os.replace(f"{quantized_path}.tmp", quantized_path)
+        return quantized_path
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_length,
+                                 return_tensors="np")
+        inputs = {name: encoded[name].astype(np.int64) for name in self.input_names}
+        hidden_state = self.session.run(["last_hidden_state"], inputs)[0]
+
+        # Mean pooling over non-padding tokens
+        mask = encoded["attention_mask"][..., np.newaxis].astype(np.float32)
+        embeddings = (hidden_state * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in length-sorted batches, which keeps padding (and wasted compute) small."""
+        texts = [text.replace("\n", " ") for text in texts]
+        order = sorted(range(len(texts)), key=lambda index: len(texts[index]))
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for index, vector in zip(batch, self._encode_batch([texts[index] for index in batch])):
+                embeddings[index] = vector.tolist()
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def compare_embeddings(reference: Embeddings, candidate: Embeddings, texts: List[str]) -> dict:
+    """
+    Compare two embedding models on the same texts.
+
+    :param reference: The reference model, e.g. HuggingFaceEmbeddings.
+    :param candidate: The model to check, e.g. OnnxEmbeddings.
+    :param texts: Texts to embed with both models.
+    :return: Dict with the minimum and mean cosine similarity and the maximum absolute difference.
+    """
+    expected = np.asarray(reference.embed_documents(texts), dtype=np.float32)
+    actual = np.asarray(candidate.embed_documents(texts), dtype=np.float32)
+    cosine = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1))
+    return {
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+    }
+
+
+# Check compatibility and speed against the PyTorch model
+if __name__ == "__main__":
+    import time
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    texts = [
+        "Conda is an open-source package management system.",
+        "To initialize a new repository, run git init in the project directory.",
+        "Regular expressions describe search patterns in text.",
+        "SELECT name FROM employees WHERE salary > 50000 ORDER BY name;",
+    ] * 16
+
+    reference = HuggingFaceEmbeddings(model_name="thenlper/gte-small", model_kwargs={'device': 'cpu'})
+    start = time.perf_counter()
+    reference.embed_documents(texts)
+    print(f"torch:        {len(texts) / (time.perf_counter() - start):.1f} texts/s")
+
+    for quantize in (False, True):
+        candidate = OnnxEmbeddings(model_name="thenlper/gte-small", quantize=quantize)
+        start = time.perf_counter()
+        candidate.embed_documents(texts)
+        label = "onnx int8:" if quantize else "onnx fp32:"
+        print(f"{label:<13} {len(texts) / (time.perf_counter() - start):.1f} texts/s")
+
+        report = compare_embeddings(reference, candidate, texts)
+        status = "✅" if report["min_cosine"] >= TOLERANCE[quantize] else "❌"
+        print(f"{status} {report}")
@@ -1,8 +1,8 @@
 import os
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import SystemMessage, HumanMessage
-from langchain_huggingface import ChatHuggingFace
-from langchain_huggingface import HuggingFaceEndpoint
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from ragchallenge.api.tracing import span
 
 
 class QueryParaphraser:
@@ -37,13 +37,16 @@ class QueryParaphraser:
         input_dict = {"question": question}
 
         # Invoke the chain to get the paraphrased questions
-        paraphrased_questions = self.paraphrasing_chain.invoke(input_dict)
+        with span("llm.paraphrase"):
+            paraphrased_questions = self.paraphrasing_chain.invoke(input_dict)
 
         return paraphrased_questions
 
 
 # Example usage of the class
 if __name__ == "__main__":
+    from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
     # Define the prompt template to paraphrase the question
     messages = [
         SystemMessage(
@@ -0,0 +1,71 @@
+from typing import Tuple
+
+import numpy as np
+
+QUANTIZATION_MODES = ("none", "int8", "binary")
+
+# Candidates per requested result that are rescored exactly, unless configured otherwise
+DEFAULT_RESCORE_FACTOR = 8
+
+# Rows scored per block, bounding the float32 temporaries created while scanning int8 codes
+BLOCK_ROWS = 65536
+
+# Popcount of every byte value, for numpy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scalar-quantize float vectors to int8 with one scale per dimension.
+
+    :param vectors: (n, d) float32 matrix.
+    :return: Tuple of the (n, d) int8 codes and the (d,) float32 scales.
+    """
+    scale = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+    scale = np.where(scale == 0, 1.0, scale).astype(np.float32)
+    codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """Binary-quantize float vectors by sign, packed into (n, ceil(d / 8)) uint8 codes."""
+    return np.packbits(vectors > 0, axis=1)
+
+
+def int8_scores(codes: np.ndarray, scale: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Approximate dot products between a float query and int8 codes (higher is more similar)."""
+    weighted_query = (query * scale).astype(np.float32)
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), BLOCK_ROWS):
+        block = codes[start:start + BLOCK_ROWS]
+        scores[start:start + len(block)] = block.astype(np.float32) @ weighted_query
+    return scores
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """Hamming distances between packed binary codes and a packed query (lower is more similar)."""
+    xor = np.bitwise_xor(codes, query_code)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT[xor].sum(axis=1, dtype=np.int32)
+
+
+def top_k(scores: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """Return the indices of the k best scores, best first."""
+    keyed = -scores if largest else scores
+    k = min(k, len(keyed))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < len(keyed):
+        candidates = np.argpartition(keyed, k - 1)[:k]
+    else:
+        candidates = np.arange(len(keyed))
+    return candidates[np.argsort(keyed[candidates], kind="stable")]
+
+
+def recall_at_k(exact: np.ndarray, approximate: np.ndarray) -> float:
+    """Fraction of the exact top-k results that were also found by the approximate search."""
+    exact_set = set(np.asarray(exact).tolist())
+    if not exact_set:
+        return 1.0
+    return len(exact_set.intersection(np.asarray(approximate).tolist())) / len(exact_set)
@@ -1,10 +1,8 @@
 import os
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import SystemMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
-from langchain_huggingface import ChatHuggingFace
-from langchain_huggingface import HuggingFaceEndpoint
 
 
 class QuestionAnsweringWithRAG:
@@ -42,6 +40,8 @@ class QuestionAnsweringWithRAG:
 
 # Example usage of the class
 if __name__ == "__main__":
+    from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
 
     # Define the prompt template to generate an answer based on context
     messages = [
@@ -1,17 +1,29 @@
 import os
-from typing import List
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import SystemMessage, HumanMessage
+import time
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import SystemMessage, HumanMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
-from langchain_huggingface import ChatHuggingFace
-from langchain_huggingface import HuggingFaceEndpoint
+
+from ragchallenge.api import metrics
+from ragchallenge.api.chunking import expand_neighbours
+from ragchallenge.api.filters import search_options
+from ragchallenge.api.relevance import cosine_search, select_adaptive
+from ragchallenge.api.tracing import span
+
+# Returned without calling the LLM when no retrieved chunk clears the relevance gate
+NO_RELEVANT_CONTEXT_ANSWER = ("I don't have enough information to answer that question based on the provided "
+                              "documents.")
 
 
 class QuestionAnsweringWithQueryExpansion:
     """Class to perform Question Answering with Query Expansion using Hypothetical Question Generation."""
 
-    def __init__(self, model, prompt_template: ChatPromptTemplate, knowledge_vector_database=None, question_generator=None):
+    def __init__(self, model, prompt_template: ChatPromptTemplate, knowledge_vector_database=None, question_generator=None,
+                 knowledge_base_type: str = "default", neighbour_window: int = 0, max_k: int = 1,
+                 min_score: float = 0.0, score_cliff: float = 1.0, gate_min_score: Optional[float] = None):
         """
         Initialize the QuestionAnsweringWithQueryExpansion class with an optional knowledge vector database,
         LLM, prompt template, and optional question generator.
@@ -20,13 +32,27 @@ class QuestionAnsweringWithQueryExpansion:
         :param prompt_template: A LangChain ChatPromptTemplate for answering questions.
         :param knowledge_vector_database: Optional knowledge vector database for retrieval (if provided).
         :param question_generator: Optional question generator for generating alternative queries.
+        :param knowledge_base_type: Label for metrics ("default", "personal" or "combined").
+        :param neighbour_window: Chunks added before and after each hit of an overlap-free store
+            (see the chunking module); 0 keeps hits as they are.
+        :param max_k: Most chunks retrieved per query; fewer are kept when their scores fall off.
+        :param min_score: Chunks with a lower cosine similarity to the query are not used.
+        :param score_cliff: Chunks scoring more than this below the previous chunk are not used.
+        :param gate_min_score: If no retrieved chunk reaches this cosine similarity, the question is
+            answered with ``NO_RELEVANT_CONTEXT_ANSWER`` without calling the LLM; None always calls it.
         """
         self.prompt_template = prompt_template
+        self.knowledge_base_type = knowledge_base_type
         self.model = model
         self.question_generator = question_generator
         self.retriever = knowledge_vector_database.as_retriever(
         ) if knowledge_vector_database else RunnablePassthrough()
         self.knowledge_vector_database = knowledge_vector_database
+        self.neighbour_window = neighbour_window
+        self.max_k = max_k
+        self.min_score = min_score
+        self.score_cliff = score_cliff
+        self.gate_min_score = gate_min_score
 
         # Define the retrieval chain
         self.retrieval_chain = (
@@ -48,31 +74,97 @@ class QuestionAnsweringWithQueryExpansion:
         #     return [question] + self.question_generator.rephrase(question)
         # return [question]
 
-    def retrieve_documents(self, questions: List[str], k: int = 1) -> List[str]:
-        """Retrieve documents from the vector store for each question."""
-        documents = []
-        for q in questions:
-            retrieved_docs = self.knowledge_vector_database.similarity_search(
-                q, k=k)  # Retrieve 1 document per query
-            documents.extend([doc.page_content for doc in retrieved_docs])
+    def retrieve_scored(self, questions: List[str], k: Optional[int] = None,
+                        where: Optional[dict] = None) -> List[Tuple[Document, float]]:
+        """
+        Retrieve chunks with their cosine similarity for each question.
+
+        :param questions: The queries to search for.
+        :param k: Fixed number of chunks per query. By default up to ``max_k`` are fetched and
+            only the leading ones above ``min_score`` and before a relevance cliff are kept.
+        :param where: Optional metadata filter (see the filters module), applied inside the search.
+        """
+        kb_type = self.knowledge_base_type
+        options = search_options(self.knowledge_vector_database, where)
+        fetch_k = k or self.max_k
+
+        def select(results: List[Tuple[Document, float]]) -> List[Tuple[Document, float]]:
+            return results if k else select_adaptive(results, self.min_score, self.score_cliff)
+
+        embedding_function = getattr(self.knowledge_vector_database, "embeddings", None)
+        if embedding_function is None:
+            with span("search", queries=len(questions)), metrics.STAGE_SECONDS.time(stage="search", kb_type=kb_type):
+                return [result for q in questions for result in select(
+                    self.knowledge_vector_database.similarity_search_with_relevance_scores(q, k=fetch_k, **options))]
+
+        # Embed all queries in one batch, then search by vector so both stages are timed separately
+        with span("embedding", queries=len(questions)), metrics.STAGE_SECONDS.time(stage="embedding", kb_type=kb_type):
+            query_vectors = embedding_function.embed_documents(questions)
+
+        results = []
+        with span("search", k=fetch_k, filtered=bool(where)), metrics.STAGE_SECONDS.time(stage="search", kb_type=kb_type):
+            for vector in query_vectors:
+                results.extend(select(cosine_search(self.knowledge_vector_database, vector, fetch_k, **options)))
 
-        return documents
+        return results
 
-    def answer_question(self, question: str) -> str:
+    def retrieve_documents(self, questions: List[str], k: Optional[int] = None, where: Optional[dict] = None) -> List[str]:
+        """
+        Retrieve documents from the vector store for each question.
+
+        :param questions: The queries to search for.
+        :param k: Fixed number of documents per query; chosen by score by default (see ``retrieve_scored``).
+        :param where: Optional metadata filter (see the filters module), applied inside the search.
+        """
+        documents = [document for document, _ in self.retrieve_scored(questions, k=k, where=where)]
+        return [doc.page_content for doc in self.expand_neighbours(documents)]
+
+    def expand_neighbours(self, documents: list) -> list:
+        """Add the neighbouring chunks of each hit from an overlap-free store."""
+        if self.neighbour_window <= 0 or not documents:
+            return documents
+        with span("neighbours", window=self.neighbour_window), \
+                metrics.STAGE_SECONDS.time(stage="neighbours", kb_type=self.knowledge_base_type):
+            return expand_neighbours(self.knowledge_vector_database, documents, self.neighbour_window)
+
+    def answer_question(self, question: str, where: Optional[dict] = None) -> str:
         """
         Answer a question using the LLM, optionally expanding the query and retrieving additional context.
 
         :param question: The question to answer.
+        :param where: Optional metadata filter restricting which chunks are retrieved.
         :return: The generated answer.
         """
+        kb_type = self.knowledge_base_type
+        start = time.perf_counter()
+
         # Expand the query using the hypothetical question generator
-        questions = self.expand_query(question)
+        with span("expansion"), metrics.STAGE_SECONDS.time(stage="expansion", kb_type=kb_type):
+            questions = self.expand_query(question)
         
         # Retrieve documents for each query (original + expanded)
-        context_documents = self.retrieve_documents(questions)
+        scored_documents = self.retrieve_scored(questions, where=where)
+        
+        # Skip the LLM when nothing relevant was found, its answer could only be a refusal
+        if self.gate_min_score is not None and not any(score >= self.gate_min_score for _, score in scored_documents):
+            best = max((score for _, score in scored_documents), default=float("nan"))
+            print(f"🚧 No chunk reached the relevance gate ({self.gate_min_score}, best {best:.3f}) "
+                  f"for question: '{question}'")
+            metrics.GATED_QUESTIONS.inc(kb_type=kb_type)
+            metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="total", kb_type=kb_type)
+            return {
+                "answer": NO_RELEVANT_CONTEXT_ANSWER,
+                "question": questions,
+                "documents": [],
+                "no_relevant_context": True
+            }
+        context_documents = [doc.page_content for doc in self.expand_neighbours(
+            [document for document, _ in scored_documents])]
         
         # Combine the retrieved documents into one context string
         context = "\n".join(context_documents)
+        metrics.RETRIEVED_CHUNKS.observe(len(context_documents), kb_type=kb_type)
+        metrics.PROMPT_CHARACTERS.observe(len(context), kb_type=kb_type)
         
         # Debug information
         print(f"🔍 Retrieved {len(context_documents)} documents for question: '{question}'")
@@ -83,20 +175,26 @@ class QuestionAnsweringWithQueryExpansion:
             context = "No relevant information found in the knowledge base."
         
         # Invoke the retrieval chain with the combined context and original question
+        metrics.PROMPT_TOKENS.inc(metrics.estimate_tokens(context) + metrics.estimate_tokens(question), kb_type=kb_type)
         try:
-            answer = self.retrieval_chain.invoke({
-                "context": context, 
-                "question": question
-            })
+            with span("llm.answer", prompt_characters=len(context)), \
+                    metrics.STAGE_SECONDS.time(stage="llm", kb_type=kb_type):
+                answer = self.retrieval_chain.invoke({
+                    "context": context, 
+                    "question": question
+                })
             print(f"✅ Generated answer length: {len(answer)} characters")
         except Exception as e:
+            metrics.LLM_ERRORS.inc(kb_type=kb_type)
             print(f"❌ Error generating answer: {e}")
             answer = f"Sorry, I encountered an error while generating the answer: {str(e)}"
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - start, stage="total", kb_type=kb_type)
 
         response = {
             "answer": answer, 
             "question": questions,
-            "documents": context_documents
+            "documents": context_documents,
+            "no_relevant_context": False
         }
 
         return response
@@ -104,6 +202,8 @@ class QuestionAnsweringWithQueryExpansion:
 
 # Example usage of the class
 if __name__ == "__main__":
+    from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
     # Define the prompt template to generate an answer based on context
     messages = [
         SystemMessage(
@@ -1,5 +1,5 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from ragchallenge.api.config import settings
+from ragchallenge.api.gateway import LLMGateway, gateway, pooled_client
 import os
 
 # ---------------------------- Load Model ---------------------------
@@ -14,9 +14,6 @@ generation_params = {
     "top_p": 0.9,
 }
 
-# Try to initialize Gemini LLM
-print("🔄 Initializing Gemini LLM...")
-
 # Create a simple mock LLM for testing that matches LangChain interface
 from langchain_core.language_models.base import BaseLanguageModel
 from langchain_core.messages import BaseMessage, AIMessage
@@ -125,16 +122,152 @@ The system is ready to process your documents once they are uploaded."""
     async def apredict_messages(self, messages: List[BaseMessage], *, stop: Optional[List[str]] = None, **kwargs: Any) -> BaseMessage:
         return self.predict_messages(messages, stop=stop, **kwargs)
 
-# Try to create the Google Gemini LLM, fallback to mock if it fails
-try:
-    LLM = ChatGoogleGenerativeAI(
+
+# Latency-simulating chat model for load tests, no network access needed
+import asyncio
+import math
+import random
+import time
+from typing import Iterator
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class StubLLMError(RuntimeError):
+    """Simulated upstream failure raised by StubChatModel."""
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model that behaves like a remote LLM without calling one.
+
+    Time to first token is drawn from a log-normal distribution, the rest of the answer is
+    produced at a fixed token rate, and a configurable fraction of calls fails.
+    """
+
+    latency_median_ms: float = 800.0
+    latency_sigma: float = 0.5
+    tokens_per_second: float = 50.0
+    output_tokens: int = 64
+    error_rate: float = 0.0
+    seed: Optional[int] = None
+
+    _random: random.Random = PrivateAttr(default=None)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._random = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub_chat"
+
+    def _plan(self, messages: List[BaseMessage]):
+        """Sample the delays for one call and build its answer tokens."""
+        if self._random.random() < self.error_rate:
+            raise StubLLMError("Simulated LLM failure (429 Resource has been exhausted)")
+        first_token_s = self._random.lognormvariate(math.log(self.latency_median_ms / 1000.0), self.latency_sigma)
+        token_interval_s = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+        question = str(messages[-1].content)[-200:] if messages else ""
+        words = f"Stub answer to: {question}".split()
+        lines = [" ".join(words[:12])] + [f"Stub line {index}" for index in range(1, 3)]
+        tokens = " \n".join(lines).split(" ")
+        tokens = (tokens + ["stub"] * self.output_tokens)[:max(self.output_tokens, len(lines))]
+        return first_token_s, token_interval_s, tokens
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        first_token_s, token_interval_s, tokens = self._plan(messages)
+        time.sleep(first_token_s)
+        for index, token in enumerate(tokens):
+            if index:
+                time.sleep(token_interval_s)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token if index == 0 else f" {token}"))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        first_token_s, token_interval_s, tokens = self._plan(messages)
+        time.sleep(first_token_s + token_interval_s * (len(tokens) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(tokens)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        first_token_s, token_interval_s, tokens = self._plan(messages)
+        await asyncio.sleep(first_token_s + token_interval_s * (len(tokens) - 1))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(tokens)))])
+
+
+def create_stub_llm() -> StubChatModel:
+    """Create the stub chat model from the STUB_LLM_* settings."""
+    return StubChatModel(
+        latency_median_ms=settings.stub_llm_latency_median_ms,
+        latency_sigma=settings.stub_llm_latency_sigma,
+        tokens_per_second=settings.stub_llm_tokens_per_second,
+        output_tokens=settings.stub_llm_output_tokens,
+        error_rate=settings.stub_llm_error_rate,
+    )
+
+
+def gateway_fallback():
+    """Model answering while a gateway circuit is open, per ``llm_circuit_fallback``."""
+    return MockLLM() if settings.llm_circuit_fallback == "mock" else None
+
+
+def create_gemini_llm(**params) -> LLMGateway:
+    """
+    Gemini chat model behind the LLM gateway, pooled with every other caller using the same parameters.
+
+    :param params: Generation parameters, e.g. temperature and max_output_tokens.
+    """
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    # The gateway retries, so the client itself fails fast instead of retrying on its own
+    key = ("gemini", settings.chat_model, tuple(sorted(params.items())))
+    client = pooled_client(key, lambda: ChatGoogleGenerativeAI(
         model=settings.chat_model,
         google_api_key=settings.google_api_key,
-        **generation_params,
-    )
-    print(f"✅ Successfully initialized Gemini LLM: {settings.chat_model}")
-except Exception as e:
-    print(f"❌ Warning: Could not initialize Gemini LLM: {e}")
-    print("🔄 Falling back to mock LLM...")
-    LLM = MockLLM()
-    print(f"✅ Mock LLM initialized as fallback")
+        max_retries=0,
+        **params,
+    ))
+    return gateway(client, settings.chat_model, fallback=gateway_fallback())
+
+
+# Lazy-load the chat model on first use (or during warmup) instead of at import
+_LLM = None
+
+
+def get_llm():
+    """Create the configured chat model once; Gemini falls back to the mock if it cannot be created."""
+    global _LLM
+    if _LLM is not None:
+        return _LLM
+
+    if settings.llm_provider == "stub":
+        _LLM = gateway(create_stub_llm(), "stub", fallback=gateway_fallback())
+        print(f"✅ Stub LLM initialized (median latency {settings.stub_llm_latency_median_ms:.0f} ms)")
+    elif settings.llm_provider == "mock":
+        _LLM = MockLLM()
+        print("✅ Mock LLM initialized")
+    else:
+        print("🔄 Initializing Gemini LLM...")
+        try:
+            _LLM = create_gemini_llm(**generation_params)
+            print(f"✅ Successfully initialized Gemini LLM: {settings.chat_model}")
+        except Exception as e:
+            print(f"❌ Warning: Could not initialize Gemini LLM: {e}")
+            print("🔄 Falling back to mock LLM...")
+            _LLM = MockLLM()
+            print(f"✅ Mock LLM initialized as fallback")
+    return _LLM
+
+
+def __getattr__(name):
+    # Keep `from ragchallenge.api.llm import LLM` working for scripts and notebooks
+    if name == "LLM":
+        return get_llm()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
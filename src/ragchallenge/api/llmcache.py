@@ -0,0 +1,216 @@
+"""
+LLM Response Cache Module
+Exact-match cache of chat model responses in a local sqlite file.
+
+The paraphrase, hypothetical-question and answer chains often send the same prompt twice: the
+same question against the same retrieved context, or the same chunk when augmentation is run
+again. ``cached_model`` wraps a chain's chat model so that a prompt it has answered before is
+served from ``llm_cache_path`` instead of the network. The key is a hash of the model with its
+generation parameters and of the rendered messages, so a changed context, prompt template or
+temperature is a different entry.
+
+Caching is enabled per chain with ``llm_cache_chains``. Entries expire after
+``llm_cache_ttl_seconds``; beyond ``llm_cache_max_entries`` the least recently used ones are
+dropped. Access times are only written when they are ``ACCESS_GRANULARITY_SECONDS`` old, so
+most hits are a read without a commit. Answers the LLM gateway produced with its fallback model
+are never stored.
+
+Usage:
+    python -m ragchallenge.api.llmcache [--clear]
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from ragchallenge.api import metrics
+from ragchallenge.api.config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    chain TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+# Expired and surplus entries are removed every this many writes
+PRUNE_INTERVAL = 100
+# A hit updates the entry's access time only if it is older than this; LRU order is this coarse
+ACCESS_GRANULARITY_SECONDS = 3600.0
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+class ResponseCache:
+    """Sqlite table of responses by prompt key, shared by the threads of one process."""
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for a key, or None if there is none or it expired."""
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, created_at, accessed_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl_seconds > 0 and now - row[1] > self.ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                return None
+            if now - row[2] >= ACCESS_GRANULARITY_SECONDS:
+                self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._connection.commit()
+            return row[0]
+
+    def put(self, key: str, chain: str, response: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, chain, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)", (key, chain, response, now, now))
+            self._connection.commit()
+            self._writes += 1
+            if self._writes % PRUNE_INTERVAL == 0:
+                self._prune(now)
+
+    def _prune(self, now: float) -> None:
+        """Drop expired entries, then the least recently used ones beyond ``max_entries``."""
+        if self.ttl_seconds > 0:
+            self._connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries > 0:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,))
+        self._connection.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._connection.execute("SELECT chain, COUNT(*) FROM responses GROUP BY chain").fetchall()
+        return {"path": str(self.path), "entries": dict(rows), "bytes": self.path.stat().st_size}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+            self._connection.execute("VACUUM")
+
+
+def get_response_cache() -> ResponseCache:
+    """Open the configured cache file once per process."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache(settings.llm_cache_path, settings.llm_cache_ttl_seconds,
+                                   settings.llm_cache_max_entries)
+        return _CACHE
+
+
+# ---------------------------- Cached Model --------------------------- #
+
+def model_signature(model: Any) -> dict:
+    """Model name and generation parameters that identify a model in cache keys."""
+    params = getattr(model, "_identifying_params", None) or {}
+    return {"type": type(model).__name__, **params}
+
+
+def prompt_key(signature: dict, messages: List[BaseMessage], **kwargs: Any) -> str:
+    """Hash of the model, its call options and the rendered messages."""
+    payload = json.dumps({
+        "model": signature,
+        "options": kwargs,
+        "messages": [[message.type, message.content] for message in messages],
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedChatModel(BaseChatModel):
+    """Chat model that answers repeated prompts of one chain from the response cache."""
+
+    model: Any
+    chain: str
+
+    @property
+    def _llm_type(self) -> str:
+        return "cached_chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"chain": self.chain, **model_signature(self.model)}
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        cache = get_response_cache()
+        key = prompt_key(model_signature(self.model), messages, stop=stop, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.LLM_CACHE_REQUESTS.inc(chain=self.chain, result="hit")
+            return ChatResult(generations=[ChatGeneration(
+                message=AIMessage(content=cached, response_metadata={"cache_hit": True}))])
+
+        metrics.LLM_CACHE_REQUESTS.inc(chain=self.chain, result="miss")
+        result = self.model.invoke(messages, stop=stop, **kwargs)
+        message = result if isinstance(result, AIMessage) else AIMessage(content=getattr(result, "content", str(result)))
+        if isinstance(message.content, str) and not message.response_metadata.get("fallback"):
+            cache.put(key, self.chain, message.content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def cache_enabled(chain: str) -> bool:
+    return chain in {name.strip() for name in settings.llm_cache_chains.split(",") if name.strip()}
+
+
+def cached_model(model: Any, chain: str) -> Any:
+    """
+    Wrap a chain's chat model in the response cache if caching is enabled for the chain.
+
+    :param model: The chat model, typically the gateway returned by ``llm.get_llm``.
+    :param chain: Chain name in ``llm_cache_chains``, e.g. "answer", "paraphrase" or "questions".
+    :return: The cached model, or the model itself if the chain is not cached.
+    """
+    from ragchallenge.api.llm import MockLLM
+
+    # The mock answers instantly and is not worth a disk round trip
+    if not cache_enabled(chain) or isinstance(model, MockLLM):
+        return model
+    return CachedChatModel(model=model, chain=chain)
+
+
+# ---------------------------- Entry Point --------------------------- #
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or clear the LLM response cache.")
+    parser.add_argument("--clear", action="store_true", help="Remove all cached responses")
+    args = parser.parse_args()
+
+    cache = get_response_cache()
+    if args.clear:
+        cache.clear()
+    print(json.dumps(cache.stats()))
+
+
+if __name__ == "__main__":
+    main()
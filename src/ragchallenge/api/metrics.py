@@ -0,0 +1,237 @@
+"""
+Metrics Module
+In-process counters, gauges and histograms rendered in the Prometheus text format.
+
+Recording a sample is a dict lookup and a few additions under a lock, so metrics can stay
+enabled on the request path. ``GET /metrics`` renders the current values.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache-hit retrieval up to slow LLM calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+SIZE_BUCKETS = (256, 1024, 4096, 8192, 16384, 32768, 65536, 131072)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or is read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self.function = function
+
+    def render(self) -> list:
+        if self.function is not None:
+            try:
+                return self.header() + [f"{self.name} {_format_value(self.function())}"]
+            except Exception:
+                return self.header()
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                                for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the wall time of the block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = self.header()
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# ---------------------------- Pipeline Metrics --------------------------- #
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "rag_stage_seconds", "Time spent per pipeline stage (expansion, embedding, search, neighbours, llm, total).",
+    ["stage", "kb_type"]))
+RETRIEVED_CHUNKS = REGISTRY.register(Histogram(
+    "rag_retrieved_chunks", "Chunks retrieved per question.", ["kb_type"], buckets=COUNT_BUCKETS))
+PROMPT_CHARACTERS = REGISTRY.register(Histogram(
+    "rag_prompt_characters", "Characters of retrieved context sent to the LLM.", ["kb_type"], buckets=SIZE_BUCKETS))
+PROMPT_TOKENS = REGISTRY.register(Counter(
+    "rag_prompt_tokens_total", "Estimated prompt tokens sent to the LLM (characters / 4).", ["kb_type"]))
+LLM_ERRORS = REGISTRY.register(Counter(
+    "rag_llm_errors_total", "LLM calls that raised an exception.", ["kb_type"]))
+LLM_CALLS = REGISTRY.register(Counter(
+    "rag_llm_calls_total", "LLM gateway calls by outcome (success, retry, error, rate_limited, rejected, fallback).",
+    ["model", "outcome"]))
+LLM_RATE_LIMIT_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "rag_llm_rate_limit_wait_seconds", "Time LLM calls waited for a rate limit token.", ["model"]))
+LLM_CIRCUIT_OPEN = REGISTRY.register(Gauge(
+    "rag_llm_circuit_open", "1 while the LLM gateway circuit of a model is open or half-open.", ["model"]))
+LLM_HEDGES = REGISTRY.register(Counter(
+    "rag_llm_hedges_total", "Hedged LLM requests by outcome (sent, won, lost, skipped).", ["model", "outcome"]))
+LLM_HEDGE_DELAY_SECONDS = REGISTRY.register(Gauge(
+    "rag_llm_hedge_delay_seconds", "Current delay after which an LLM call without a first token is hedged.",
+    ["model"]))
+LLM_CACHE_REQUESTS = REGISTRY.register(Counter(
+    "rag_llm_cache_requests_total", "LLM response cache lookups by chain and result (hit or miss).",
+    ["chain", "result"]))
+GATED_QUESTIONS = REGISTRY.register(Counter(
+    "rag_gated_questions_total", "Questions answered without the LLM because no chunk cleared the relevance gate.",
+    ["kb_type"]))
+
+# ---------------------------- Ingestion Metrics --------------------------- #
+
+INGESTED_CHUNKS = REGISTRY.register(Counter(
+    "rag_ingested_chunks_total", "Chunks embedded and written to user vector stores."))
+INGESTION_SECONDS = REGISTRY.register(Histogram(
+    "rag_ingestion_seconds", "Time to embed and store one uploaded document."))
+INGESTION_THROUGHPUT = REGISTRY.register(Gauge(
+    "rag_ingestion_chunks_per_second", "Chunks per second of the most recent upload."))
+TOMBSTONED_CHUNKS = REGISTRY.register(Counter(
+    "rag_tombstoned_chunks_total", "Chunks hidden by deletes, counted when known at delete time."))
+PURGED_CHUNKS = REGISTRY.register(Counter(
+    "rag_purged_chunks_total", "Deleted chunks removed from user vector stores by the deletion worker."))
+PENDING_DELETES = REGISTRY.register(Gauge(
+    "rag_pending_deletes", "Tenants with deletes waiting for the deletion worker."))
+FROZEN_TENANTS = REGISTRY.register(Counter(
+    "rag_frozen_tenants_total", "Idle user vector stores moved to the cold tier."))
+RESTORE_SECONDS = REGISTRY.register(Histogram(
+    "rag_cold_restore_seconds", "Time to restore a user vector store from the cold tier on access."))
+
+# ---------------------------- Service Metrics --------------------------- #
+
+OPEN_TENANT_STORES = REGISTRY.register(Gauge(
+    "rag_open_tenant_stores", "User vector stores currently held open in the store cache."))
+REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "rag_http_requests_in_flight", "HTTP requests currently being handled."))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "rag_http_request_seconds", "HTTP request latency by route and status code.", ["path", "status"]))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text, good enough for capacity planning."""
+    return len(text) // 4
@@ -1,7 +1,8 @@
 
-from langchain.schema import HumanMessage, SystemMessage
-from langchain.prompts import ChatPromptTemplate
-from ragchallenge.api.llm import LLM
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from ragchallenge.api.llm import get_llm
+from ragchallenge.api.llmcache import cached_model
 from ragchallenge.api.interfaces.paraphraser import QueryParaphraser
 
 # ---------------------------- Load Paraphraser --------------------------- #
@@ -23,6 +24,20 @@ prompt_template_paraphrase = ChatPromptTemplate.from_messages(
     [(msg.role, msg.content) for msg in messages]
 )
 
-# Create an instance of QueryParaphraser
-PARAPHRASER = QueryParaphraser(
-    model=LLM, prompt_template=prompt_template_paraphrase)
+# Lazy-load the paraphraser together with the chat model
+_PARAPHRASER = None
+
+
+def get_paraphraser() -> QueryParaphraser:
+    """Create the QueryParaphraser on first use."""
+    global _PARAPHRASER
+    if _PARAPHRASER is None:
+        _PARAPHRASER = QueryParaphraser(
+            model=cached_model(get_llm(), "paraphrase"), prompt_template=prompt_template_paraphrase)
+    return _PARAPHRASER
+
+
+def __getattr__(name):
+    if name == "PARAPHRASER":
+        return get_paraphraser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,179 @@
+"""
+Pre-fork Serving Module
+Loads model weights once in a master process, then forks uvicorn workers.
+
+``uvicorn --workers N`` starts N fresh interpreters that each load the embedding model and
+open the vector store. Here the master loads the embedding models (and a flat default index,
+which is only memory-mapped files) and forks afterwards, so the workers share the weights and
+index pages copy-on-write and total memory grows sub-linearly with the number of workers.
+
+To keep those pages shared and the fork safe:
+- the master opens no Chroma client or other sqlite connection, since those must not cross a
+  fork; every worker opens its own stores when it warms up, after clearing any Chroma system
+  cached in the master;
+- the master runs torch with a single thread, so no OpenMP pool exists at fork time, and
+  every worker sizes its own pool to its share of the cores (no oversubscription);
+- ``gc.freeze()`` moves everything loaded so far into the permanent generation, so garbage
+  collection in the workers does not write to (and copy) the shared objects;
+- the listening socket is bound in the master and inherited by every worker.
+
+POSIX only; elsewhere ``serve`` falls back to a single uvicorn process.
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+import uvicorn
+
+from ragchallenge.api.config import settings
+
+MEMORY_REPORT_DELAY_SECONDS = 15
+
+
+def _set_torch_threads(threads: int) -> None:
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def threads_per_worker(workers: int) -> int:
+    """Intra-op threads per worker: the configured value, or an equal share of the cores."""
+    if settings.torch_threads_per_worker > 0:
+        return settings.torch_threads_per_worker
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+def memory_summary(pids: List[int]) -> Dict[str, float]:
+    """
+    Sum resident and proportional set sizes of the given processes (Linux only).
+
+    RSS counts shared pages once per process, PSS divides them among the sharers, so
+    ``pss_mb`` is the real memory cost of the whole group.
+    """
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0, "shared_mb": 0.0}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup", "r", encoding="utf-8") as file:
+                for line in file:
+                    key, _, value = line.partition(":")
+                    if key == "Rss":
+                        totals["rss_mb"] += int(value.split()[0]) / 1024
+                    elif key == "Pss":
+                        totals["pss_mb"] += int(value.split()[0]) / 1024
+                    elif key in ("Shared_Clean", "Shared_Dirty"):
+                        totals["shared_mb"] += int(value.split()[0]) / 1024
+        except OSError:
+            continue
+    return {key: round(value, 1) for key, value in totals.items()}
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, threads: int, log_level: str) -> None:
+    """Body of a forked worker; never returns."""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _set_torch_threads(threads)
+
+    # Chroma keeps one system (with its sqlite connection) per path; none may be shared with the master
+    from chromadb.api.shared_system_client import SharedSystemClient
+    SharedSystemClient.clear_system_cache()
+
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    try:
+        server.run(sockets=[sock])
+    finally:
+        os._exit(0)
+
+
+def _fork_worker(app, sock: socket.socket, threads: int, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        _run_worker(app, sock, threads, log_level)
+    return pid
+
+
+def serve(app, host: str = "0.0.0.0", port: int = 8082, workers: int = 2, log_level: str = "info") -> None:
+    """
+    Load the models in this process, then fork ``workers`` uvicorn servers sharing one socket.
+
+    Each worker then warms up on its own: it opens the default store and runs one query, reusing
+    the models loaded here.
+
+    :param app: The ASGI app to serve.
+    :param host: Interface to bind.
+    :param port: Port to bind.
+    :param workers: Number of worker processes.
+    :param log_level: Uvicorn log level.
+    """
+    if workers <= 1 or not hasattr(os, "fork"):
+        uvicorn.run(app, host=host, port=port, log_level=log_level)
+        return
+
+    from ragchallenge.api import warmup
+
+    # Load models single-threaded; the workers size their own thread pools after the fork
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    _set_torch_threads(1)
+    if not warmup.preload():
+        print("⚠️  Forking workers without shared models, each one loads its own")
+
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind_socket(host, port)
+    threads = threads_per_worker(workers)
+    print(f"🍴 Forking {workers} workers on http://{host}:{port} ({threads} torch threads each)")
+
+    children = {_fork_worker(app, sock, threads, log_level) for _ in range(workers)}
+    stopping = False
+    started = time.monotonic()
+    reported = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Supervise: restart workers that die, exit once all are gone after a stop signal
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if not reported and time.monotonic() - started > MEMORY_REPORT_DELAY_SECONDS:
+                summary = memory_summary([os.getpid(), *children])
+                print(f"📦 Memory of master + {len(children)} workers: {summary}")
+                reported = True
+            time.sleep(0.5)
+            continue
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️  Worker {pid} exited with status {status}, starting a replacement")
+            children.add(_fork_worker(app, sock, threads, log_level))
+
+    sock.close()
+    print("✅ All workers stopped")
+    sys.exit(0)
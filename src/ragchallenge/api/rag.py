@@ -1,14 +1,15 @@
-from langchain.schema import HumanMessage, SystemMessage
-from langchain.prompts import ChatPromptTemplate
-from langchain_community.vectorstores import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from pathlib import Path
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
 from typing import Optional
 
 from ragchallenge.api.database import get_database
-from ragchallenge.api.paraphraser import PARAPHRASER
-from ragchallenge.api.llm import LLM
+from ragchallenge.api.paraphraser import get_paraphraser
+from ragchallenge.api.llm import get_llm
+from ragchallenge.api.llmcache import cached_model
 from ragchallenge.api.config import Settings
+from ragchallenge.api.embeddings import create_embeddings
+from ragchallenge.api.stores import open_user_vectorstore
+from ragchallenge.api.tiering import ensure_hot
 from ragchallenge.api.interfaces.ragmodelexpanded import QuestionAnsweringWithQueryExpansion
 
 messages = [
@@ -53,12 +54,15 @@ def get_embeddings():
     """Lazy-load embeddings when needed."""
     global embeddings
     if embeddings is None:
-        embeddings = HuggingFaceEmbeddings(
-            model_name=config.embedding_model,
-            model_kwargs={'device': config.embedding_model_device}
-        )
+        embeddings = create_embeddings()
     return embeddings
 
+def gate_min_score() -> Optional[float]:
+    """Cosine similarity the relevance gate requires, or None when the gate is off (disabled or 0.0)."""
+    if not config.relevance_gate or config.relevance_gate_min_score <= 0:
+        return None
+    return config.relevance_gate_min_score
+
 # Lazy-load the default RAG model
 RAG_MODEL = None
 
@@ -70,8 +74,13 @@ def get_rag_model():
         RAG_MODEL = QuestionAnsweringWithQueryExpansion(
             knowledge_vector_database=database.vector_store,
             prompt_template=prompt_template,
-            question_generator=PARAPHRASER,
-            model=LLM
+            question_generator=get_paraphraser(),
+            model=cached_model(get_llm(), "answer"),
+            neighbour_window=config.neighbour_window,
+            max_k=config.retrieval_max_k,
+            min_score=config.retrieval_min_score,
+            score_cliff=config.retrieval_score_cliff,
+            gate_min_score=gate_min_score()
         )
         print("✅ Initialized default RAG model")
     return RAG_MODEL
@@ -88,26 +97,28 @@ def get_user_rag_model(user_id: Optional[str] = None) -> QuestionAnsweringWithQu
         QuestionAnsweringWithQueryExpansion instance
     """
     if user_id:
-        # Load user-specific vector store
-        user_vectorstore_path = Path(f"data/user_vectorstores/{user_id}")
-        
-        if user_vectorstore_path.exists():
-            try:
-                user_vectorstore = Chroma(
-                    persist_directory=str(user_vectorstore_path),
-                    embedding_function=get_embeddings()
-                )
-                
-                return QuestionAnsweringWithQueryExpansion(
-                    knowledge_vector_database=user_vectorstore,
-                    prompt_template=prompt_template,
-                    question_generator=PARAPHRASER,
-                    model=LLM
-                )
-            except Exception as e:
-                print(f"⚠️  Error loading user vectorstore for {user_id}: {e}")
-                # Fallback to default
-                return RAG_MODEL
+        # Load user-specific vector store (flat or HNSW, depending on its size)
+        try:
+            ensure_hot(user_id)
+            user_vectorstore = open_user_vectorstore(user_id, get_embeddings())
+        except Exception as e:
+            print(f"⚠️  Error loading user vectorstore for {user_id}: {e}")
+            # Fallback to default
+            return get_rag_model()
+
+        if user_vectorstore is not None:
+            return QuestionAnsweringWithQueryExpansion(
+                knowledge_vector_database=user_vectorstore,
+                prompt_template=prompt_template,
+                question_generator=get_paraphraser(),
+                model=cached_model(get_llm(), "answer"),
+                knowledge_base_type="personal",
+                neighbour_window=config.neighbour_window,
+                max_k=config.retrieval_max_k,
+                min_score=config.retrieval_min_score,
+                score_cliff=config.retrieval_score_cliff,
+                gate_min_score=gate_min_score()
+            )
     
     # Return default RAG model
     return get_rag_model()
@@ -124,26 +135,28 @@ def get_combined_rag_model(user_id: Optional[str] = None) -> QuestionAnsweringWi
         QuestionAnsweringWithQueryExpansion instance with combined search capability
     """
     if user_id:
-        user_vectorstore_path = Path(f"data/user_vectorstores/{user_id}")
-        
-        if user_vectorstore_path.exists():
-            try:
-                # Create a combined retriever that searches both stores
-                user_vectorstore = Chroma(
-                    persist_directory=str(user_vectorstore_path),
-                    embedding_function=get_embeddings()
-                )
-                
+        try:
+            # Create a combined retriever that searches both stores
+            ensure_hot(user_id)
+            user_vectorstore = open_user_vectorstore(user_id, get_embeddings())
+
+            if user_vectorstore is not None:
                 # For now, return user-specific model
                 # TODO: Implement true combined search across multiple vector stores
                 return QuestionAnsweringWithQueryExpansion(
                     knowledge_vector_database=user_vectorstore,
                     prompt_template=prompt_template,
-                    question_generator=PARAPHRASER,
-                    model=LLM
+                    question_generator=get_paraphraser(),
+                    model=cached_model(get_llm(), "answer"),
+                    knowledge_base_type="combined",
+                    neighbour_window=config.neighbour_window,
+                    max_k=config.retrieval_max_k,
+                    min_score=config.retrieval_min_score,
+                    score_cliff=config.retrieval_score_cliff,
+                    gate_min_score=gate_min_score()
                 )
-            except Exception as e:
-                print(f"⚠️  Error loading combined vectorstore for {user_id}: {e}")
+        except Exception as e:
+            print(f"⚠️  Error loading combined vectorstore for {user_id}: {e}")
     
     # Fallback to default
     return get_rag_model()
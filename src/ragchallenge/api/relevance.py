@@ -0,0 +1,87 @@
+"""
+Relevance Module
+Cosine-scored retrieval and a score-aware choice of how many chunks to keep.
+
+Vector stores in this package report different scores: flat and FAISS stores return cosine
+similarities, while Chroma returns distances in the space its collection was created with,
+and user stores hold unnormalized embeddings. ``cosine_search`` returns the cosine similarity
+of every hit, whatever the store, so one threshold means the same thing everywhere.
+
+``select_adaptive`` then decides k per query: hits are kept best first until one scores below
+``min_score`` or drops more than ``score_cliff`` below the hit before it, and never more than
+were fetched. A question with one clearly matching chunk sends only that chunk to the LLM; a
+broad question whose hits score alike gets several.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+ScoredDocuments = List[Tuple[Document, float]]
+
+
+# ---------------------------- Cosine Search --------------------------- #
+
+def _chroma_cosine_search(store, embedding: List[float], k: int, filter=None, **kwargs) -> ScoredDocuments:
+    """Query a Chroma collection and score the hits by the cosine of their stored embeddings."""
+    results = store._collection.query(query_embeddings=[embedding], n_results=k, where=filter or None,
+                                      include=["documents", "metadatas", "embeddings"])
+    if not results["ids"] or not results["ids"][0]:
+        return []
+    query = np.asarray(embedding, dtype=np.float32)
+    vectors = np.asarray(results["embeddings"][0], dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+    scores = vectors @ query / np.where(norms == 0, 1.0, norms)
+    # Chroma ranks by its own distance (L2 by default), so put the hits in cosine order
+    scored = [(Document(page_content=text, metadata=metadata or {}, id=doc_id), float(score))
+              for doc_id, text, metadata, score
+              in zip(results["ids"][0], results["documents"][0], results["metadatas"][0], scores)]
+    return sorted(scored, key=lambda result: result[1], reverse=True)
+
+
+def cosine_search(store, embedding: List[float], k: int, **options) -> ScoredDocuments:
+    """
+    Return the top-k documents for a query vector with their cosine similarity, most similar first.
+
+    :param store: A Chroma, flat or FAISS store, or a tenant handle wrapping one.
+    :param embedding: The query embedding.
+    :param k: Number of documents to fetch.
+    :param options: Search options such as a ``filter`` (see ``filters.search_options``).
+    """
+    from langchain_chroma import Chroma
+    from langchain_community.vectorstores import Chroma as CommunityChroma
+
+    if k <= 0:
+        return []
+    if hasattr(type(store), "cosine_search_by_vector"):
+        # Tenant handles pick the underlying store per search and hide tombstoned chunks
+        return store.cosine_search_by_vector(embedding, k=k, **options)
+    if isinstance(store, (Chroma, CommunityChroma)):
+        return _chroma_cosine_search(store, embedding, k, **options)
+    # Flat and FAISS stores score unit vectors by inner product already
+    return store.similarity_search_with_score_by_vector(embedding, k=k, **options)
+
+
+# ---------------------------- Adaptive k --------------------------- #
+
+def select_adaptive(results: ScoredDocuments, min_score: float = 0.0, score_cliff: float = 1.0) -> ScoredDocuments:
+    """
+    Keep the leading hits up to the first one below ``min_score`` or after a relevance cliff.
+
+    :param results: Hits with cosine scores, most similar first; at most this many are kept.
+    :param min_score: Hits scoring below this are dropped, possibly all of them.
+    :param score_cliff: A hit scoring more than this below the previous one ends the selection.
+    """
+    selected = []
+    for document, score in results:
+        if score < min_score or (selected and selected[-1][1] - score > score_cliff):
+            break
+        selected.append((document, score))
+    return selected
+
+
+def adaptive_search(store, embedding: List[float], max_k: int, min_score: float = 0.0,
+                    score_cliff: float = 1.0, **options) -> ScoredDocuments:
+    """Fetch ``max_k`` hits with cosine scores and keep as many as ``select_adaptive`` allows."""
+    return select_adaptive(cosine_search(store, embedding, max_k, **options), min_score, score_cliff)
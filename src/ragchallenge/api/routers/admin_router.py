@@ -0,0 +1,161 @@
+"""
+Admin Router
+Maintenance endpoints for tenant stores: compaction, snapshots and cold tiering.
+"""
+
+import hmac
+import os
+import shutil
+import tempfile
+
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Header, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+from typing import Optional
+
+from ..compaction import candidates, compact_candidates, compact_tenant, fragmentation
+from ..config import settings
+from ..snapshots import export_tenant, import_tenant
+from ..tiering import cold_archive_path, freeze, freeze_idle, is_cold, restore, tier_report
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Check the X-Admin-Token header; without a configured ADMIN_TOKEN every request is refused."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN to enable them")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+# Create router
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/compaction")
+async def list_compaction_candidates():
+    """
+    List tenants with deletes since their last compaction.
+    """
+    return {"candidates": candidates()}
+
+
+@router.get("/compaction/{user_id}")
+def get_fragmentation(user_id: str):
+    """
+    Report how fragmented a user's vector store is and whether it needs compaction.
+    """
+    report = fragmentation(user_id)
+    if not report["exists"]:
+        raise HTTPException(status_code=404, detail="User vector store not found")
+    return report
+
+
+@router.post("/compaction/{user_id}", status_code=202)
+def compact_user_vectorstore(
+    user_id: str,
+    background_tasks: BackgroundTasks,
+    force: bool = Query(False, description="Compact even if the store is below the thresholds")
+):
+    """
+    Compact a user's vector store in the background if it is fragmented.
+    """
+    report = fragmentation(user_id)
+    if not report["exists"]:
+        raise HTTPException(status_code=404, detail="User vector store not found")
+    if report["needs_compaction"] or force:
+        background_tasks.add_task(compact_tenant, user_id, force)
+    return {**report, "scheduled": report["needs_compaction"] or force}
+
+
+@router.post("/compaction", status_code=202)
+def compact_all(background_tasks: BackgroundTasks):
+    """
+    Check all candidate stores and compact the fragmented ones in the background.
+    """
+    background_tasks.add_task(compact_candidates)
+    return {"scheduled": True, "candidates": candidates()}
+
+
+@router.get("/snapshots/{user_id}")
+def download_snapshot(user_id: str):
+    """
+    Export a user's vector store, embeddings included, as a snapshot file.
+    """
+    if is_cold(user_id):
+        # A frozen store already is a snapshot
+        return FileResponse(cold_archive_path(user_id), media_type="application/x-tar",
+                            filename=f"{user_id}.snapshot.tar")
+    handle, path = tempfile.mkstemp(prefix="snapshot-", suffix=".tar")
+    os.close(handle)
+    try:
+        export_tenant(user_id, path)
+    except LookupError:
+        os.remove(path)
+        raise HTTPException(status_code=404, detail="User vector store not found")
+    except Exception as e:
+        os.remove(path)
+        raise HTTPException(status_code=500, detail=f"Error exporting snapshot: {str(e)}")
+    return FileResponse(path, media_type="application/x-tar", filename=f"{user_id}.snapshot.tar",
+                        background=BackgroundTask(os.remove, path))
+
+
+@router.post("/snapshots/{user_id}")
+def upload_snapshot(
+    user_id: str,
+    file: UploadFile = File(...),
+    force: bool = Query(False, description="Import a snapshot made with another embedding model")
+):
+    """
+    Import a snapshot file into a user's vector store without re-embedding.
+    """
+    handle, path = tempfile.mkstemp(prefix="snapshot-", suffix=".tar")
+    try:
+        with os.fdopen(handle, "wb") as target:
+            shutil.copyfileobj(file.file, target, 1 << 20)
+        result = import_tenant(user_id, path, force=force)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error importing snapshot: {str(e)}")
+    finally:
+        os.remove(path)
+    return {"status": "success", **result}
+
+
+@router.get("/tiering")
+def get_tier_report():
+    """
+    Report how many stores are live and how many are frozen in the cold tier.
+    """
+    return tier_report()
+
+
+@router.post("/tiering", status_code=202)
+def freeze_idle_stores(background_tasks: BackgroundTasks):
+    """
+    Move every store idle for TIERING_IDLE_DAYS to the cold tier in the background.
+    """
+    background_tasks.add_task(freeze_idle)
+    return {"scheduled": True, "idle_days": settings.tiering_idle_days}
+
+
+@router.post("/tiering/{user_id}/freeze")
+def freeze_user_vectorstore(
+    user_id: str,
+    force: bool = Query(False, description="Freeze even if the store was used recently")
+):
+    """
+    Move a user's vector store to the cold tier.
+    """
+    return freeze(user_id, force=force)
+
+
+@router.post("/tiering/{user_id}/restore")
+def restore_user_vectorstore(user_id: str):
+    """
+    Restore a user's vector store from the cold tier ahead of its next access.
+    """
+    result = restore(user_id)
+    if not result["restored"]:
+        raise HTTPException(status_code=404, detail="User vector store is not in the cold tier")
+    return result
@@ -7,8 +7,12 @@ from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query
 from typing import List, Optional
 import uuid
 
+from ..catalog import catalog_stats
+from ..deletion import clear_tenant
 from ..document_processor import DocumentProcessor
 from ..config import Settings
+from ..schemas.messages import BulkDeleteRequest
+from ..tiering import discard, ensure_hot
 
 # Create router
 router = APIRouter(prefix="/documents", tags=["documents"])
@@ -41,20 +45,26 @@ async def upload_document(
 
 
 @router.get("/list/{user_id}")
-async def list_user_documents(user_id: str):
+def list_user_documents(
+    user_id: str,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of documents to return"),
+    offset: int = Query(0, ge=0, description="Number of documents to skip")
+):
     """
-    List all documents in a user's personal vector store.
+    List the documents in a user's personal vector store, one page at a time.
     """
-    documents = doc_processor.list_user_documents(user_id)
+    documents = doc_processor.list_user_documents(user_id, limit=limit, offset=offset)
     return {
         "user_id": user_id,
         "documents": documents,
-        "total_documents": len(documents)
+        "total_documents": catalog_stats(user_id)["total_documents"],
+        "limit": limit,
+        "offset": offset
     }
 
 
 @router.delete("/{user_id}/{document_name}")
-async def delete_document(user_id: str, document_name: str):
+def delete_document(user_id: str, document_name: str):
     """
     Delete a specific document from user's vector store.
     """
@@ -62,6 +72,15 @@ async def delete_document(user_id: str, document_name: str):
     return result
 
 
+@router.post("/delete/{user_id}")
+def delete_documents(user_id: str, request: BulkDeleteRequest):
+    """
+    Delete several documents by name and/or all chunks matching a metadata filter in one call.
+    Deleted chunks stop appearing in answers immediately and are removed from disk in the background.
+    """
+    return doc_processor.delete_user_documents(user_id, names=request.names, where=request.where)
+
+
 @router.post("/upload-multiple")
 async def upload_multiple_documents(
     files: List[UploadFile] = File(...),
@@ -103,39 +122,42 @@ async def upload_multiple_documents(
 
 
 @router.get("/vectorstore/info/{user_id}")
-async def get_vectorstore_info(user_id: str):
+def get_vectorstore_info(
+    user_id: str,
+    limit: int = Query(100, ge=1, le=1000, description="Maximum number of documents to return"),
+    offset: int = Query(0, ge=0, description="Number of documents to skip")
+):
     """
     Get information about user's vector store.
     """
     try:
-        documents = doc_processor.list_user_documents(user_id)
-        
-        total_chunks = sum(doc.get("chunks", 0) for doc in documents)
+        ensure_hot(user_id)
+        stats = catalog_stats(user_id)
+        documents = doc_processor.list_user_documents(user_id, limit=limit, offset=offset)
         
         return {
             "user_id": user_id,
-            "total_documents": len(documents),
-            "total_chunks": total_chunks,
+            "total_documents": stats["total_documents"],
+            "total_chunks": stats["total_chunks"],
+            "total_bytes": stats["total_bytes"],
             "documents": documents,
-            "status": "exists" if documents else "empty"
+            "limit": limit,
+            "offset": offset,
+            "status": "exists" if stats["total_documents"] else "empty"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting vectorstore info: {str(e)}")
 
 
 @router.post("/clear/{user_id}")
-async def clear_user_vectorstore(user_id: str):
+def clear_user_vectorstore(user_id: str):
     """
     Clear all documents from user's vector store.
     """
     try:
-        import shutil
-        from pathlib import Path
-        
-        user_vectorstore_path = Path(f"data/user_vectorstores/{user_id}")
-        
-        if user_vectorstore_path.exists():
-            shutil.rmtree(user_vectorstore_path)
+        # A frozen tenant only has its cold archive, which is removed right away
+        cleared_cold = discard(user_id)
+        if clear_tenant(user_id) or cleared_cold:
             return {
                 "status": "success",
                 "message": f"Cleared all documents for user {user_id}"
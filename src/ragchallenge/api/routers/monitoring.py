@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from ragchallenge.api.metrics import REGISTRY
+from ragchallenge.api.warmup import STATE
+
+router = APIRouter(responses={404: {"description": "Not Found"}})
+
+
+# ---------------------------- Endpoints --------------------------- #
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Expose pipeline and service metrics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/health")
+async def health():
+    """Liveness check: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """Readiness check: 200 once models and the default index are loaded, 503 while warming up or after a failed warmup."""
+    status = "ready" if STATE["ready"] else "warmup_failed" if STATE["error"] else "warming_up"
+    body = {"status": status, "warmup": STATE["stages"], "error": STATE["error"]}
+    return JSONResponse(body, status_code=200 if STATE["ready"] else 503)
@@ -1,12 +1,29 @@
 
 from ragchallenge.api.rag import get_rag_model, get_user_rag_model, get_combined_rag_model
 from fastapi import APIRouter, HTTPException, Query
-from ragchallenge.api.schemas.messages import ChatResponse, ChatRequest, ChatMessage
+from starlette.concurrency import run_in_threadpool
+from ragchallenge.api.filters import build_filter
+from ragchallenge.api.schemas.messages import (
+    ChatResponse, ChatRequest, ChatMessage, MetadataFilter, SearchRequest, SearchResponse, SearchResult)
+from ragchallenge.api.tracing import span
 from typing import Optional
 
 router = APIRouter(responses={404: {"description": "Not Found"}})
 
 
+# ---------------------------- Helpers --------------------------- #
+
+
+def request_filter(filters: Optional[MetadataFilter]) -> Optional[dict]:
+    """Metadata filter of a request, or None to search everything."""
+    if filters is None:
+        return None
+    try:
+        return build_filter(**filters.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 # ---------------------------- Endpoints --------------------------- #
 
 
@@ -17,19 +34,24 @@ async def generate_answer(
     use_combined: bool = Query(False, description="Search both personal and default knowledge base")
 ):
     """Generate an answer to a question and append it as the last message. Uses RAG, query expansion, and hypothetical question generation."""
+    where = request_filter(request.filters)
     try:
         # Get the user's question from the last message in the list
         user_message = request.messages[-1].content
         
-        # Select appropriate RAG model based on user preferences
-        if use_combined and user_id:
-            rag_model = get_combined_rag_model(user_id)
-        elif user_id:
-            rag_model = get_user_rag_model(user_id)
-        else:
-            rag_model = get_rag_model()
+        # Select appropriate RAG model based on user preferences; personal stores may be
+        # restored from the cold tier, which blocks, so they load off the event loop
+        with span("load_model"):
+            if use_combined and user_id:
+                rag_model = await run_in_threadpool(get_combined_rag_model, user_id)
+            elif user_id:
+                rag_model = await run_in_threadpool(get_user_rag_model, user_id)
+            else:
+                rag_model = get_rag_model()
         
-        response = rag_model.answer_question(user_message)
+        # Retrieval and the LLM call block, so they run off the event loop like the model loading
+        with span("answer_question"):
+            response = await run_in_threadpool(rag_model.answer_question, user_message, where=where)
         request.messages.append(ChatMessage(role="system", content=response.get("answer")))
 
         # Return the updated messages list with the generated answer appended
@@ -38,7 +60,8 @@ async def generate_answer(
             questions=response.get("question"), 
             documents=response.get("documents"),
             user_id=user_id,
-            knowledge_base_type="personal" if user_id and not use_combined else "combined" if use_combined else "default"
+            knowledge_base_type="personal" if user_id and not use_combined else "combined" if use_combined else "default",
+            no_relevant_context=response.get("no_relevant_context", False)
         )
 
     except Exception as e:
@@ -48,10 +71,13 @@ async def generate_answer(
 @router.post("/generate-answer-personal", response_model=ChatResponse)
 async def generate_answer_personal(request: ChatRequest, user_id: str):
     """Generate an answer using only the user's personal knowledge base."""
+    where = request_filter(request.filters)
     try:
         user_message = request.messages[-1].content
-        rag_model = get_user_rag_model(user_id)
-        response = rag_model.answer_question(user_message)
+        with span("load_model"):
+            rag_model = await run_in_threadpool(get_user_rag_model, user_id)
+        with span("answer_question"):
+            response = await run_in_threadpool(rag_model.answer_question, user_message, where=where)
         request.messages.append(ChatMessage(role="system", content=response.get("answer")))
 
         return ChatResponse(
@@ -59,7 +85,34 @@ async def generate_answer_personal(request: ChatRequest, user_id: str):
             questions=response.get("question"), 
             documents=response.get("documents"),
             user_id=user_id,
-            knowledge_base_type="personal"
+            knowledge_base_type="personal",
+            no_relevant_context=response.get("no_relevant_context", False)
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/search", response_model=SearchResponse)
+async def search(
+    request: SearchRequest,
+    user_id: Optional[str] = Query(None, description="User ID for personal knowledge base")
+):
+    """Return the chunks most similar to a query, optionally restricted by metadata filters, without calling the LLM."""
+    where = request_filter(request.filters)
+    try:
+        with span("load_model"):
+            rag_model = await run_in_threadpool(get_user_rag_model, user_id) if user_id else get_rag_model()
+        # Cosine similarity for every store and with or without filters (see the relevance module);
+        # embedding the query and searching block, so they run off the event loop
+        results = await run_in_threadpool(rag_model.retrieve_scored, [request.query], k=request.k, where=where)
+
+        return SearchResponse(
+            query=request.query,
+            results=[SearchResult(text=document.page_content, metadata=document.metadata or {}, score=score)
+                     for document, score in results],
+            user_id=user_id,
+            knowledge_base_type=rag_model.knowledge_base_type
         )
 
     except Exception as e:
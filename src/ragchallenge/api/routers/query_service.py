@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
-from ragchallenge.api.paraphraser import PARAPHRASER
+from starlette.concurrency import run_in_threadpool
+from ragchallenge.api.paraphraser import get_paraphraser
 from ragchallenge.api.schemas.messages import ChatRequest, QueryResponse
 
 router = APIRouter(responses={404: {"description": "Not Found"}})
@@ -11,9 +12,10 @@ router = APIRouter(responses={404: {"description": "Not Found"}})
 async def generate_queries(request: ChatRequest):
     """Generate expanded and hypothetical queries for a given question. Is used to expand the user's input."""
     try:
-        # Get the user's question from the last message in the list and expand it
+        # Get the user's question from the last message in the list and expand it; the LLM call
+        # blocks, so it runs off the event loop
         user_message = request.messages[-1].content
-        expanded_queries = PARAPHRASER.rephrase(user_message)
+        expanded_queries = await run_in_threadpool(get_paraphraser().rephrase, user_message)
         return QueryResponse(original_query=user_message, expanded_queries=expanded_queries)
 
     except Exception as e:
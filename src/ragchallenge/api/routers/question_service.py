@@ -1,10 +1,13 @@
 from fastapi import APIRouter, HTTPException
-from langchain.prompts import ChatPromptTemplate
-from langchain.schema import HumanMessage, SystemMessage
-from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
+from starlette.concurrency import run_in_threadpool
 
 
+from ragchallenge.api.gateway import gateway
 from ragchallenge.api.interfaces.generator import HypotheticalQuestionGenerator
+from ragchallenge.api.llm import gateway_fallback
+from ragchallenge.api.llmcache import cached_model
 from ragchallenge.api.schemas.messages import DocumentRequest, QuestionsResponse
 
 router = APIRouter(responses={404: {"description": "Not Found"}})
@@ -25,16 +28,6 @@ generation_params = {
 repo_id = "HuggingFaceH4/zephyr-7b-beta"
 task = "text-generation"
 
-# Create the Hugging Face Endpoint using the specified parameters
-endpoint = HuggingFaceEndpoint(
-    repo_id=repo_id,
-    task=task,
-    **generation_params,
-)
-
-# Return the LangChain HuggingFacePipeline object with the endpoint
-llm = ChatHuggingFace(llm=endpoint)
-
 # ---------------------------- Load Question Generaor --------------------------- #
 
 messages_hypothetical = [
@@ -55,8 +48,28 @@ prompt_template_hypothetical = ChatPromptTemplate.from_messages(
     [(msg.role, msg.content) for msg in messages_hypothetical]
 )
 
-generator = HypotheticalQuestionGenerator(
-    model=llm, prompt_template=prompt_template_hypothetical)
+# The zephyr endpoint downloads a tokenizer when created, so build it on the first request
+generator = None
+
+
+def get_generator() -> HypotheticalQuestionGenerator:
+    """Lazy-load the Hugging Face endpoint and question generator."""
+    global generator
+    if generator is None:
+        from langchain_huggingface import ChatHuggingFace, HuggingFaceEndpoint
+
+        # Create the Hugging Face Endpoint using the specified parameters
+        endpoint = HuggingFaceEndpoint(
+            repo_id=repo_id,
+            task=task,
+            **generation_params,
+        )
+
+        # Return the LangChain HuggingFacePipeline object with the endpoint, called through the gateway
+        llm = cached_model(gateway(ChatHuggingFace(llm=endpoint), repo_id, fallback=gateway_fallback()), "questions")
+        generator = HypotheticalQuestionGenerator(
+            model=llm, prompt_template=prompt_template_hypothetical)
+    return generator
 
 
 # ---------------------------- Endpoints --------------------------- #
@@ -68,8 +81,8 @@ async def generate_questions(request: DocumentRequest):
         # Get the document from the request
         document = request.document
 
-        # Generate hypothetical questions
-        questions = generator.generate(document)
+        # Generate hypothetical questions off the event loop, the LLM call blocks
+        questions = await run_in_threadpool(get_generator().generate, document)
 
         # Return the document and the generated questions
         return QuestionsResponse(document=document, generated_questions=questions)
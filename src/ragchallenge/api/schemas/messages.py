@@ -1,4 +1,4 @@
-from typing import List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -25,6 +25,23 @@ class ChatMessage(BaseModel):
         }
 
 
+class MetadataFilter(BaseModel):
+    sources: List[str] = Field(default=[], description="Only search these documents (by name).")
+    document_types: List[str] = Field(default=[], description="Only search chunks of these document types.")
+    page_from: Optional[int] = Field(default=None, ge=1, description="Only search PDF chunks on or after this page.")
+    page_to: Optional[int] = Field(default=None, ge=1, description="Only search PDF chunks on or before this page.")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "sources": ["report.pdf"],
+                "document_types": [],
+                "page_from": 3,
+                "page_to": 7
+            }
+        }
+
+
 class ChatRequest(BaseModel):
     messages: List[ChatMessage] = Field(
         ...,
@@ -41,6 +58,11 @@ class ChatRequest(BaseModel):
             }
         ]
     )
+    filters: Optional[MetadataFilter] = Field(
+        default=None,
+        title="Filters",
+        description="Restrict retrieval to chunks matching these metadata filters."
+    )
 
     class Config:
         json_schema_extra = {
@@ -86,7 +108,7 @@ class ChatResponse(BaseModel):
     documents: List[str] = Field([], title="Documents", description="Documents", example=[
         "Conda is an open-source package management system and environment management system that runs on Windows, macOS, and Linux."])
     
-    user_id: str = Field(None, title="User ID", description="ID of the user for personalized responses")
+    user_id: Optional[str] = Field(None, title="User ID", description="ID of the user for personalized responses")
     
     knowledge_base_type: str = Field(
         "default", 
@@ -94,6 +116,12 @@ class ChatResponse(BaseModel):
         description="Type of knowledge base used: 'default', 'personal', or 'combined'"
     )
 
+    no_relevant_context: bool = Field(
+        False,
+        title="No Relevant Context",
+        description="True if no retrieved chunk was relevant enough; the answer is then a fixed reply and no LLM was called"
+    )
+
     class Config:
         json_schema_extra = {
             "example": {
@@ -115,6 +143,34 @@ class ChatResponse(BaseModel):
         }
 
 
+class SearchRequest(BaseModel):
+    query: str = Field(..., description="The text to search for.")
+    k: int = Field(default=4, ge=1, le=100, description="Number of chunks to return.")
+    filters: Optional[MetadataFilter] = Field(default=None, description="Only return chunks matching these filters.")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "query": "How do I create an environment?",
+                "k": 4,
+                "filters": {"sources": ["conda.md"]}
+            }
+        }
+
+
+class SearchResult(BaseModel):
+    text: str = Field(..., description="The chunk text.")
+    metadata: Dict[str, Any] = Field(default={}, description="The chunk metadata (source, chunk_id, page, ...).")
+    score: float = Field(..., description="Cosine similarity of the chunk to the query.")
+
+
+class SearchResponse(BaseModel):
+    query: str = Field(..., description="The original query.")
+    results: List[SearchResult] = Field(default=[], description="Matching chunks, most similar first.")
+    user_id: Optional[str] = Field(default=None, description="ID of the user whose knowledge base was searched.")
+    knowledge_base_type: str = Field("default", description="Type of knowledge base searched: 'default' or 'personal'.")
+
+
 class QueryResponse(BaseModel):
     original_query: str = Field(..., description="The original user query.")
     expanded_queries: List[str] = Field(
@@ -160,3 +216,19 @@ class QuestionsResponse(BaseModel):
                 ]
             }
         }
+
+
+class BulkDeleteRequest(BaseModel):
+    names: List[str] = Field(default=[], description="Names of the documents to delete.")
+    where: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Delete every chunk whose metadata matches: flat keys with a value or {\"$in\": [values]}."
+    )
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "names": ["report.pdf", "notes.md"],
+                "where": None
+            }
+        }
@@ -0,0 +1,403 @@
+"""
+Snapshot Module
+Exports vector stores to portable snapshot files and imports them without re-embedding.
+
+Moving a tenant to another node, or seeding a fresh node with the default knowledge base,
+used to mean copying Chroma directories (tied to the Chroma version and layout) or embedding
+every chunk again. A snapshot is one uncompressed tar file with:
+
+- ``manifest.json``: format version, source, embedding model, chunk count, dimension and
+  the size and SHA-256 checksum of every other member;
+- ``embeddings.npy``: all embeddings as one float32 matrix, row i belonging to record i;
+- ``records.jsonl.gz``: one ``{"id", "text", "metadata"}`` line per chunk;
+- ``catalog.jsonl``: the tenant's catalog rows, so listing and deletes work after import.
+
+Embeddings are written to and read from the matrix through memory maps and texts are
+streamed, so export and import run in fixed-size batches and are limited by disk
+throughput. Import verifies every checksum before touching a store and refuses snapshots
+made with another embedding model unless forced. Chunk IDs are kept, so importing the
+same snapshot twice leaves the store unchanged.
+
+Usage:
+    python -m ragchallenge.api.snapshots export <file> [--user-id <user_id>]
+    python -m ragchallenge.api.snapshots import <file> [--user-id <user_id>] [--force]
+
+Without ``--user-id`` the default knowledge base in ``data/vectorstore`` is exported or
+imported.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from ragchallenge.api import catalog, deletion
+from ragchallenge.api.config import settings
+from ragchallenge.api.database import get_backend_options
+from ragchallenge.api.interfaces.database import create_vector_store
+from ragchallenge.api.stores import (
+    invalidate_user_vectorstore, lease, mark_tenant_changed, open_tenant_chroma, tenant_exists, tenant_write_lock)
+
+SNAPSHOT_FORMAT = "ragchallenge-snapshot"
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.jsonl.gz"
+CATALOG_FILE = "catalog.jsonl"
+DEFAULT_STORE_DIRECTORY = "data/vectorstore"
+DEFAULT_COLLECTION = "documentation"
+BATCH_SIZE = 1000
+
+# (ids, texts, metadatas, embeddings) of consecutive chunks
+Batch = Tuple[List[str], List[str], List[dict], np.ndarray]
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ---------------------------- Sources --------------------------- #
+
+def _chroma_batches(collection) -> Iterator[Batch]:
+    count = collection.count()
+    for offset in range(0, count, BATCH_SIZE):
+        batch = collection.get(include=["embeddings", "documents", "metadatas"], limit=BATCH_SIZE, offset=offset)
+        if batch["ids"]:
+            yield batch["ids"], batch["documents"], batch["metadatas"], np.asarray(batch["embeddings"], dtype=np.float32)
+
+
+def _flat_batches(store) -> Iterator[Batch]:
+    for start in range(0, len(store), BATCH_SIZE):
+        end = min(start + BATCH_SIZE, len(store))
+        yield ([str(chunk_id) for chunk_id in store._ids[start:end]], store._texts[start:end],
+               store._metadatas[start:end], np.asarray(store._vectors[start:end], dtype=np.float32))
+
+
+def _faiss_batches(store) -> Iterator[Batch]:
+    """Docstore rows in label order with their vectors reconstructed from the index."""
+    generation, last_label = store._generation, -1
+    while True:
+        with store._lock:
+            if store._generation != generation:
+                raise RuntimeError("Store was rebuilt during export")
+            rows = store._docstore.execute(
+                "SELECT label, id, text, metadata FROM chunks WHERE deleted = 0 AND label > ? ORDER BY label LIMIT ?",
+                (last_label, BATCH_SIZE)).fetchall()
+            if not rows:
+                return
+            embeddings = store._reconstruct(np.array([row[0] for row in rows], dtype=np.int64))
+        last_label = rows[-1][0]
+        yield [row[1] for row in rows], [row[2] for row in rows], [json.loads(row[3]) for row in rows], embeddings
+
+
+def _open_default_store(backend: str, directory: str):
+    return create_vector_store(backend, None, directory, DEFAULT_COLLECTION, **get_backend_options())
+
+
+# ---------------------------- Export --------------------------- #
+
+def _write_snapshot(path: Path, count: int, batches: Iterator[Batch], manifest: dict,
+                    catalog_rows: Optional[List[dict]] = None) -> dict:
+    """Write batches into a snapshot file next to ``path`` and move it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=".snapshot-", dir=path.parent))
+    try:
+        matrix, row = None, 0
+        with gzip.open(staging / RECORDS_FILE, "wt", encoding="utf-8", compresslevel=1) as records:
+            for ids, texts, metadatas, embeddings in batches:
+                if matrix is None:
+                    matrix = np.lib.format.open_memmap(staging / EMBEDDINGS_FILE, mode="w+", dtype=np.float32,
+                                                       shape=(count, embeddings.shape[1]))
+                if row + len(ids) > count:
+                    raise RuntimeError("Store changed during export")
+                matrix[row:row + len(ids)] = embeddings
+                row += len(ids)
+                for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                    records.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata or {}},
+                                             ensure_ascii=False) + "\n")
+        if row != count:
+            raise RuntimeError(f"Exported {row} of {count} chunks, the store changed during export")
+        if matrix is None:
+            np.save(staging / EMBEDDINGS_FILE, np.zeros((0, 0), dtype=np.float32))
+        else:
+            matrix.flush()
+            manifest["dimension"] = int(matrix.shape[1])
+            del matrix
+
+        members = [EMBEDDINGS_FILE, RECORDS_FILE]
+        if catalog_rows is not None:
+            with open(staging / CATALOG_FILE, "w", encoding="utf-8") as file:
+                for catalog_row in catalog_rows:
+                    file.write(json.dumps(catalog_row, ensure_ascii=False) + "\n")
+            members.append(CATALOG_FILE)
+
+        manifest.update(format=SNAPSHOT_FORMAT, version=SNAPSHOT_VERSION, created_at=time.time(), count=count,
+                        dtype="float32", embedding_model=settings.embedding_model,
+                        files={name: {"bytes": (staging / name).stat().st_size, "sha256": _sha256(staging / name)}
+                               for name in members})
+        manifest.setdefault("dimension", 0)
+        (staging / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+        # The manifest goes first, so readers can check the members while streaming the tar
+        temporary = staging / "snapshot.tar"
+        with tarfile.open(temporary, "w") as archive:
+            for name in [MANIFEST_FILE] + members:
+                archive.add(staging / name, arcname=name)
+        os.replace(temporary, path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return manifest
+
+
+def export_tenant(user_id: str, path: str) -> dict:
+    """
+    Write a tenant's chunks, embeddings and catalog to a snapshot file.
+
+    Pending deletes are removed first, so the snapshot never carries deleted chunks. Uploads
+    and compaction of the tenant wait until the export is done.
+
+    :param user_id: The tenant.
+    :param path: Snapshot file to write.
+    :return: The snapshot manifest.
+    """
+    if not tenant_exists(user_id):
+        raise LookupError(f"User {user_id} has no vector store")
+
+    start = time.perf_counter()
+    with tenant_write_lock(user_id):
+        deletion.finish_pending(user_id)
+        with lease(user_id):
+            collection = open_tenant_chroma(user_id, None)._collection
+            manifest = _write_snapshot(Path(path), collection.count(), _chroma_batches(collection),
+                                       {"kind": "tenant", "source": user_id}, catalog.export_documents(user_id))
+    _report("Exported", manifest, Path(path), time.perf_counter() - start)
+    return manifest
+
+
+def export_default(path: str, backend: Optional[str] = None, directory: str = DEFAULT_STORE_DIRECTORY) -> dict:
+    """
+    Write the default knowledge base to a snapshot file.
+
+    FAISS vectors are reconstructed from the index; ivfpq codes are lossy, so an exported ivfpq
+    store carries approximations of the original embeddings.
+    """
+    backend = backend or settings.document_store_backend
+    start = time.perf_counter()
+    store = _open_default_store(backend, directory)
+    if backend == "chroma":
+        count, batches = store._collection.count(), _chroma_batches(store._collection)
+    elif backend == "flat":
+        count, batches = len(store), _flat_batches(store)
+    elif backend == "faiss":
+        count, batches = len(store), _faiss_batches(store)
+    else:
+        raise ValueError(f"Snapshots can be exported from the chroma, flat and faiss backends, not '{backend}'")
+    manifest = _write_snapshot(Path(path), count, batches, {"kind": "default", "source": backend})
+    _report("Exported", manifest, Path(path), time.perf_counter() - start)
+    return manifest
+
+
+# ---------------------------- Import --------------------------- #
+
+class Snapshot:
+    """A snapshot file unpacked into a temporary directory, with verified checksums."""
+
+    def __init__(self, path: str):
+        self.directory = Path(tempfile.mkdtemp(prefix=".snapshot-", dir=Path(path).resolve().parent))
+        try:
+            self.manifest = self._unpack(path)
+        except Exception:
+            self.close()
+            raise
+
+    def _unpack(self, path: str) -> dict:
+        try:
+            archive = tarfile.open(path, "r:")
+        except tarfile.TarError as e:
+            raise ValueError(f"Not a snapshot file: {e}")
+
+        with archive:
+            try:
+                manifest = json.load(archive.extractfile(MANIFEST_FILE))
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Snapshot manifest missing or invalid: {e}")
+            if manifest.get("format") != SNAPSHOT_FORMAT or manifest.get("version") != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot format {manifest.get('format')} v{manifest.get('version')}")
+
+            # Only members listed in the manifest are read, under fixed names
+            for name, expected in manifest["files"].items():
+                if name not in (EMBEDDINGS_FILE, RECORDS_FILE, CATALOG_FILE):
+                    raise ValueError(f"Unexpected snapshot member '{name}'")
+                try:
+                    source = archive.extractfile(name)
+                except KeyError:
+                    raise ValueError(f"Snapshot member '{name}' is missing")
+                digest, size = hashlib.sha256(), 0
+                with open(self.directory / name, "wb") as target:
+                    for block in iter(lambda: source.read(1 << 20), b""):
+                        digest.update(block)
+                        size += len(block)
+                        target.write(block)
+                if size != expected["bytes"] or digest.hexdigest() != expected["sha256"]:
+                    raise ValueError(f"Checksum mismatch in snapshot member '{name}'")
+        return manifest
+
+    def batches(self) -> Iterator[Batch]:
+        embeddings = np.load(self.directory / EMBEDDINGS_FILE, mmap_mode="r")
+        if len(embeddings) != self.manifest["count"]:
+            raise ValueError(f"Snapshot has {len(embeddings)} embeddings for {self.manifest['count']} records")
+        ids, texts, metadatas = [], [], []
+        row = 0
+        with gzip.open(self.directory / RECORDS_FILE, "rt", encoding="utf-8") as records:
+            for line in records:
+                record = json.loads(line)
+                ids.append(record["id"])
+                texts.append(record["text"])
+                metadatas.append(record["metadata"])
+                if len(ids) == BATCH_SIZE:
+                    yield ids, texts, metadatas, np.asarray(embeddings[row:row + len(ids)])
+                    row += len(ids)
+                    ids, texts, metadatas = [], [], []
+        if ids:
+            yield ids, texts, metadatas, np.asarray(embeddings[row:row + len(ids)])
+            row += len(ids)
+        if row != self.manifest["count"]:
+            raise ValueError(f"Snapshot has {row} records for {self.manifest['count']} embeddings")
+
+    def catalog_rows(self) -> Optional[List[dict]]:
+        path = self.directory / CATALOG_FILE
+        if CATALOG_FILE not in self.manifest["files"]:
+            return None
+        with open(path, "r", encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def close(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _check_model(manifest: dict, force: bool) -> None:
+    model = manifest.get("embedding_model")
+    if model and settings.embedding_model and model != settings.embedding_model and not force:
+        raise ValueError(f"Snapshot was embedded with '{model}', this node uses '{settings.embedding_model}'; "
+                         "import with force to load it anyway")
+
+
+def import_tenant(user_id: str, path: str, force: bool = False) -> dict:
+    """
+    Bulk-load a snapshot into a tenant's store without re-embedding.
+
+    Chunks are upserted by ID, so chunks already in the store are overwritten and others kept.
+    Catalog rows come from the snapshot, or are built from the chunk metadata for snapshots
+    of the default knowledge base.
+
+    :param user_id: The tenant to load into, created if needed.
+    :param path: Snapshot file to read.
+    :param force: Load snapshots embedded with a different model.
+    :return: The snapshot manifest and the number of imported chunks.
+    """
+    start = time.perf_counter()
+    with Snapshot(path) as snapshot:
+        _check_model(snapshot.manifest, force)
+        rows = snapshot.catalog_rows()
+
+        with tenant_write_lock(user_id):
+            deletion.finish_pending(user_id)
+            # Open the catalog before adding chunks, so a first open does not catalogue them again
+            catalog.import_documents(user_id, [])
+            collection = open_tenant_chroma(user_id, None, create=True)._collection
+
+            summary = {}
+            for ids, texts, metadatas, embeddings in snapshot.batches():
+                collection.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+                if rows is None:
+                    catalog.summarize_chunks(summary, ids, metadatas, texts)
+            catalog.import_documents(user_id, rows if rows is not None else catalog.source_rows(summary))
+            mark_tenant_changed(user_id)
+        invalidate_user_vectorstore(user_id)
+        manifest = snapshot.manifest
+
+    _report("Imported", manifest, Path(path), time.perf_counter() - start)
+    return {"user_id": user_id, "imported_chunks": manifest["count"], "manifest": manifest}
+
+
+def import_default(path: str, backend: Optional[str] = None, directory: str = DEFAULT_STORE_DIRECTORY,
+                   force: bool = False) -> dict:
+    """
+    Bulk-load a snapshot into the default knowledge base without re-embedding.
+
+    Chroma stores are loaded batch by batch; the flat and FAISS backends rebuild their index
+    once from the whole embedding matrix.
+    """
+    backend = backend or settings.document_store_backend
+    start = time.perf_counter()
+    with Snapshot(path) as snapshot:
+        _check_model(snapshot.manifest, force)
+        store = _open_default_store(backend, directory)
+        if backend == "chroma":
+            for ids, texts, metadatas, embeddings in snapshot.batches():
+                store._collection.upsert(ids=ids, embeddings=embeddings, documents=texts, metadatas=metadatas)
+        elif snapshot.manifest["count"]:
+            ids, texts, metadatas, embeddings = [], [], [], []
+            for batch in snapshot.batches():
+                ids.extend(batch[0])
+                texts.extend(batch[1])
+                metadatas.extend(batch[2])
+                embeddings.append(batch[3])
+            store.add_embeddings(texts, np.concatenate(embeddings), metadatas=metadatas, ids=ids)
+        manifest = snapshot.manifest
+
+    _report("Imported", manifest, Path(path), time.perf_counter() - start)
+    return {"backend": backend, "imported_chunks": manifest["count"], "manifest": manifest}
+
+
+def _report(action: str, manifest: dict, path: Path, elapsed: float) -> None:
+    size = path.stat().st_size / 1e6 if path.exists() else sum(f["bytes"] for f in manifest["files"].values()) / 1e6
+    print(f"📦 {action} {manifest['count']} chunks ({size:.1f} MB) in {elapsed:.2f}s "
+          f"({manifest['count'] / max(elapsed, 1e-9):.0f} chunks/s, {size / max(elapsed, 1e-9):.1f} MB/s)")
+
+
+# ---------------------------- Entry Point --------------------------- #
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and import vector store snapshots.")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("file", help="Snapshot file to write or read")
+    parser.add_argument("--user-id", help="Tenant to export or import; the default knowledge base if omitted")
+    parser.add_argument("--backend", help="Backend of the default knowledge base (DOCUMENT_STORE_BACKEND)")
+    parser.add_argument("--directory", default=DEFAULT_STORE_DIRECTORY, help="Directory of the default knowledge base")
+    parser.add_argument("--force", action="store_true", help="Import snapshots made with another embedding model")
+    args = parser.parse_args()
+
+    if args.action == "export":
+        if args.user_id:
+            result = export_tenant(args.user_id, args.file)
+        else:
+            result = export_default(args.file, args.backend, args.directory)
+    elif args.user_id:
+        result = import_tenant(args.user_id, args.file, force=args.force)
+    else:
+        result = import_default(args.file, args.backend, args.directory, force=args.force)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,758 @@
+"""
+Tenant Vector Store Module
+Opens per-user vector stores and picks the search backend for them.
+
+Chroma stays the source of truth for every user store. Two storage layouts are supported:
+
+- ``directory``: one persistent Chroma client (and ``chroma.sqlite3``) per user under
+  ``data/user_vectorstores/{user_id}``.
+- ``collection``: every user is a collection inside one of a few shared persistent clients
+  under ``data/tenant_stores/shard_NN``; the shard is picked by hashing the user ID. Opening a
+  tenant is then a collection lookup instead of a cold sqlite open.
+
+Small collections additionally get a memory-mapped FlatVectorStore snapshot that is searched
+instead of the HNSW segment and is rebuilt whenever the tenant's data changes. Filtered
+searches on larger ones pass the filter to Chroma as a where clause, so no query has to
+build an index first.
+
+Query handles are wrapped in ``TenantStoreHandle``, which hides tombstoned chunks and holds a
+lease on the tenant while a search runs, so deletes can wait until no search uses the files.
+
+With several worker processes (see the prefork module) all of this holds across processes:
+writes take a per-tenant lock file, leases hold a shared lock on a per-tenant lease file that
+swaps and deletes take exclusively, and a process that finds a tenant changed by another
+worker drops its cached Chroma system, whose in-memory index would not show those changes.
+Background jobs (deletes, compaction, tiering) run only in the process holding the
+background lock.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+from ragchallenge.api import metrics
+from ragchallenge.api.config import settings
+from ragchallenge.api.filters import chroma_where, metadata_matches
+from ragchallenge.api.interfaces.flatindex import FlatVectorStore
+
+USER_VECTORSTORE_ROOT = Path("data/user_vectorstores")
+DIRECTORY_COLLECTION = "langchain"  # LangChain's default collection, used in the directory layout
+FLAT_MANIFEST_FILE = "flat_manifest.json"
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{1,61}[A-Za-z0-9]$")
+
+# Opened stores keyed by user ID, invalidated when the tenant's data changes
+_STORE_CACHE = {}
+_STORE_LOCK = threading.Lock()
+
+# One lock per tenant while its store is opened, so a slow open does not hold up other tenants
+_OPEN_LOCKS = {}
+
+# Shared persistent Chroma clients keyed by shard (collection layout only)
+_CLIENTS = {}
+_CLIENT_LOCK = threading.Lock()
+
+# Searches in progress per tenant; deletes and compaction take a tenant exclusively once it has none
+_LEASES = defaultdict(int)
+_EXCLUSIVE = set()
+_LEASE_CONDITION = threading.Condition()
+
+# Serializes writes per tenant (uploads, deletes, compaction) across threads and worker processes
+_WRITE_LOCKS = {}
+_WRITE_LOCKS_LOCK = threading.Lock()
+
+# Lease files this process holds shared while it has searches running, keyed by user ID
+_LEASE_FILES = {}
+_LEASE_FILE_LOCKS = defaultdict(threading.Lock)
+
+# Source signature of each tenant as this process last opened or wrote it; another one on disk
+# means a different worker changed the store since
+_KNOWN_SIGNATURES = {}
+_CLIENT_STARTED = {}
+
+# Lock file held for the life of the process that runs background jobs
+_BACKGROUND_LOCK = None
+
+metrics.OPEN_TENANT_STORES.set_function(lambda: len(_STORE_CACHE))
+
+
+# ---------------------------- Tenant Layout --------------------------- #
+
+def user_vectorstore_path(user_id: str) -> Path:
+    """Return the directory of a user's vector store (directory layout)."""
+    return USER_VECTORSTORE_ROOT / user_id
+
+
+def tenant_collection_name(user_id: str) -> str:
+    """Chroma collection name of a tenant; IDs that are not valid names are hashed."""
+    name = f"tenant-{user_id}"
+    if COLLECTION_NAME_PATTERN.match(name):
+        return name
+    return f"tenant-{hashlib.sha1(user_id.encode('utf-8')).hexdigest()}"
+
+
+def tenant_shard(user_id: str) -> int:
+    """Stable shard number of a tenant."""
+    digest = hashlib.sha1(user_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % max(1, settings.tenant_shards)
+
+
+def tenant_shard_path(shard: int) -> Path:
+    return Path(settings.tenant_store_root) / f"shard_{shard:02d}"
+
+
+def get_tenant_client(shard: int):
+    """Return the shared persistent Chroma client of a shard, creating it once per process."""
+    with _CLIENT_LOCK:
+        if shard not in _CLIENTS:
+            import chromadb
+            from chromadb.config import Settings as ChromaSettings
+
+            path = tenant_shard_path(shard)
+            path.mkdir(parents=True, exist_ok=True)
+            _CLIENT_STARTED[shard] = time.time()
+            _CLIENTS[shard] = chromadb.PersistentClient(
+                path=str(path), settings=ChromaSettings(anonymized_telemetry=False))
+        return _CLIENTS[shard]
+
+
+def _index_directory(user_id: str, storage: Optional[str] = None) -> Path:
+    """Directory holding a tenant's flat snapshot, manifest and document catalog."""
+    if (storage or settings.tenant_storage) == "collection":
+        return Path(settings.tenant_store_root) / "flat" / tenant_collection_name(user_id)
+    return user_vectorstore_path(user_id)
+
+
+def _marker_path(user_id: str) -> Path:
+    return Path(settings.tenant_store_root) / "markers" / tenant_collection_name(user_id)
+
+
+def _lock_path(user_id: str, suffix: str) -> Path:
+    path = Path(settings.tenant_store_root) / "locks" / f"{tenant_collection_name(user_id)}.{suffix}"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def pending_deletion_directory() -> Path:
+    return Path(settings.tenant_store_root) / "pending_deletes"
+
+
+def pending_deletion_path(user_id: str) -> Path:
+    """Marker of a tenant with deletes that still have to be removed from disk."""
+    return pending_deletion_directory() / f"{tenant_collection_name(user_id)}.json"
+
+
+def read_pending_deletion(user_id: str) -> dict:
+    try:
+        with open(pending_deletion_path(user_id), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def tenant_cleared(user_id: str) -> bool:
+    """Whether the tenant was cleared and only waits for its files to be removed."""
+    return pending_deletion_path(user_id).exists() and read_pending_deletion(user_id).get("clear", False)
+
+
+def mark_tenant_changed(user_id: str) -> None:
+    """
+    Record that a tenant's data changed so cached handles and flat snapshots are refreshed.
+
+    In the directory layout the mtime of ``chroma.sqlite3`` already changes; shared clients
+    write to one sqlite file for many tenants, so a per-tenant marker file gets a new version.
+    """
+    if settings.tenant_storage == "collection":
+        write_tenant_marker(user_id)
+    _KNOWN_SIGNATURES[user_id] = _source_signature(user_id)
+
+
+def write_tenant_marker(user_id: str) -> None:
+    """Give a tenant's marker file a new random version."""
+    marker = _marker_path(user_id)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    temporary = marker.with_name(f"{marker.name}.{uuid.uuid4().hex}.tmp")
+    temporary.write_text(uuid.uuid4().hex, encoding="utf-8")
+    os.replace(temporary, marker)
+
+
+def _file_signature(path: Path) -> dict:
+    if not path.exists():
+        return {}
+    stat = path.stat()
+    # The inode changes when compaction swaps in a rebuilt store
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "inode": stat.st_ino}
+
+
+def _source_signature(user_id: str) -> dict:
+    """Cheap fingerprint of a tenant's source data, used to detect stale handles and snapshots."""
+    if settings.tenant_storage == "collection":
+        try:
+            return {"version": _marker_path(user_id).read_text(encoding="utf-8")}
+        except OSError:
+            return {}
+    return _file_signature(user_vectorstore_path(user_id) / "chroma.sqlite3")
+
+
+def tenant_location(user_id: str) -> str:
+    """Human-readable location of a tenant's data, for API responses and logs."""
+    if settings.tenant_storage == "collection":
+        return f"{tenant_shard_path(tenant_shard(user_id))}#{tenant_collection_name(user_id)}"
+    return str(user_vectorstore_path(user_id))
+
+
+def _changed_elsewhere(user_id: str) -> bool:
+    """Whether another worker process changed the tenant since this process last opened or wrote it."""
+    known = _KNOWN_SIGNATURES.get(user_id)
+    if known is not None:
+        return known != _source_signature(user_id)
+    # Never opened here: only a shard client started before another worker's write can be stale
+    if settings.tenant_storage != "collection":
+        return False
+    started = _CLIENT_STARTED.get(tenant_shard(user_id))
+    try:
+        return started is not None and _marker_path(user_id).stat().st_mtime > started
+    except OSError:
+        return False
+
+
+def _detach_chroma_system(path: Path) -> None:
+    """
+    Make the next client for a persist directory start a fresh Chroma system.
+
+    Unlike ``release_chroma_system`` the old system is not stopped, so searches still running on
+    handles from it finish; it goes away with the last of them.
+    """
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    SharedSystemClient._identifier_to_system.pop(str(path), None)
+    SharedSystemClient._identifier_to_refcount.pop(str(path), None)
+
+
+def _refresh_if_changed_elsewhere(user_id: str) -> None:
+    """Drop this process's Chroma system of a tenant that another worker changed since."""
+    if not _changed_elsewhere(user_id):
+        return
+    if settings.tenant_storage == "collection":
+        shard = tenant_shard(user_id)
+        with _CLIENT_LOCK:
+            _CLIENTS.pop(shard, None)
+            _detach_chroma_system(tenant_shard_path(shard))
+    else:
+        _detach_chroma_system(user_vectorstore_path(user_id))
+    # The store cache keys on the source signature, so it reloads by itself
+    print(f"🔄 Reloading store of {user_id}, it was changed by another worker")
+
+
+def open_tenant_chroma(user_id: str, embedding_function, create: bool = False) -> Optional[Chroma]:
+    """
+    Open the Chroma store of a tenant in the configured layout.
+
+    :param user_id: The tenant.
+    :param embedding_function: The embedding model used for queries and inserts.
+    :param create: Create the store if it does not exist yet.
+    :return: A LangChain Chroma store, or None if the tenant has no store and create is False.
+    """
+    _refresh_if_changed_elsewhere(user_id)
+    if settings.tenant_storage == "collection":
+        client = get_tenant_client(tenant_shard(user_id))
+        name = tenant_collection_name(user_id)
+        if not create:
+            try:
+                client.get_collection(name)
+            except Exception:
+                return None
+        store = Chroma(client=client, collection_name=name, embedding_function=embedding_function,
+                       collection_metadata={"user_id": user_id})
+    else:
+        directory = user_vectorstore_path(user_id)
+        if not directory.exists():
+            if not create:
+                return None
+            directory.mkdir(parents=True, exist_ok=True)
+        store = Chroma(persist_directory=str(directory), embedding_function=embedding_function)
+    # Opening may itself touch the sqlite file, so remember the signature afterwards
+    _KNOWN_SIGNATURES[user_id] = _source_signature(user_id)
+    return store
+
+
+def tenant_exists(user_id: str) -> bool:
+    """Whether a tenant has a live store, without opening it in the directory layout."""
+    return not tenant_cleared(user_id) and _store_exists(user_id)
+
+
+def _store_exists(user_id: str) -> bool:
+    if settings.tenant_storage == "collection":
+        try:
+            get_tenant_client(tenant_shard(user_id)).get_collection(tenant_collection_name(user_id))
+            return True
+        except Exception:
+            return False
+    return user_vectorstore_path(user_id).exists()
+
+
+def add_user_documents(user_id: str, documents: list, embedding_function,
+                       ids: Optional[List[str]] = None) -> List[str]:
+    """Embed and add documents to a tenant's store, creating it if needed."""
+    with tenant_write_lock(user_id):
+        store = open_tenant_chroma(user_id, embedding_function, create=True)
+        ids = store.add_documents(documents, ids=ids)
+        mark_tenant_changed(user_id)
+    return ids
+
+
+def delete_user_chunks(user_id: str, ids: List[str], embedding_function) -> None:
+    """Delete chunks of a tenant by ID."""
+    with tenant_write_lock(user_id):
+        store = open_tenant_chroma(user_id, embedding_function)
+        if store is None or not ids:
+            return
+        store._collection.delete(ids=ids)
+        mark_tenant_changed(user_id)
+
+
+def release_chroma_system(directory: Path) -> None:
+    """
+    Stop the Chroma system cached for a persist directory.
+
+    chromadb keeps one system per path for the life of the process; without this a store that
+    is created again at the same path writes through the stale, read-only handle.
+    """
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    system = SharedSystemClient._identifier_to_system.pop(str(directory), None)
+    SharedSystemClient._identifier_to_refcount.pop(str(directory), None)
+    if system is not None:
+        system.stop()
+    # The next open starts from scratch anyway (directories are named by user ID)
+    _KNOWN_SIGNATURES.pop(directory.name, None)
+
+
+def delete_tenant(user_id: str) -> bool:
+    """
+    Remove a tenant's store, snapshots and catalog from disk. Returns False if it had none.
+
+    Use ``deletion.clear_tenant`` from request handlers; this runs once no search uses the store.
+    """
+    import shutil
+
+    invalidate_user_vectorstore(user_id)
+    if settings.tenant_storage == "collection":
+        if not _store_exists(user_id):
+            return False
+        get_tenant_client(tenant_shard(user_id)).delete_collection(tenant_collection_name(user_id))
+        shutil.rmtree(_index_directory(user_id), ignore_errors=True)
+        mark_tenant_changed(user_id)
+        return True
+
+    directory = user_vectorstore_path(user_id)
+    if not directory.exists():
+        return False
+    release_chroma_system(directory)
+    # Move the directory aside first, so no process can open a half-removed store
+    trash = Path(settings.tenant_store_root) / "trash" / f"{user_id}-{uuid.uuid4().hex}"
+    trash.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(directory, trash)
+    shutil.rmtree(trash, ignore_errors=True)
+    return True
+
+
+# ---------------------------- Leases --------------------------- #
+
+def _share_lease_file(user_id: str) -> None:
+    """Take the tenant's lease file shared for this process; waits while another worker holds it exclusively."""
+    with _LEASE_FILE_LOCKS[user_id]:
+        if user_id in _LEASE_FILES:
+            _LEASE_FILES[user_id][1] += 1
+            return
+        file = open(_lock_path(user_id, "lease"), "a")
+        try:
+            fcntl.flock(file, fcntl.LOCK_SH)
+        except BaseException:
+            file.close()
+            raise
+        _LEASE_FILES[user_id] = [file, 1]
+
+
+def _unshare_lease_file(user_id: str) -> None:
+    with _LEASE_FILE_LOCKS[user_id]:
+        entry = _LEASE_FILES[user_id]
+        entry[1] -= 1
+        if not entry[1]:
+            del _LEASE_FILES[user_id]
+            fcntl.flock(entry[0], fcntl.LOCK_UN)
+            entry[0].close()
+
+
+@contextmanager
+def lease(user_id: str):
+    """Mark a tenant's store as in use, in every worker process, for the duration of the block."""
+    with _LEASE_CONDITION:
+        _LEASE_CONDITION.wait_for(lambda: user_id not in _EXCLUSIVE)
+        _LEASES[user_id] += 1
+    try:
+        _share_lease_file(user_id)
+        try:
+            yield
+        finally:
+            _unshare_lease_file(user_id)
+    finally:
+        with _LEASE_CONDITION:
+            _LEASES[user_id] -= 1
+            if not _LEASES[user_id]:
+                del _LEASES[user_id]
+                _LEASE_CONDITION.notify_all()
+
+
+@contextmanager
+def exclusive(user_id: str, timeout: float):
+    """
+    Hold a tenant's store with no search running in any worker process, e.g. to remove or swap files.
+
+    New searches wait until the block ends; raises TimeoutError if running ones take longer
+    than ``timeout`` to finish.
+    """
+    deadline = time.monotonic() + timeout
+    with _LEASE_CONDITION:
+        _LEASE_CONDITION.wait_for(lambda: user_id not in _EXCLUSIVE)
+        _EXCLUSIVE.add(user_id)
+        if not _LEASE_CONDITION.wait_for(lambda: user_id not in _LEASES, timeout):
+            _EXCLUSIVE.discard(user_id)
+            _LEASE_CONDITION.notify_all()
+            raise TimeoutError(f"Store of {user_id} is still in use")
+
+    file = None
+    try:
+        # Searches of other workers hold the lease file shared; wait for them without blocking forever
+        file = open(_lock_path(user_id, "lease"), "a")
+        while True:
+            try:
+                fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Store of {user_id} is still in use by another worker")
+                time.sleep(0.05)
+        yield
+    finally:
+        if file is not None:
+            file.close()
+        with _LEASE_CONDITION:
+            _EXCLUSIVE.discard(user_id)
+            _LEASE_CONDITION.notify_all()
+
+
+class TenantWriteLock:
+    """
+    Reentrant per-tenant lock shared by all worker processes.
+
+    A thread first takes the in-process lock, then the first (outermost) acquisition also takes
+    an exclusive ``flock`` on the tenant's lock file, so writes in other workers wait as well.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self) -> None:
+        self._lock.acquire()
+        if not self._depth:
+            try:
+                file = open(_lock_path(self.user_id, "lock"), "a")
+                fcntl.flock(file, fcntl.LOCK_EX)
+            except BaseException:
+                self._lock.release()
+                raise
+            self._file = file
+        self._depth += 1
+
+    def release(self) -> None:
+        self._depth -= 1
+        if not self._depth:
+            # Closing the file releases the flock
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+    def __enter__(self) -> "TenantWriteLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def tenant_write_lock(user_id: str) -> TenantWriteLock:
+    """Lock held while a tenant's documents, catalog or files are changed, in any worker process."""
+    with _WRITE_LOCKS_LOCK:
+        if user_id not in _WRITE_LOCKS:
+            _WRITE_LOCKS[user_id] = TenantWriteLock(user_id)
+        return _WRITE_LOCKS[user_id]
+
+
+# ---------------------------- Background Role --------------------------- #
+
+def claim_background_role() -> bool:
+    """
+    Try to become the process that runs background jobs (deletes, compaction, tiering).
+
+    The first worker to take the background lock file keeps it until it exits; a replacement
+    worker started after that can take it over.
+    """
+    global _BACKGROUND_LOCK
+    if _BACKGROUND_LOCK is not None:
+        return True
+    path = Path(settings.tenant_store_root) / "locks" / "background.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    file = open(path, "a")
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        file.close()
+        return False
+    _BACKGROUND_LOCK = file
+    return True
+
+
+def is_background_process() -> bool:
+    return _BACKGROUND_LOCK is not None
+
+
+class TenantStoreHandle(VectorStore):
+    """Query view of a tenant store that hides tombstoned chunks and leases the tenant while searching."""
+
+    def __init__(self, user_id: str, store: VectorStore):
+        self.user_id = user_id
+        self.store = store
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "store":
+            raise AttributeError(name)
+        return getattr(self.store, name)
+
+    @property
+    def embeddings(self):
+        return self.store.embeddings
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def _search(self, search, k: int, filter: Optional[dict] = None, **kwargs: Any) -> list:
+        """Run a search, pushing a metadata filter (see the filters module) into the store."""
+        from ragchallenge.api.catalog import active_tombstones
+
+        with lease(self.user_id):
+            store = self.store
+            if filter:
+                kwargs["filter"] = filter if isinstance(store, FlatVectorStore) else chroma_where(filter)
+
+            tombstones = active_tombstones(self.user_id)
+            if not tombstones:
+                return search(store, k=k, **kwargs)
+
+            # Fetch enough extra results to still return k after dropping hidden chunks
+            hidden = sum(tombstone["chunks"] if tombstone["chunks"] is not None else settings.tombstone_overfetch
+                         for tombstone in tombstones)
+            results = search(store, k=k + min(hidden, settings.tombstone_max_overfetch), **kwargs)
+        return self._visible(results, tombstones)[:k]
+
+    @staticmethod
+    def _visible(results: list, tombstones: List[dict]) -> list:
+        """Drop results (documents or (document, score) tuples) hidden by a tombstone."""
+        hidden_ids = {chunk_id for tombstone in tombstones for chunk_id in tombstone["chunk_ids"] or []}
+        filters = [where for tombstone in tombstones for where in tombstone["filters"]]
+        visible = []
+        for result in results:
+            document = result[0] if isinstance(result, tuple) else result
+            if document.id in hidden_ids or any(metadata_matches(document.metadata, where) for where in filters):
+                continue
+            visible.append(result)
+        return visible
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        """Chunks with the given IDs, e.g. the neighbours of a hit; tombstoned chunks are skipped."""
+        from ragchallenge.api.catalog import active_tombstones
+
+        with lease(self.user_id):
+            if isinstance(self.store, FlatVectorStore):
+                documents = self.store.get_by_ids(ids)
+            else:
+                results = self.store.get(ids=list(ids), include=["documents", "metadatas"])
+                documents = [Document(page_content=text, metadata=metadata or {}, id=doc_id) for doc_id, text, metadata
+                             in zip(results["ids"], results["documents"], results["metadatas"])]
+            tombstones = active_tombstones(self.user_id)
+        return self._visible(documents, tombstones) if tombstones else documents
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self._search(lambda store, **options: store.similarity_search(query, **options), k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return self._search(lambda store, **options: store.similarity_search_by_vector(embedding, **options), k, **kwargs)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> list:
+        return self._search(lambda store, **options: store.similarity_search_with_score(query, **options), k, **kwargs)
+
+    def similarity_search_with_relevance_scores(self, query: str, k: int = 4, **kwargs: Any) -> list:
+        return self._search(
+            lambda store, **options: store.similarity_search_with_relevance_scores(query, **options), k, **kwargs)
+
+    def cosine_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> list:
+        """(Document, cosine similarity) tuples, whichever store serves the search (see the relevance module)."""
+        from ragchallenge.api.relevance import cosine_search
+
+        return self._search(lambda store, **options: cosine_search(store, embedding, **options), k, **kwargs)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        """Add texts to the tenant's Chroma store under its write lock (see add_user_documents)."""
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        return add_user_documents(self.user_id, documents, self.embeddings, ids=ids)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        """
+        Add texts to a tenant's store, creating it if needed, and open it for querying.
+
+        :param user_id: The tenant, passed as a keyword argument.
+        """
+        user_id = kwargs.pop("user_id", None)
+        if not user_id:
+            raise ValueError("TenantStoreHandle.from_texts needs a user_id")
+        documents = [Document(page_content=text, metadata=metadata)
+                     for text, metadata in zip(texts, metadatas or [{} for _ in texts])]
+        add_user_documents(user_id, documents, embedding, ids=kwargs.get("ids"))
+        return open_user_vectorstore(user_id, embedding)
+
+
+# ---------------------------- Flat Snapshots --------------------------- #
+
+def _read_manifest(directory: Path) -> dict:
+    try:
+        with open(directory / FLAT_MANIFEST_FILE, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(directory: Path, manifest: dict) -> None:
+    temporary = directory / f"{FLAT_MANIFEST_FILE}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(temporary, directory / FLAT_MANIFEST_FILE)
+
+
+def _flat_options() -> dict:
+    return {"quantization": settings.vector_quantization, "rescore_factor": settings.quantization_rescore_factor}
+
+
+def build_flat_index(chroma_store: Chroma, directory: Path, embedding_function) -> FlatVectorStore:
+    """Export a Chroma collection into a persisted FlatVectorStore without re-embedding."""
+    results = chroma_store._collection.get(include=["embeddings", "documents", "metadatas"])
+    flat_store = FlatVectorStore(embedding_function=embedding_function, **_flat_options())
+    if results["ids"]:
+        flat_store.add_embeddings(
+            texts=results["documents"],
+            embeddings=results["embeddings"],
+            metadatas=results["metadatas"],
+            ids=results["ids"],
+        )
+    flat_store.save(str(directory))
+
+    if flat_store.quantization != "none":
+        report = flat_store.check_recall()
+        print(f"🗜️  {report['quantization']} codes for {directory}: recall@{report['k']}={report['recall_at_k']}, "
+              f"{report['compression']}x less RAM than float32, {report['disk_bytes'] / 1e6:.1f} MB on disk")
+    return FlatVectorStore.load(str(directory), embedding_function, **_flat_options())
+
+
+def _open_store(user_id: str, embedding_function):
+    """Open a store with the configured backend, choosing flat vs. HNSW automatically in 'auto' mode."""
+    backend = settings.vector_backend
+    directory = _index_directory(user_id)
+    signature = _source_signature(user_id)
+
+    if backend in ("auto", "flat"):
+        manifest = _read_manifest(directory)
+        if manifest.get("source") == signature:
+            if manifest.get("backend") == "flat" and FlatVectorStore.exists(str(directory)):
+                return FlatVectorStore.load(str(directory), embedding_function, **_flat_options())
+            if manifest.get("backend") == "hnsw" and backend == "auto":
+                return open_tenant_chroma(user_id, embedding_function)
+
+    chroma_store = open_tenant_chroma(user_id, embedding_function)
+    if backend == "chroma" or chroma_store is None:
+        return chroma_store
+
+    # Opening a Chroma client may itself touch the sqlite file, so fingerprint it afterwards
+    count = chroma_store._collection.count()
+    signature = _source_signature(user_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    if backend == "flat" or count <= settings.flat_index_max_chunks:
+        flat_store = build_flat_index(chroma_store, directory, embedding_function)
+        _write_manifest(directory, {"source": signature, "backend": "flat", "count": count})
+        print(f"📐 Using flat index for {tenant_location(user_id)} ({count} chunks)")
+        return flat_store
+
+    _write_manifest(directory, {"source": signature, "backend": "hnsw", "count": count})
+    print(f"🕸️  Using HNSW index for {tenant_location(user_id)} ({count} chunks)")
+    return chroma_store
+
+
+def open_user_vectorstore(user_id: str, embedding_function):
+    """
+    Open a user's vector store for querying.
+
+    :param user_id: The user whose store to open.
+    :param embedding_function: The embedding model used for queries.
+    :return: A TenantStoreHandle, or None if the user has no store.
+    """
+    if not tenant_exists(user_id):
+        return None
+
+    store = _cached_store(user_id)
+    if store is not None:
+        return TenantStoreHandle(user_id, store)
+
+    with _STORE_LOCK:
+        open_lock = _OPEN_LOCKS.setdefault(user_id, threading.Lock())
+    with open_lock:
+        # Another thread may have opened the store while this one waited
+        store = _cached_store(user_id)
+        if store is None:
+            store = _open_store(user_id, embedding_function)
+            if store is None:
+                return None
+            signature = _source_signature(user_id)
+            with _STORE_LOCK:
+                _STORE_CACHE[user_id] = (signature, store)
+    return TenantStoreHandle(user_id, store)
+
+
+def _cached_store(user_id: str):
+    """The cached store of a tenant if its data has not changed since it was opened, else None."""
+    signature = _source_signature(user_id)
+    with _STORE_LOCK:
+        cached = _STORE_CACHE.get(user_id)
+    return cached[1] if cached and cached[0] == signature else None
+
+
+def invalidate_user_vectorstore(user_id: str) -> None:
+    """Drop a cached store handle, e.g. after the tenant's data was removed."""
+    with _STORE_LOCK:
+        _STORE_CACHE.pop(user_id, None)
@@ -0,0 +1,150 @@
+"""
+Tenant Migration
+Moves per-user Chroma directories into collections of the shared tenant clients.
+
+Embeddings, documents, metadata and chunk IDs are copied as they are, nothing is re-embedded.
+Each tenant is verified by comparing chunk counts before the source directory may be removed.
+Afterwards set ``TENANT_STORAGE = "collection"``.
+
+Usage:
+    python -m ragchallenge.api.tenant_migration --dry-run
+    python -m ragchallenge.api.tenant_migration --remove-source
+"""
+
+import argparse
+import shutil
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from ragchallenge.api.catalog import CATALOG_FILE, catalog_path
+from ragchallenge.api.config import settings
+from ragchallenge.api.stores import (
+    DIRECTORY_COLLECTION, USER_VECTORSTORE_ROOT, get_tenant_client, tenant_collection_name, tenant_shard,
+    write_tenant_marker)
+
+
+def directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob("*") if file.is_file())
+
+
+def file_count(path: Path) -> int:
+    return sum(1 for file in path.rglob("*") if file.is_file())
+
+
+def migrate_directory_store(directory: Path, user_id: str, batch_size: int = 1000) -> dict:
+    """
+    Copy one directory store into its tenant collection.
+
+    :param directory: The per-user Chroma directory.
+    :param user_id: The tenant the directory belongs to.
+    :param batch_size: Chunks copied per request.
+    :return: Chunk counts and the time it took to open the source store.
+    """
+    import chromadb
+    from chromadb.config import Settings as ChromaSettings
+
+    start = time.perf_counter()
+    source_client = chromadb.PersistentClient(path=str(directory), settings=ChromaSettings(anonymized_telemetry=False))
+    source = source_client.get_collection(DIRECTORY_COLLECTION)
+    source_count = source.count()
+    open_s = time.perf_counter() - start
+
+    target = get_tenant_client(tenant_shard(user_id)).get_or_create_collection(
+        tenant_collection_name(user_id), metadata={"user_id": user_id})
+    for offset in range(0, source_count, batch_size):
+        batch = source.get(include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset)
+        if batch["ids"]:
+            target.upsert(ids=batch["ids"], embeddings=batch["embeddings"],
+                          documents=batch["documents"], metadatas=batch["metadatas"])
+
+    # Carry the document catalog over; without it the catalog is rebuilt from chunk metadata
+    if (directory / CATALOG_FILE).exists():
+        target_catalog = catalog_path(user_id, "collection")
+        target_catalog.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(directory / CATALOG_FILE, target_catalog)
+
+    write_tenant_marker(user_id)
+    return {"user_id": user_id, "source_chunks": source_count, "target_chunks": target.count(),
+            "source_open_ms": round(open_s * 1000, 2)}
+
+
+def measure_tenant_open(user_ids: List[str]) -> float:
+    """Average milliseconds to open a tenant collection and count its chunks on the shared clients."""
+    if not user_ids:
+        return 0.0
+    start = time.perf_counter()
+    for user_id in user_ids:
+        get_tenant_client(tenant_shard(user_id)).get_collection(tenant_collection_name(user_id)).count()
+    return (time.perf_counter() - start) * 1000 / len(user_ids)
+
+
+def migrate(source_root: Path, users: Optional[List[str]] = None, remove_source: bool = False,
+            dry_run: bool = False) -> dict:
+    """Migrate all (or the given) per-user directories and return a summary."""
+    directories = sorted(path for path in source_root.iterdir()
+                         if path.is_dir() and (path / "chroma.sqlite3").exists()
+                         and (users is None or path.name in users))
+    summary = {
+        "tenants": len(directories),
+        "source_files": sum(file_count(path) for path in directories),
+        "source_bytes": sum(directory_size(path) for path in directories),
+        "shards": settings.tenant_shards,
+        "migrated": [],
+        "failed": [],
+    }
+    if dry_run:
+        return summary
+
+    for directory in directories:
+        try:
+            result = migrate_directory_store(directory, directory.name)
+        except Exception as e:
+            summary["failed"].append({"user_id": directory.name, "error": f"{type(e).__name__}: {e}"})
+            print(f"❌ {directory.name}: {e}")
+            continue
+        verified = result["source_chunks"] == result["target_chunks"]
+        result["verified"] = verified
+        summary["migrated"].append(result)
+        print(f"{'✅' if verified else '❌'} {directory.name}: {result['target_chunks']}/{result['source_chunks']} chunks")
+
+    migrated_ids = [result["user_id"] for result in summary["migrated"]]
+    summary["source_open_ms_avg"] = round(
+        sum(result["source_open_ms"] for result in summary["migrated"]) / max(1, len(migrated_ids)), 2)
+    summary["tenant_open_ms_avg"] = round(measure_tenant_open(migrated_ids), 2)
+
+    target_root = Path(settings.tenant_store_root)
+    summary["target_files"] = file_count(target_root)
+    summary["target_bytes"] = directory_size(target_root)
+
+    if remove_source:
+        for result in summary["migrated"]:
+            if result["verified"]:
+                shutil.rmtree(source_root / result["user_id"])
+        print(f"🗑️  Removed {sum(r['verified'] for r in summary['migrated'])} migrated source directories")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate per-user Chroma directories into shared tenant collections.")
+    parser.add_argument("--source", default=str(USER_VECTORSTORE_ROOT), help="Directory with one folder per user")
+    parser.add_argument("--users", nargs="*", help="Only migrate these user IDs")
+    parser.add_argument("--remove-source", action="store_true", help="Delete verified source directories")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be migrated")
+    args = parser.parse_args()
+
+    summary = migrate(Path(args.source), users=args.users, remove_source=args.remove_source, dry_run=args.dry_run)
+    print(f"\n📦 {summary['tenants']} tenant directories, {summary['source_files']} files, "
+          f"{summary['source_bytes'] / 1e6:.1f} MB")
+    if not args.dry_run:
+        print(f"📦 Shared tenant stores: {summary['target_files']} files, {summary['target_bytes'] / 1e6:.1f} MB "
+              f"in {settings.tenant_shards} shards")
+        print(f"⏱️  Open cost per tenant: {summary['source_open_ms_avg']:.1f} ms (directory) -> "
+              f"{summary['tenant_open_ms_avg']:.2f} ms (shared collection)")
+        if summary["failed"]:
+            print(f"❌ {len(summary['failed'])} tenants failed, their directories were kept")
+        print('✅ Set TENANT_STORAGE = "collection" to serve from the shared stores')
+
+
+if __name__ == "__main__":
+    main()
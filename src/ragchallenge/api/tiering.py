@@ -0,0 +1,251 @@
+"""
+Tiering Module
+Moves the stores of idle tenants to a cold directory and restores them on their next access.
+
+Most anonymous and occasional users upload once and never come back, but their stores stay
+on the fast disk next to the active ones. A tenant whose store was not accessed for
+``tiering_idle_days`` is frozen: its chunks, embeddings and catalog are written to one
+snapshot file in ``cold_store_root`` (see the snapshots module) and the live store is
+removed. The next query, upload, listing or delete restores the snapshot without
+re-embedding before it proceeds; restore times are recorded in ``rag_cold_restore_seconds``.
+
+Accesses are recorded by touching a per-tenant file at most once a minute. Freezing and
+restoring a tenant hold the tenant's write lock, which is shared by all worker processes, so
+several workers never freeze and restore the same tenant at once. A scheduler thread freezes idle stores every
+``tiering_interval_seconds``; the admin router freezes and restores on demand.
+
+Usage:
+    python -m ragchallenge.api.tiering [--user-id <user_id>] [--restore] [--report]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from ragchallenge.api import catalog, metrics
+from ragchallenge.api.config import settings
+from ragchallenge.api.snapshots import export_tenant, import_tenant
+from ragchallenge.api.stores import (
+    USER_VECTORSTORE_ROOT, delete_tenant, exclusive, get_tenant_client, tenant_collection_name, tenant_exists,
+    tenant_shard_path, tenant_write_lock, user_vectorstore_path)
+
+ACCESS_TOUCH_INTERVAL = 60.0
+
+_LAST_TOUCH = {}
+_SCHEDULER = None
+_SCHEDULER_LOCK = threading.Lock()
+
+
+def _tiering_root() -> Path:
+    return Path(settings.tenant_store_root) / "tiering"
+
+
+def cold_archive_path(user_id: str) -> Path:
+    """Snapshot file of a frozen tenant."""
+    return Path(settings.cold_store_root) / f"{tenant_collection_name(user_id)}.snapshot.tar"
+
+
+def is_cold(user_id: str) -> bool:
+    return cold_archive_path(user_id).exists()
+
+
+def _tenant_lock(user_id: str):
+    """Lock held while a tenant is frozen or restored, shared by all worker processes."""
+    return tenant_write_lock(user_id)
+
+
+# ---------------------------- Access Tracking --------------------------- #
+
+def _access_path(user_id: str) -> Path:
+    return _tiering_root() / "access" / tenant_collection_name(user_id)
+
+
+def record_access(user_id: str) -> None:
+    """Mark a tenant as recently used; writes to disk at most once per ``ACCESS_TOUCH_INTERVAL``."""
+    now = time.time()
+    if now - _LAST_TOUCH.get(user_id, 0.0) < ACCESS_TOUCH_INTERVAL:
+        return
+    _LAST_TOUCH[user_id] = now
+    path = _access_path(user_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+def last_access(user_id: str) -> float:
+    """Last recorded access, falling back to the last write for stores older than access tracking."""
+    paths = [_access_path(user_id), catalog.catalog_path(user_id)]
+    if settings.tenant_storage != "collection":
+        paths.append(user_vectorstore_path(user_id) / "chroma.sqlite3")
+    times = [path.stat().st_mtime for path in paths if path.exists()]
+    return max(times) if times else time.time()
+
+
+def hot_tenants() -> List[str]:
+    """Tenants with a live store in the configured layout."""
+    if settings.tenant_storage != "collection":
+        if not USER_VECTORSTORE_ROOT.exists():
+            return []
+        return sorted(path.name for path in USER_VECTORSTORE_ROOT.iterdir() if path.is_dir())
+
+    user_ids = set()
+    for shard in range(max(1, settings.tenant_shards)):
+        if not tenant_shard_path(shard).exists():
+            continue
+        for collection in get_tenant_client(shard).list_collections():
+            user_id = (collection.metadata or {}).get("user_id")
+            # Temporary compaction collections carry the metadata of their source
+            if user_id and collection.name == tenant_collection_name(user_id):
+                user_ids.add(user_id)
+    return sorted(user_ids)
+
+
+# ---------------------------- Freeze and Restore --------------------------- #
+
+def freeze(user_id: str, force: bool = False) -> dict:
+    """
+    Move a tenant's store to the cold tier if it was idle for ``tiering_idle_days``.
+
+    :param user_id: The tenant.
+    :param force: Freeze even if the store was used recently.
+    :return: What was done and the size of the archive.
+    """
+    with _tenant_lock(user_id):
+        if is_cold(user_id) or not tenant_exists(user_id):
+            return {"user_id": user_id, "frozen": False, "reason": "no live store"}
+        idle_days = (time.time() - last_access(user_id)) / 86400
+        if not force and (settings.tiering_idle_days <= 0 or idle_days < settings.tiering_idle_days):
+            return {"user_id": user_id, "frozen": False, "reason": "recently used", "idle_days": round(idle_days, 2)}
+
+        start = time.perf_counter()
+        archive = cold_archive_path(user_id)
+        temporary = archive.with_name(f"{archive.name}.{os.getpid()}.tmp")
+        manifest = export_tenant(user_id, str(temporary))
+        os.replace(temporary, archive)
+
+        # The archive is in place before the store goes, so a crash in between loses nothing
+        with exclusive(user_id, settings.deletion_drain_timeout):
+            delete_tenant(user_id)
+        _LAST_TOUCH.pop(user_id, None)
+        try:
+            os.remove(_access_path(user_id))
+        except FileNotFoundError:
+            pass
+
+    metrics.FROZEN_TENANTS.inc()
+    seconds = time.perf_counter() - start
+    print(f"🧊 Froze store of {user_id} ({manifest['count']} chunks, idle {idle_days:.1f} days) in {seconds:.2f}s")
+    return {"user_id": user_id, "frozen": True, "chunks": manifest["count"], "archive_bytes": archive.stat().st_size,
+            "idle_days": round(idle_days, 2), "seconds": round(seconds, 3)}
+
+
+def restore(user_id: str) -> dict:
+    """
+    Load a frozen tenant's archive back into a live store and remove the archive.
+
+    Loading upserts by chunk ID, so a restore that was interrupted, or an archive left next to
+    a live store by an interrupted freeze, is simply loaded again.
+    """
+    with _tenant_lock(user_id):
+        archive = cold_archive_path(user_id)
+        if not archive.exists():
+            return {"user_id": user_id, "restored": False}
+        start = time.perf_counter()
+        result = import_tenant(user_id, str(archive), force=True)
+        os.remove(archive)
+
+    seconds = time.perf_counter() - start
+    metrics.RESTORE_SECONDS.observe(seconds)
+    print(f"🔥 Restored store of {user_id} ({result['imported_chunks']} chunks) from the cold tier in {seconds:.2f}s")
+    return {"user_id": user_id, "restored": True, "chunks": result["imported_chunks"], "seconds": round(seconds, 3)}
+
+
+def ensure_hot(user_id: str) -> bool:
+    """Record an access and restore the tenant first if it is frozen. Returns True if it was restored."""
+    record_access(user_id)
+    if not is_cold(user_id):
+        return False
+    return restore(user_id)["restored"]
+
+
+def discard(user_id: str) -> bool:
+    """Remove a frozen tenant's archive, e.g. when the tenant is cleared. Returns False if it had none."""
+    with _tenant_lock(user_id):
+        try:
+            os.remove(cold_archive_path(user_id))
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def freeze_idle() -> List[dict]:
+    """Freeze every live store that was idle for ``tiering_idle_days``."""
+    results = []
+    for user_id in hot_tenants():
+        try:
+            result = freeze(user_id)
+        except Exception as e:
+            print(f"⚠️  Freezing store of {user_id} failed: {e}")
+            result = {"user_id": user_id, "frozen": False, "error": str(e)}
+        if result["frozen"] or "error" in result:
+            results.append(result)
+    return results
+
+
+def tier_report() -> dict:
+    """Number of live and frozen tenants and the size of the cold tier."""
+    archives = list(Path(settings.cold_store_root).glob("*.snapshot.tar"))
+    return {
+        "hot_tenants": len(hot_tenants()),
+        "cold_tenants": len(archives),
+        "cold_bytes": sum(path.stat().st_size for path in archives),
+        "idle_days": settings.tiering_idle_days,
+    }
+
+
+# ---------------------------- Scheduler --------------------------- #
+
+def _scheduler() -> None:
+    while True:
+        time.sleep(settings.tiering_interval_seconds)
+        freeze_idle()
+
+
+def start_tiering_scheduler() -> None:
+    """Freeze idle stores every ``tiering_interval_seconds`` in a background thread (0 disables)."""
+    global _SCHEDULER
+    if settings.tiering_interval_seconds <= 0 or settings.tiering_idle_days <= 0:
+        return
+    with _SCHEDULER_LOCK:
+        if _SCHEDULER is None or not _SCHEDULER.is_alive():
+            _SCHEDULER = threading.Thread(target=_scheduler, name="tiering-scheduler", daemon=True)
+            _SCHEDULER.start()
+
+
+# ---------------------------- Entry Point --------------------------- #
+
+def main():
+    parser = argparse.ArgumentParser(description="Move idle tenant stores to the cold tier and back.")
+    parser.add_argument("--user-id", help="Freeze (or restore) one tenant instead of all idle ones")
+    parser.add_argument("--restore", action="store_true", help="Restore the tenant from the cold tier")
+    parser.add_argument("--force", action="store_true", help="Freeze even if the store was used recently")
+    parser.add_argument("--report", action="store_true", help="Only print the tier sizes")
+    args = parser.parse_args()
+
+    if args.report:
+        print(json.dumps(tier_report()))
+    elif args.restore:
+        if not args.user_id:
+            parser.error("--restore needs --user-id")
+        print(json.dumps(restore(args.user_id)))
+    elif args.user_id:
+        print(json.dumps(freeze(args.user_id, force=args.force)))
+    else:
+        print(json.dumps(freeze_idle()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Tracing Module
+Lightweight request tracing with nested spans, kept in a context variable.
+
+Each HTTP request gets a trace ID and a root span; code along the pipeline opens child spans
+with ``with span("search"):``. When the request finishes the span tree is summarized in a
+``Server-Timing`` header and, optionally, written to the console or a JSONL file.
+Outside a request, ``span`` starts its own trace, so scripts and notebooks are traced too.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from ragchallenge.api.config import settings
+
+_CURRENT_SPAN: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_EXPORT_LOCK = threading.Lock()
+
+
+class Span:
+    """A named, timed unit of work with optional attributes and child spans."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attributes", "children", "start", "end", "error")
+
+    def __init__(self, name: str, trace_id: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.attributes = attributes
+        self.children: List[Span] = []
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict:
+        data = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "children": [child.to_dict() for child in self.children],
+        }
+        if self.error:
+            data["error"] = self.error
+        return data
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost open span, or None outside a trace."""
+    return _CURRENT_SPAN.get()
+
+
+def current_trace_id() -> Optional[str]:
+    active = _CURRENT_SPAN.get()
+    return active.trace_id if active else None
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Time a block as a child of the current span, or as a new trace if none is active.
+
+    :param name: Stage name, e.g. "embedding" or "llm.answer".
+    :param attributes: Extra key/value pairs stored on the span.
+    """
+    if not settings.tracing_enabled:
+        yield None
+        return
+
+    parent = _CURRENT_SPAN.get()
+    if parent is None:
+        with trace(name, **attributes) as root:
+            yield root
+        return
+
+    child = Span(name, parent.trace_id, parent, **attributes)
+    parent.children.append(child)
+    token = _CURRENT_SPAN.set(child)
+    try:
+        yield child
+    except Exception as e:
+        child.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        child.end = time.perf_counter()
+        _CURRENT_SPAN.reset(token)
+
+
+@contextmanager
+def trace(name: str, trace_id: Optional[str] = None, **attributes):
+    """
+    Start a new trace with a root span and export it when the block exits.
+
+    :param name: Name of the root span, e.g. "POST /generate-answer".
+    :param trace_id: Reuse an incoming trace ID instead of generating one.
+    """
+    root = Span(name, trace_id or uuid.uuid4().hex, None, **attributes)
+    token = _CURRENT_SPAN.set(root)
+    try:
+        yield root
+    except Exception as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.end = time.perf_counter()
+        _CURRENT_SPAN.reset(token)
+        export(root)
+
+
+def server_timing(root: Span) -> str:
+    """
+    Summarize a span tree as a Server-Timing header value.
+
+    Durations of spans with the same name are summed, e.g. several "search" spans of a
+    multi-query retrieval are reported as one entry; the root is reported as "total".
+    """
+    totals: Dict[str, float] = {}
+    pending = list(reversed(root.children))
+    while pending:
+        node = pending.pop()
+        totals[node.name] = totals.get(node.name, 0.0) + node.duration_ms
+        pending.extend(reversed(node.children))
+
+    entries = [f"{name.replace(' ', '_')};dur={duration:.1f}" for name, duration in totals.items()]
+    entries.append(f"total;dur={root.duration_ms:.1f}")
+    return ", ".join(entries)
+
+
+def _format_tree(node: Span, depth: int = 0) -> List[str]:
+    status = f" ❌ {node.error}" if node.error else ""
+    lines = [f"{'  ' * depth}{node.name}: {node.duration_ms:.1f} ms{status}"]
+    for child in node.children:
+        lines.extend(_format_tree(child, depth + 1))
+    return lines
+
+
+def export(root: Span) -> None:
+    """Write a finished trace to the configured exporter ("none", "console" or "file")."""
+    exporter = settings.tracing_exporter
+    if exporter == "console":
+        print(f"🧭 Trace {root.trace_id}\n" + "\n".join(_format_tree(root, 1)))
+    elif exporter == "file":
+        record = {"trace_id": root.trace_id, "timestamp": time.time(), **root.to_dict()}
+        os.makedirs(os.path.dirname(settings.tracing_file) or ".", exist_ok=True)
+        with _EXPORT_LOCK, open(settings.tracing_file, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record, default=str) + "\n")
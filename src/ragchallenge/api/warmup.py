@@ -0,0 +1,108 @@
+"""
+Warmup Module
+Loads models and the default index before the API reports ready.
+
+Without warmup the first question pays for loading the embedding model, opening the vector
+store and faulting in its pages. ``start_warmup`` runs these steps in a background thread so
+the liveness check answers immediately while ``/ready`` returns 503 until warmup succeeded.
+A failed warmup is reported on ``/ready`` and retried every ``warmup_retry_seconds``.
+"""
+
+import threading
+import time
+
+from ragchallenge.api.config import settings
+
+WARMUP_QUERY = "How do I create a new conda environment?"
+
+# Shared readiness state, read by the /ready endpoint
+STATE = {"ready": False, "started": False, "stages": {}, "error": None}
+_STATE_LOCK = threading.Lock()
+
+
+def _timed(name: str, function):
+    start = time.perf_counter()
+    result = function()
+    STATE["stages"][name] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def warmup() -> bool:
+    """
+    Load the default RAG model and run one embedding and one search against every loaded model.
+
+    :return: Whether warmup succeeded; only then is the process marked ready.
+    """
+    from ragchallenge.api.rag import get_embeddings, get_rag_model
+
+    start = time.perf_counter()
+    print("🔥 Warming up models and default index...")
+    try:
+        rag_model = _timed("rag_model_s", get_rag_model)
+        vector_store = rag_model.knowledge_vector_database
+
+        # Run the query path once so lazy initialization and index page faults happen now
+        vector = _timed("embedding_s", lambda: vector_store.embeddings.embed_query(WARMUP_QUERY))
+        _timed("search_s", lambda: vector_store.similarity_search_by_vector(vector, k=4))
+
+        # User stores are queried with the non-normalized model, load it as well
+        _timed("user_embeddings_s", lambda: get_embeddings().embed_query(WARMUP_QUERY))
+    except Exception as e:
+        # Not ready: /ready reports the error with 503 until a later attempt succeeds
+        STATE["error"] = f"{type(e).__name__}: {e}"
+        STATE["stages"]["total_s"] = round(time.perf_counter() - start, 3)
+        print(f"❌ Warmup failed, API is not ready: {e}")
+        return False
+
+    STATE["stages"]["total_s"] = round(time.perf_counter() - start, 3)
+    STATE["error"] = None
+    STATE["ready"] = True
+    print(f"✅ Warmup finished in {STATE['stages']['total_s']:.1f}s, API is ready")
+    return True
+
+
+def preload() -> bool:
+    """
+    Load what forked workers can share: the embedding model weights and, with the flat backend,
+    the memory-mapped default index.
+
+    Chroma clients, FAISS docstores and the other sqlite connections must not cross a fork, so
+    each worker opens them in its own ``warmup``. Remote embeddings keep a socket per thread and
+    have no weights to share, so they are left to the workers as well.
+
+    :return: Whether the models were loaded.
+    """
+    from ragchallenge.api.database import get_database, get_document_embeddings
+    from ragchallenge.api.rag import get_embeddings
+
+    start = time.perf_counter()
+    print("🔥 Preloading models to share with the workers...")
+    try:
+        if settings.embedding_backend != "remote":
+            _timed("embedding_s", lambda: get_document_embeddings().embed_query(WARMUP_QUERY))
+            _timed("user_embeddings_s", lambda: get_embeddings().embed_query(WARMUP_QUERY))
+        if settings.document_store_backend == "flat":
+            _timed("flat_index_s", get_database)
+    except Exception as e:
+        print(f"❌ Preloading failed: {e}")
+        return False
+    print(f"✅ Preloaded models in {time.perf_counter() - start:.1f}s")
+    return True
+
+
+def _warmup_until_ready() -> None:
+    while not warmup() and settings.warmup_retry_seconds > 0:
+        time.sleep(settings.warmup_retry_seconds)
+
+
+def start_warmup() -> None:
+    """Start warmup once per process, in the background, or mark ready right away if disabled."""
+    with _STATE_LOCK:
+        if STATE["started"]:
+            return
+        STATE["started"] = True
+
+    if not settings.warmup_on_startup:
+        STATE["ready"] = True
+        return
+    threading.Thread(target=_warmup_until_ready, name="warmup", daemon=True).start()
@@ -0,0 +1,195 @@
+"""
+API Load Test
+Drives /generate-answer, /documents/upload and /expand-query at a target request rate or
+concurrency and reports throughput, latency percentiles and error rates per endpoint.
+
+Start the API with the stub LLM so results do not depend on Gemini, e.g.
+    LLM_PROVIDER=stub LLM_CACHE_CHAINS="" python main.py
+then run one or more load levels against it:
+    python -m ragchallenge.benchmarks.loadtest --concurrency 1,2,4,8,16 --duration 30
+    python -m ragchallenge.benchmarks.loadtest --rps 5,10,20 --mix answer=8,expand=1,upload=1
+
+Sweeping several levels against one worker and against N workers shows where throughput
+stops growing and latency starts climbing, i.e. the saturation point. Running the same
+levels with LLM_HEDGE=true shows what hedged LLM requests do to the answer p99.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from ragchallenge.benchmarks.queries import QUERIES
+from ragchallenge.benchmarks.stats import environment_info, summarize_latencies, write_results
+
+UPLOAD_TEXT = (
+    "Load test document.\n\n"
+    "Conda environments isolate packages. Git tracks changes to files. "
+    "Regular expressions match patterns in text.\n"
+) * 20
+
+
+class LoadTest:
+    """Issues requests against a running API and records one sample per request."""
+
+    def __init__(self, base_url: str, mix: Dict[str, int], timeout: float, seed: int = 0):
+        self.base_url = base_url.rstrip("/")
+        self.mix = mix
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.user_ids = set()
+        self.samples = defaultdict(list)  # endpoint -> [(latency_ms, status)]
+
+    def pick_endpoint(self) -> str:
+        endpoints, weights = zip(*self.mix.items())
+        return self.random.choices(endpoints, weights=weights)[0]
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str) -> None:
+        """Send one request and record its latency and status (0 for transport errors)."""
+        question = self.random.choice(QUERIES)[0]
+        start = time.perf_counter()
+        try:
+            if endpoint == "answer":
+                response = await client.post("/generate-answer", json={"messages": [{"role": "user", "content": question}]})
+            elif endpoint == "expand":
+                response = await client.post("/expand-query", json={"messages": [{"role": "user", "content": question}]})
+            else:
+                user_id = f"loadtest-{uuid.uuid4().hex[:12]}"
+                self.user_ids.add(user_id)
+                files = {"file": (f"{user_id}.txt", UPLOAD_TEXT.encode("utf-8"), "text/plain")}
+                response = await client.post("/documents/upload", files=files, params={"user_id": user_id})
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        self.samples[endpoint].append(((time.perf_counter() - start) * 1000, status))
+
+    async def run_closed_loop(self, client: httpx.AsyncClient, concurrency: int, duration: float) -> None:
+        """Keep ``concurrency`` requests in flight until the duration has elapsed."""
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                await self.request(client, self.pick_endpoint())
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    async def run_open_loop(self, client: httpx.AsyncClient, rps: float, duration: float) -> None:
+        """Start requests on a Poisson schedule at ``rps``, regardless of how fast responses arrive."""
+        tasks = []
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival < start + duration:
+            await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+            tasks.append(asyncio.create_task(self.request(client, self.pick_endpoint())))
+            next_arrival += self.random.expovariate(rps)
+        await asyncio.gather(*tasks)
+
+    async def run(self, duration: float, concurrency: Optional[int] = None, rps: Optional[float] = None) -> dict:
+        """Run one load level and return its report."""
+        self.samples.clear()
+        limits = httpx.Limits(max_connections=max(concurrency or 0, int((rps or 0) * self.timeout), 10))
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits) as client:
+            start = time.perf_counter()
+            if rps:
+                await self.run_open_loop(client, rps, duration)
+            else:
+                await self.run_closed_loop(client, concurrency, duration)
+            elapsed = time.perf_counter() - start
+
+        return self.report(elapsed, concurrency=concurrency, rps=rps)
+
+    def report(self, elapsed: float, concurrency: Optional[int], rps: Optional[float]) -> dict:
+        """Summarize the recorded samples per endpoint and overall."""
+        def summarize(samples: List[tuple]) -> dict:
+            statuses = Counter(status for _, status in samples)
+            errors = sum(count for status, count in statuses.items() if status == 0 or status >= 400)
+            return {
+                "requests": len(samples),
+                "throughput_rps": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+                "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+                "status_codes": {str(status): count for status, count in sorted(statuses.items())},
+                "latency": summarize_latencies(latency for latency, _ in samples),
+            }
+
+        all_samples = [sample for samples in self.samples.values() for sample in samples]
+        return {
+            "target_concurrency": concurrency,
+            "target_rps": rps,
+            "duration_s": round(elapsed, 3),
+            "overall": summarize(all_samples),
+            "endpoints": {endpoint: summarize(samples) for endpoint, samples in self.samples.items()},
+        }
+
+    async def cleanup(self) -> None:
+        """Remove the vector stores created by upload requests."""
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout) as client:
+            for user_id in self.user_ids:
+                try:
+                    await client.post(f"/documents/clear/{user_id}")
+                except httpx.HTTPError:
+                    pass
+        self.user_ids.clear()
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("answer", "expand", "upload"):
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}', use answer, expand or upload")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def parse_levels(value: Optional[str], kind=float) -> List:
+    return [kind(level) for level in value.split(",")] if value else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the RAG API.")
+    parser.add_argument("--url", default="http://localhost:8082")
+    parser.add_argument("--concurrency", help="Comma-separated closed-loop concurrency levels, e.g. 1,4,16")
+    parser.add_argument("--rps", help="Comma-separated open-loop request rates, e.g. 5,10,20")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per load level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("answer=8,expand=1,upload=1"),
+                        help="Endpoint weights, e.g. answer=8,expand=1,upload=1")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--label", default="", help="Free-form label, e.g. 'workers=4'")
+    parser.add_argument("--output", default=f"data/benchmarks/loadtest_{datetime.now():%Y%m%d_%H%M%S}.json")
+    args = parser.parse_args()
+
+    levels = [("concurrency", level) for level in parse_levels(args.concurrency, int)]
+    levels += [("rps", level) for level in parse_levels(args.rps, float)]
+    if not levels:
+        levels = [("concurrency", 1)]
+
+    load_test = LoadTest(args.url, args.mix, args.timeout)
+    reports = []
+    for kind, level in levels:
+        print(f"🚦 Running {kind}={level} for {args.duration:.0f}s...")
+        report = asyncio.run(load_test.run(args.duration, **{kind: level}))
+        overall = report["overall"]
+        print(f"   {overall['throughput_rps']:.2f} req/s, p50 {overall['latency'].get('p50_ms', 0):.0f} ms, "
+              f"p99 {overall['latency'].get('p99_ms', 0):.0f} ms, errors {overall['error_rate']:.1%}")
+        reports.append(report)
+    asyncio.run(load_test.cleanup())
+
+    results = {
+        "config": {"url": args.url, "mix": args.mix, "duration_s": args.duration, "label": args.label},
+        "levels": reports,
+        "environment": environment_info(),
+    }
+    write_results(results, args.output)
+    print(json.dumps([{"level": r["target_concurrency"] or r["target_rps"], **r["overall"]} for r in reports], indent=2))
+    print(f"✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
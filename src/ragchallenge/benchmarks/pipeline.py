@@ -0,0 +1,145 @@
+"""
+Pipeline Benchmark
+Times every stage of the RAG pipeline over the bundled corpus in data/raw, fully offline.
+
+Stages: loading, header splitting, token chunking, embedding throughput, vector store insert,
+single- and multi-query retrieval latency and end-to-end ``answer_question`` with ``MockLLM``.
+Results are written as JSON together with environment information.
+
+Usage:
+    python -m ragchallenge.benchmarks.pipeline --output data/benchmarks/pipeline.json
+    python -m ragchallenge.benchmarks.pipeline --baseline data/benchmarks/pipeline.json
+"""
+
+import argparse
+import json
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from ragchallenge.api.config import settings
+from ragchallenge.api.embeddings import create_embeddings
+from ragchallenge.api.interfaces.database import DocumentStore
+from ragchallenge.api.interfaces.ragmodelexpanded import QuestionAnsweringWithQueryExpansion
+from ragchallenge.benchmarks.queries import QUERIES
+from ragchallenge.benchmarks.stats import (
+    compare_results, environment_info, stopwatch, summarize_latencies, write_results)
+
+
+def insert_chunks(vector_store, texts, embeddings, metadatas, batch_size: int = 1000) -> None:
+    """Insert precomputed embeddings so the insert stage does not include embedding time."""
+    ids = [str(uuid.uuid4()) for _ in texts]
+    for start in range(0, len(texts), batch_size):
+        end = start + batch_size
+        if hasattr(vector_store, "add_embeddings"):
+            vector_store.add_embeddings(texts[start:end], embeddings[start:end],
+                                        metadatas=metadatas[start:end], ids=ids[start:end])
+        else:
+            vector_store._collection.add(ids=ids[start:end], embeddings=embeddings[start:end],
+                                         documents=texts[start:end], metadatas=metadatas[start:end])
+
+
+def run_benchmark(data_dir: str, backend: str, chunk_size: int, chunk_overlap: int, repeats: int) -> dict:
+    """Run all stages once and return the measurements."""
+    from ragchallenge.api.llm import MockLLM
+    from ragchallenge.api.rag import prompt_template
+
+    results = {"stages": {}, "counts": {}, "throughput": {}, "latency": {}}
+    stages = results["stages"]
+
+    with tempfile.TemporaryDirectory() as persist_directory:
+        with stopwatch(stages, "model_load_s"):
+            store = DocumentStore(persist_directory=persist_directory, backend=backend,
+                                  embedding_model=create_embeddings(normalize=True))
+
+        with stopwatch(stages, "load_s"):
+            documents = store.load_markdown_documents(data_dir)
+        results["counts"]["documents"] = len(documents)
+        results["counts"]["characters"] = sum(len(doc.page_content) for doc in documents)
+
+        with stopwatch(stages, "header_split_s"):
+            sections = store.split_documents_by_header(documents)
+        results["counts"]["sections"] = len(sections)
+
+        with stopwatch(stages, "token_chunking_s"):
+            chunks = store.split_documents_by_token_count(sections, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        results["counts"]["chunks"] = len(chunks)
+
+        texts = [chunk.page_content for chunk in chunks]
+        metadatas = [chunk.metadata for chunk in chunks]
+        with stopwatch(stages, "embedding_s"):
+            embeddings = store.embedding_model.embed_documents(texts)
+        results["throughput"]["embedding_chunks_per_s"] = round(len(texts) / max(stages["embedding_s"], 1e-9), 2)
+
+        with stopwatch(stages, "insert_s"):
+            insert_chunks(store.vector_store, texts, embeddings, metadatas)
+        results["throughput"]["insert_chunks_per_s"] = round(len(texts) / max(stages["insert_s"], 1e-9), 2)
+
+        qa = QuestionAnsweringWithQueryExpansion(
+            model=MockLLM(), prompt_template=prompt_template, knowledge_vector_database=store.vector_store)
+
+        # Warm up the query path once so the first sample does not include lazy initialization
+        store.vector_store.similarity_search(QUERIES[0][0], k=1)
+
+        single, multi, end_to_end = [], [], []
+        for _ in range(repeats):
+            for paraphrases in QUERIES:
+                start = time.perf_counter()
+                store.vector_store.similarity_search(paraphrases[0], k=1)
+                single.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                qa.retrieve_documents(paraphrases)
+                multi.append((time.perf_counter() - start) * 1000)
+
+                start = time.perf_counter()
+                qa.answer_question(paraphrases[0])
+                end_to_end.append((time.perf_counter() - start) * 1000)
+
+        results["latency"]["single_query_retrieval"] = summarize_latencies(single)
+        results["latency"]["multi_query_retrieval"] = summarize_latencies(multi)
+        results["latency"]["answer_question_mock_llm"] = summarize_latencies(end_to_end)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the RAG pipeline offline.")
+    parser.add_argument("--data-dir", default="data/raw", help="Directory with markdown documents")
+    parser.add_argument("--backend", default=settings.document_store_backend, help="Vector backend to benchmark")
+    parser.add_argument("--chunk-size", type=int, default=192)
+    parser.add_argument("--chunk-overlap", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=5, help="Passes over the query set")
+    parser.add_argument("--output", default=f"data/benchmarks/pipeline_{datetime.now():%Y%m%d_%H%M%S}.json")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    print("⏱️  Running pipeline benchmark...")
+    results = run_benchmark(args.data_dir, args.backend, args.chunk_size, args.chunk_overlap, args.repeats)
+    results["config"] = {
+        "data_dir": args.data_dir,
+        "backend": args.backend,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "repeats": args.repeats,
+        "embedding_model": settings.embedding_model,
+        "embedding_backend": settings.embedding_backend,
+        "embedding_device": settings.embedding_model_device,
+    }
+    results["environment"] = environment_info()
+    write_results(results, args.output)
+
+    print(json.dumps({key: results[key] for key in ("stages", "counts", "throughput", "latency")}, indent=2))
+    print(f"✅ Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        print("\n📈 Change against baseline:")
+        for line in compare_results(results, baseline):
+            print(f"   {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Benchmark Queries
+Questions about the bundled tutorials in data/raw, shared by the benchmark and load-test scripts.
+"""
+
+# Questions about the bundled tutorials, each with paraphrases for the multi-query stage
+QUERIES = [
+    ["How do I create a new conda environment?", "Which command creates a conda environment?",
+     "How to set up an isolated environment with conda?", "Create conda env with a specific Python version"],
+    ["How to initialize a git repository?", "Which git command starts a new repository?",
+     "How do I create an empty git repo?", "Set up version control for a project with git"],
+    ["How do I undo the last git commit?", "Revert the most recent commit in git",
+     "How to reset a commit that was not pushed?", "Remove the last commit from history"],
+    ["What does the star quantifier mean in a regex?", "How does * work in regular expressions?",
+     "Match zero or more characters with regex", "Regex repetition operators explained"],
+    ["How do lookahead assertions work in regex?", "What is a positive lookahead?",
+     "Regex lookaround syntax", "Match text followed by a pattern without consuming it"],
+    ["How do I list installed conda packages?", "Show all packages in a conda environment",
+     "Which command lists conda packages?", "Export a conda environment to a file"],
+]
+
+# Questions the bundled tutorials do not answer, for calibrating the relevance gate
+OFF_TOPIC_QUERIES = [
+    "How long should I boil an egg?",
+    "Who won the football world cup in 2014?",
+    "What is the capital of Australia?",
+    "How do I change a flat tire on a bicycle?",
+    "What are the symptoms of the flu?",
+    "How many moons does Jupiter have?",
+    "What is a good recipe for banana bread?",
+    "When did the Roman Empire fall?",
+    "How do I train my dog to sit?",
+    "What is the best time of year to visit Japan?",
+    "How does compound interest work?",
+    "Which plants grow well in the shade?",
+    "How do I write a cover letter?",
+    "What causes the northern lights?",
+    "How do I remove a red wine stain from a carpet?",
+    "What is the plot of Hamlet?",
+]
@@ -0,0 +1,111 @@
+"""
+Relevance Gate Calibration
+Chooses RELEVANCE_GATE_MIN_SCORE from question-to-chunk similarities.
+
+The gate compares a question with its best chunk, and questions are shorter than chunks and
+score lower against them, so a threshold taken from chunk-to-chunk similarities lets most
+off-topic questions through. This script indexes the bundled corpus in data/raw the way the
+default knowledge base is built, scores the best chunk of every on-topic question (``QUERIES``
+with their paraphrases) and every off-topic one (``OFF_TOPIC_QUERIES``) by cosine similarity,
+and proposes the threshold that separates the two groups with the fewest mistakes. Results
+are written as JSON; set the proposed value as RELEVANCE_GATE_MIN_SCORE and turn the gate on
+with RELEVANCE_GATE=true.
+
+Usage:
+    python -m ragchallenge.benchmarks.relevance_gate --output data/benchmarks/relevance_gate.json
+"""
+
+import argparse
+import json
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+from ragchallenge.api.config import settings
+from ragchallenge.api.embeddings import create_embeddings
+from ragchallenge.api.interfaces.database import DocumentStore
+from ragchallenge.api.relevance import cosine_search
+from ragchallenge.benchmarks.queries import OFF_TOPIC_QUERIES, QUERIES
+from ragchallenge.benchmarks.stats import environment_info, percentile, write_results
+
+
+def best_scores(vector_store, embeddings, questions: Sequence[str]) -> List[float]:
+    """Cosine similarity of each question's best chunk (0.0 for an empty store)."""
+    scores = []
+    for vector in embeddings.embed_documents(list(questions)):
+        hits = cosine_search(vector_store, vector, 1)
+        scores.append(round(hits[0][1], 4) if hits else 0.0)
+    return scores
+
+
+def choose_threshold(on_topic: Sequence[float], off_topic: Sequence[float]) -> Dict[str, float]:
+    """
+    Threshold with the fewest misclassified questions: on-topic ones below it, off-topic ones at or above it.
+
+    Candidates lie halfway between neighbouring scores; of equally good ones the lowest is taken,
+    since rejecting an answerable question costs more than one extra LLM call.
+
+    :param on_topic: Best-chunk scores of questions the documents answer.
+    :param off_topic: Best-chunk scores of questions they do not.
+    :return: The threshold and the share of each group it misclassifies.
+    """
+    scores = sorted(set(on_topic) | set(off_topic))
+    candidates = [scores[0]] + [(low + high) / 2 for low, high in zip(scores, scores[1:])] + [scores[-1] + 1e-4]
+    best = None
+    for threshold in candidates:
+        rejected = sum(score < threshold for score in on_topic)
+        passed = sum(score >= threshold for score in off_topic)
+        if best is None or rejected + passed < best[0]:
+            best = (rejected + passed, threshold, rejected, passed)
+    _, threshold, rejected, passed = best
+    return {"threshold": round(threshold, 4),
+            "on_topic_rejected": round(rejected / len(on_topic), 3),
+            "off_topic_passed": round(passed / len(off_topic), 3)}
+
+
+def summarize(scores: Sequence[float]) -> Dict[str, float]:
+    return {"count": len(scores), "min": min(scores), "p5": round(percentile(scores, 5), 4),
+            "p50": round(percentile(scores, 50), 4), "p95": round(percentile(scores, 95), 4), "max": max(scores)}
+
+
+def run_calibration(data_dir: str, chunk_size: int, chunk_overlap: int) -> dict:
+    """Index the corpus in a temporary store and score both question sets against it."""
+    on_topic = [question for paraphrases in QUERIES for question in paraphrases]
+    with tempfile.TemporaryDirectory() as persist_directory:
+        store = DocumentStore(persist_directory=persist_directory, backend="flat",
+                              embedding_model=create_embeddings(normalize=True))
+        store.process_and_add_documents(store.load_markdown_documents(data_dir),
+                                        chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        on_scores = best_scores(store.vector_store, store.embedding_model, on_topic)
+        off_scores = best_scores(store.vector_store, store.embedding_model, OFF_TOPIC_QUERIES)
+
+    return {
+        "proposal": choose_threshold(on_scores, off_scores),
+        "on_topic": summarize(on_scores),
+        "off_topic": summarize(off_scores),
+        "scores": {"on_topic": dict(zip(on_topic, on_scores)), "off_topic": dict(zip(OFF_TOPIC_QUERIES, off_scores))},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the relevance gate on question-to-chunk similarities.")
+    parser.add_argument("--data-dir", default="data/raw", help="Directory with markdown documents")
+    parser.add_argument("--chunk-size", type=int, default=192)
+    parser.add_argument("--chunk-overlap", type=int, default=64)
+    parser.add_argument("--output", default=f"data/benchmarks/relevance_gate_{datetime.now():%Y%m%d_%H%M%S}.json")
+    args = parser.parse_args()
+
+    print("🎯 Calibrating the relevance gate...")
+    results = run_calibration(args.data_dir, args.chunk_size, args.chunk_overlap)
+    results["config"] = {"data_dir": args.data_dir, "chunk_size": args.chunk_size, "chunk_overlap": args.chunk_overlap,
+                         "embedding_model": settings.embedding_model, "embedding_backend": settings.embedding_backend}
+    results["environment"] = environment_info()
+    write_results(results, args.output)
+
+    print(json.dumps({key: results[key] for key in ("proposal", "on_topic", "off_topic")}, indent=2))
+    print(f"✅ Results written to {args.output}; set RELEVANCE_GATE_MIN_SCORE={results['proposal']['threshold']} "
+          f"and RELEVANCE_GATE=true to use it")
+
+
+if __name__ == "__main__":
+    main()
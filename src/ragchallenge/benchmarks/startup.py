@@ -0,0 +1,115 @@
+"""
+Startup Profile
+Measures how long it takes to import the API and where that time goes.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter and reports the
+slowest modules by cumulative and self time and the total self time per top-level package.
+
+Usage:
+    python -m ragchallenge.benchmarks.startup
+    python -m ragchallenge.benchmarks.startup --module ragchallenge.api.api --top 30 --warmup
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import List
+
+from ragchallenge.benchmarks.stats import environment_info, write_results
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Parse ``-X importtime`` output into {module, self_ms, cumulative_ms, depth} records."""
+    records = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append({
+                "module": module,
+                "self_ms": int(self_us) / 1000,
+                "cumulative_ms": int(cumulative_us) / 1000,
+                "depth": (len(indent) - 1) // 2,
+            })
+    return records
+
+
+def profile_imports(module: str, warmup: bool = False) -> dict:
+    """
+    Import a module in a fresh interpreter and collect per-module import times.
+
+    :param module: The module to import, e.g. "ragchallenge.api.api".
+    :param warmup: Also run the startup warmup and report its stages.
+    """
+    code = f"import {module}"
+    if warmup:
+        code += "\nimport json\nfrom ragchallenge.api import warmup\nwarmup.warmup()\n" \
+                "print('WARMUP ' + json.dumps(warmup.STATE['stages']))"
+
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, ["src", os.environ.get("PYTHONPATH")])))
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                             capture_output=True, text=True, env=environment)
+    wall_s = time.perf_counter() - start
+
+    records = parse_importtime(process.stderr)
+    packages = defaultdict(float)
+    for record in records:
+        packages[record["module"].split(".")[0]] += record["self_ms"]
+
+    warmup_stages = {}
+    for line in process.stdout.splitlines():
+        if line.startswith("WARMUP "):
+            warmup_stages = json.loads(line[len("WARMUP "):])
+
+    return {
+        "module": module,
+        "returncode": process.returncode,
+        "error": next((line for line in reversed(process.stderr.splitlines())
+                       if line.strip() and not line.startswith("import time:")), None) if process.returncode else None,
+        "wall_s": round(wall_s, 3),
+        "import_ms": round(max((r["cumulative_ms"] for r in records if r["module"] == module), default=0.0), 1),
+        "modules": records,
+        "packages": dict(sorted(packages.items(), key=lambda item: -item[1])),
+        "warmup": warmup_stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API import time per module.")
+    parser.add_argument("--module", default="ragchallenge.api.api")
+    parser.add_argument("--top", type=int, default=20, help="Number of slowest modules to print")
+    parser.add_argument("--warmup", action="store_true", help="Also time the model warmup")
+    parser.add_argument("--output", default=f"data/benchmarks/startup_{datetime.now():%Y%m%d_%H%M%S}.json")
+    args = parser.parse_args()
+
+    print(f"⏱️  Profiling import of {args.module}...")
+    report = profile_imports(args.module, warmup=args.warmup)
+    if report["error"]:
+        print(f"❌ Import failed: {report['error']}")
+
+    print(f"\nProcess wall time: {report['wall_s']:.2f}s, import of {args.module}: {report['import_ms']:.0f} ms")
+    print(f"\nSlowest modules by cumulative time:")
+    for record in sorted(report["modules"], key=lambda r: -r["cumulative_ms"])[:args.top]:
+        print(f"   {record['cumulative_ms']:9.1f} ms  {record['module']}")
+    print(f"\nSelf time per package:")
+    for package, self_ms in list(report["packages"].items())[:args.top]:
+        print(f"   {self_ms:9.1f} ms  {package}")
+    if report["warmup"]:
+        print(f"\nWarmup stages (s): {json.dumps(report['warmup'])}")
+
+    report["environment"] = environment_info()
+    write_results(report, args.output)
+    print(f"\n✅ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark Helpers
+Timing, percentile and environment helpers shared by the benchmark and load-test scripts.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Dict, Iterable, List, Sequence
+
+TRACKED_PACKAGES = ["torch", "transformers", "sentence-transformers", "onnxruntime", "faiss-cpu",
+                    "numpy", "chromadb", "langchain", "langchain-core", "fastapi", "uvicorn"]
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Return the q-th percentile (0-100) with linear interpolation between closest ranks."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize_latencies(samples_ms: Iterable[float]) -> Dict[str, float]:
+    """Summarize latency samples (in milliseconds) as count, mean and p50/p95/p99/max."""
+    samples = list(samples_ms)
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "mean_ms": round(sum(samples) / len(samples), 3),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+@contextmanager
+def stopwatch(results: dict, key: str):
+    """Store the elapsed wall time of the block in ``results[key]`` (seconds)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[key] = round(time.perf_counter() - start, 6)
+
+
+def environment_info() -> dict:
+    """Describe the machine and package versions so results from different runs can be compared."""
+    packages = {}
+    for package in TRACKED_PACKAGES:
+        try:
+            packages[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            packages[package] = None
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit or None,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "packages": packages,
+    }
+
+
+def write_results(results: dict, path: str) -> None:
+    """Write benchmark results as pretty-printed JSON, creating parent directories."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+
+
+def compare_results(current: dict, baseline: dict, prefix: str = "") -> List[str]:
+    """List relative changes of every numeric metric present in both result trees."""
+    lines = []
+    for key, value in current.items():
+        if key in ("environment", "config") or key not in baseline:
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            lines.extend(compare_results(value, baseline[key], prefix=f"{name}."))
+        elif isinstance(value, (int, float)) and isinstance(baseline[key], (int, float)) and baseline[key]:
+            change = (value - baseline[key]) / baseline[key] * 100
+            lines.append(f"{name}: {baseline[key]} -> {value} ({change:+.1f}%)")
+    return lines
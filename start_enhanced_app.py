@@ -7,8 +7,13 @@ import subprocess
 import sys
 import time
 import os
+import urllib.error
+import urllib.request
 from pathlib import Path
 
+API_URL = "http://localhost:8082"
+READY_TIMEOUT_SECONDS = 600
+
 def start_api_server():
     """Start the FastAPI server."""
     print("🚀 Starting FastAPI server...")
@@ -25,6 +30,21 @@ def start_api_server():
     
     return api_process
 
+def wait_until_ready(api_process, timeout: float = READY_TIMEOUT_SECONDS) -> bool:
+    """Poll the readiness endpoint until models are loaded, the server exits or the timeout passes."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if api_process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(f"{API_URL}/ready", timeout=2) as response:
+                if response.status == 200:
+                    return True
+        except (urllib.error.URLError, OSError):
+            pass  # Not listening yet, or 503 while warming up
+        time.sleep(0.5)
+    return False
+
 def start_enhanced_gui():
     """Start the enhanced Gradio GUI."""
     print("🖥️ Starting Enhanced GUI...")
@@ -50,9 +70,15 @@ def main():
     # Start API server
     api_process = start_api_server()
     
-    # Wait for API to start
-    print("⏳ Waiting for API server to start...")
-    time.sleep(5)
+    # Wait for API to load its models
+    print("⏳ Waiting for API server to become ready...")
+    start = time.monotonic()
+    if not wait_until_ready(api_process):
+        print("❌ API server did not become ready, check its output above")
+        api_process.terminate()
+        api_process.wait()
+        return
+    print(f"✅ API server ready after {time.monotonic() - start:.1f}s")
     
     # Start GUI
     gui_process = start_enhanced_gui()
@@ -61,8 +87,8 @@ def main():
     print("✅ Application started successfully!")
     print()
     print("📍 Access Points:")
-    print("   🔗 API Server: http://localhost:8081")
-    print("   🔗 API Docs: http://localhost:8081/docs")
+    print(f"   🔗 API Server: {API_URL}")
+    print(f"   🔗 API Docs: {API_URL}/docs")
     print("   🖥️ Enhanced GUI: http://localhost:7862")
     print()
     print("🆕 New Features:")
@@ -0,0 +1,44 @@
+import hashlib
+import uuid
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+DIMENSION = 64
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings: each word adds a fixed random vector."""
+
+    def _embed(self, text: str) -> list:
+        vector = np.zeros(DIMENSION)
+        for word in text.lower().split():
+            seed = int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16)
+            vector += np.random.default_rng(seed).normal(size=DIMENSION)
+        return (vector / (np.linalg.norm(vector) or 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.fixture
+def embeddings():
+    return HashEmbeddings()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, so the relative ``data/`` store paths point into it."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def user_id(workdir):
+    # chromadb caches clients by path for the whole process, so every test gets its own tenant
+    return f"test-{uuid.uuid4().hex[:12]}"
+
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from ragchallenge.api.chunking import chunk_id, chunk_position, expand_neighbours, link_chunks
+from ragchallenge.api.interfaces.flatindex import FlatVectorStore
+
+SECTION = "upload"
+TEXTS = [f"part {index}" for index in range(6)]
+
+
+class UnusedEmbeddings:
+    """Embeddings that are never called; the tests add precomputed vectors."""
+
+    def embed_documents(self, texts):
+        raise AssertionError("not used")
+
+    def embed_query(self, text):
+        raise AssertionError("not used")
+
+
+class NoLookupStore:
+    """A store that cannot fetch chunks by ID."""
+
+    def get_by_ids(self, ids):
+        raise NotImplementedError
+
+
+@pytest.fixture
+def store(tmp_path):
+    documents = [Document(page_content=text, metadata={"source": "a.md"}) for text in TEXTS]
+    ids = link_chunks(documents, section=SECTION)
+    store = FlatVectorStore(UnusedEmbeddings(), persist_directory=str(tmp_path))
+    store.add_embeddings(texts=TEXTS, metadatas=[document.metadata for document in documents], ids=ids,
+                         embeddings=np.random.default_rng(0).normal(size=(len(TEXTS), 8)).astype(np.float32))
+    return store
+
+
+def hit(store, index):
+    return store.get_by_ids([chunk_id(SECTION, index)])[0]
+
+
+def test_link_chunks_numbers_chunks_per_section():
+    documents = [Document(page_content="a"), Document(page_content="b", metadata={"section_id": "other"}),
+                 Document(page_content="c")]
+    assert link_chunks(documents, section="s") == ["s-0", "other-0", "s-1"]
+    assert [chunk_position(document) for document in documents] == [("s", 0), ("other", 0), ("s", 1)]
+
+    with pytest.raises(ValueError):
+        link_chunks([Document(page_content="d")])
+
+
+def test_hits_are_widened_by_their_neighbours(store):
+    expanded = expand_neighbours(store, [hit(store, 2), hit(store, 5)], window=1)
+    assert [document.page_content for document in expanded] == ["part 1\npart 2\npart 3", "part 4\npart 5"]
+    assert expanded[0].metadata["chunk_index"] == 2
+
+
+def test_overlapping_windows_do_not_repeat_text(store):
+    expanded = expand_neighbours(store, [hit(store, 2), hit(store, 3), hit(store, 0)], window=1)
+    # The hit on part 3 is inside the first window and dropped; part 1 is not repeated
+    assert [document.page_content for document in expanded] == ["part 1\npart 2\npart 3", "part 0"]
+
+
+def test_unlinked_chunks_and_stores_without_lookup_are_left_alone(store):
+    plain = Document(page_content="plain", metadata={"source": "old.md"})
+    assert expand_neighbours(store, [plain], window=2) == [plain]
+    assert expand_neighbours(store, [hit(store, 2)], window=0)[0].page_content == "part 2"
+    assert expand_neighbours(NoLookupStore(), [hit(store, 2)], window=1)[0].page_content == "part 2"
@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from ragchallenge.api import snapshots
+from ragchallenge.api.interfaces.faissindex import FaissVectorStore
+from ragchallenge.api.interfaces.flatindex import FlatVectorStore
+
+DIMENSION = 32
+ROWS = 400
+
+
+class UnusedEmbeddings:
+    """Embeddings that are never called; the tests add precomputed vectors."""
+
+    def embed_documents(self, texts):
+        raise AssertionError("not used")
+
+    def embed_query(self, text):
+        raise AssertionError("not used")
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(ROWS, DIMENSION)).astype(np.float32)
+    store = FaissVectorStore(UnusedEmbeddings(), persist_directory=str(tmp_path), rebuild_ratio=0.0)
+    store.add_embeddings(texts=[f"chunk {row}" for row in range(ROWS)], embeddings=vectors,
+                         ids=[f"id-{row}" for row in range(ROWS)])
+    store.vectors = vectors
+    return store
+
+
+def test_rebuild_drops_dead_labels_and_keeps_chunks(store, tmp_path):
+    store.delete(ids=[f"id-{row}" for row in range(0, ROWS, 2)])
+    assert store.dead_labels == ROWS // 2
+
+    assert store.rebuild() == ROWS // 2
+    assert store.dead_labels == 0 and store.index.ntotal == ROWS // 2
+
+    reloaded = FaissVectorStore(UnusedEmbeddings(), persist_directory=str(tmp_path), rebuild_ratio=0.0)
+    for row in (1, 201, 399):
+        document, score = reloaded.similarity_search_with_score_by_vector(store.vectors[row].tolist(), k=1)[0]
+        assert document.page_content == f"chunk {row}" and score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_searches_during_rebuilds_return_the_text_of_their_vector(store):
+    live = list(range(ROWS))
+    mismatches = []
+    stop = threading.Event()
+
+    def search():
+        rng = np.random.default_rng(threading.get_ident() % 2 ** 32)
+        while not stop.is_set():
+            row = int(rng.choice(live[-100:]))
+            hits = store.similarity_search_with_score_by_vector(store.vectors[row].tolist(), k=1)
+            if hits and hits[0][1] > 0.999 and hits[0][0].page_content != f"chunk {row}":
+                mismatches.append((row, hits[0][0].page_content))
+
+    threads = [threading.Thread(target=search) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    try:
+        # Delete from the front and rebuild, which renumbers every remaining label
+        for _ in range(20):
+            removed, live[:] = live[:10], live[10:]
+            store.delete(ids=[f"id-{row}" for row in removed])
+            store.rebuild()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    assert not mismatches
+
+
+def test_snapshot_of_the_default_store_keeps_vectors_and_texts(store, tmp_path):
+    store.delete(ids=[f"id-{row}" for row in range(0, ROWS, 3)])
+    path = tmp_path / "default.snapshot.tar"
+    manifest = snapshots.export_default(str(path), backend="faiss", directory=str(tmp_path))
+    assert manifest["count"] == len(store) and manifest["dimension"] == DIMENSION
+
+    target = tmp_path / "flat"
+    assert snapshots.import_default(str(path), backend="flat", directory=str(target))["imported_chunks"] == len(store)
+    flat = FlatVectorStore.load(str(target), UnusedEmbeddings())
+    assert sorted(flat._ids) == sorted(f"id-{row}" for row in range(ROWS) if row % 3)
+    for row in (1, 200, 398):
+        document, score = flat.similarity_search_with_score_by_vector(store.vectors[row].tolist(), k=1)[0]
+        assert document.id == f"id-{row}" and document.page_content == f"chunk {row}"
+        assert score == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from ragchallenge.api.filters import build_filter, chroma_where, metadata_matches, validate_filter
+from ragchallenge.api.interfaces.flatindex import FlatVectorStore
+
+DIMENSION = 16
+METADATAS = [
+    {"source": "guide.pdf", "document_type": "uploaded_document", "page": 1, "page_end": 2},
+    {"source": "guide.pdf", "document_type": "uploaded_document", "page": 3, "page_end": 3},
+    {"source": "notes.md", "document_type": "uploaded_document"},
+    {"source": "conda.md", "document_type": "conda"},
+]
+
+
+class UnusedEmbeddings:
+    """Embeddings that are never called; the tests add precomputed vectors."""
+
+    def embed_documents(self, texts):
+        raise AssertionError("not used")
+
+    def embed_query(self, text):
+        raise AssertionError("not used")
+
+
+def test_build_filter_combines_the_api_options():
+    assert build_filter() is None
+    assert build_filter(sources=["guide.pdf"], page_from=2, page_to=3) == {
+        "source": {"$in": ["guide.pdf"]}, "page_end": {"$gte": 2}, "page": {"$lte": 3}}
+
+
+@pytest.mark.parametrize("where", [
+    {},
+    {"$or": [{"source": "a"}]},
+    {"source": {"$in": []}},
+    {"page": {"$gte": "1"}},
+    {"page": {"$near": 1}},
+    {"source": ["a", "b"]},
+])
+def test_invalid_filters_are_rejected(where):
+    with pytest.raises(ValueError):
+        validate_filter(where)
+
+
+def test_metadata_matching():
+    where = build_filter(sources=["guide.pdf"], page_from=2, page_to=3)
+    assert [metadata_matches(metadata, where) for metadata in METADATAS] == [True, True, False, False]
+    # Chunks without pages never match a page range
+    assert not metadata_matches(METADATAS[2], {"page": {"$lte": 10}})
+    assert metadata_matches(METADATAS[2], {"page": None}) and not metadata_matches(METADATAS[0], {"page": None})
+    assert not metadata_matches({"page": True}, {"page": {"$gte": 0}})
+
+
+def test_chroma_where_has_one_operator_per_clause():
+    assert chroma_where({"source": "a.md"}) == {"source": "a.md"}
+    assert chroma_where({"source": {"$in": ["a.md"]}, "page": {"$gte": 1, "$lte": 3}}) == {"$and": [
+        {"source": {"$in": ["a.md"]}}, {"page": {"$gte": 1}}, {"page": {"$lte": 3}}]}
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8"])
+def test_flat_store_searches_only_matching_rows(tmp_path, quantization):
+    vectors = np.random.default_rng(0).normal(size=(len(METADATAS), DIMENSION)).astype(np.float32)
+    store = FlatVectorStore(UnusedEmbeddings(), persist_directory=str(tmp_path), quantization=quantization)
+    store.add_embeddings(texts=[f"chunk {row}" for row in range(len(METADATAS))], embeddings=vectors,
+                         metadatas=METADATAS, ids=[f"id-{row}" for row in range(len(METADATAS))])
+
+    # The query is closest to the conda chunk, which the filter excludes
+    results = store.similarity_search_by_vector(vectors[3].tolist(), k=4,
+                                                filter=build_filter(document_types=["uploaded_document"], page_to=2))
+    assert [document.id for document in results] == ["id-0"]
+    results = store.similarity_search_by_vector(vectors[3].tolist(), k=4, filter={"source": {"$in": ["notes.md"]}})
+    assert [document.id for document in results] == ["id-2"]
+    assert store.similarity_search_by_vector(vectors[3].tolist(), k=4, filter={"source": "missing.md"}) == []
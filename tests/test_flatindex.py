@@ -0,0 +1,70 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from ragchallenge.api.interfaces.flatindex import FlatVectorStore
+
+DIMENSION = 16
+
+
+class UnusedEmbeddings:
+    """Embeddings that are never called; the tests add precomputed vectors."""
+
+    def embed_documents(self, texts):
+        raise AssertionError("not used")
+
+    def embed_query(self, text):
+        raise AssertionError("not used")
+
+
+def make_store(directory, rows: int, quantization: str = "none", seed: int = 0) -> FlatVectorStore:
+    rng = np.random.default_rng(seed)
+    store = FlatVectorStore(UnusedEmbeddings(), persist_directory=str(directory), quantization=quantization)
+    store.add_embeddings(texts=[f"chunk {row}" for row in range(rows)],
+                         embeddings=rng.normal(size=(rows, DIMENSION)).astype(np.float32),
+                         metadatas=[{"row": row} for row in range(rows)],
+                         ids=[f"id-{row}" for row in range(rows)])
+    return store
+
+
+def test_save_replaces_the_whole_generation(tmp_path):
+    store = make_store(tmp_path, 20, quantization="int8")
+    first = json.loads((tmp_path / FlatVectorStore.INDEX_FILE).read_text())
+
+    store.delete(ids=["id-3", "id-7"])
+    second = json.loads((tmp_path / FlatVectorStore.INDEX_FILE).read_text())
+
+    assert second["generation"] != first["generation"] and second["rows"] == 18
+    # Only the files of the current generation are left
+    data_files = {name for name in os.listdir(tmp_path) if name.endswith((".npy", ".jsonl"))}
+    assert data_files == set(second["files"].values())
+
+    loaded = FlatVectorStore.load(str(tmp_path), UnusedEmbeddings(), quantization="int8")
+    assert len(loaded) == 18
+    assert [doc.page_content for doc in loaded.get_by_ids(["id-4", "id-8"])] == ["chunk 4", "chunk 8"]
+
+
+def test_load_rejects_files_of_different_lengths(tmp_path):
+    make_store(tmp_path, 10)
+    index = json.loads((tmp_path / FlatVectorStore.INDEX_FILE).read_text())
+    documents = tmp_path / index["files"]["documents"]
+    documents.write_text("".join(documents.read_text().splitlines(keepends=True)[:-1]))
+
+    with pytest.raises(ValueError, match="inconsistent"):
+        FlatVectorStore.load(str(tmp_path), UnusedEmbeddings())
+
+
+def test_load_reads_indexes_saved_before_generations(tmp_path):
+    store = make_store(tmp_path, 5)
+    index = json.loads((tmp_path / FlatVectorStore.INDEX_FILE).read_text())
+    legacy = {"documents": FlatVectorStore.DOCUMENTS_FILE, "ids": FlatVectorStore.IDS_FILE,
+              "vectors": FlatVectorStore.VECTORS_FILE}
+    for key, name in legacy.items():
+        os.replace(tmp_path / index["files"][key], tmp_path / name)
+    os.remove(tmp_path / FlatVectorStore.INDEX_FILE)
+
+    assert FlatVectorStore.exists(str(tmp_path))
+    loaded = FlatVectorStore.load(str(tmp_path), UnusedEmbeddings())
+    assert list(loaded._ids) == list(store._ids)
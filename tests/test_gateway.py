@@ -0,0 +1,82 @@
+import time
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from ragchallenge.api.config import settings
+from ragchallenge.api.gateway import (
+    CircuitBreaker, CircuitOpenError, RateLimitExceeded, TokenBucket, gateway, get_guard)
+from ragchallenge.api.llm import StubChatModel
+
+RESET_SECONDS = 0.05
+MESSAGES = [HumanMessage(content="What is conda?")]
+
+
+def test_breaker_opens_after_failures_and_closes_after_a_trial():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=RESET_SECONDS)
+    assert breaker.state == "closed" and breaker.allow()
+
+    assert not breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(RESET_SECONDS * 1.5)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow(), "only one trial call may run while half-open"
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=RESET_SECONDS)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(RESET_SECONDS * 1.5)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_released_trial_lets_the_next_call_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=RESET_SECONDS)
+    breaker.record_failure()
+    time.sleep(RESET_SECONDS * 1.5)
+    assert breaker.allow() and not breaker.allow()
+
+    breaker.release_trial()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_rate_limited_trial_does_not_keep_the_circuit_open(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_retries", 0)
+    monkeypatch.setattr(settings, "llm_rate_limit_max_wait_seconds", 0.0)
+    monkeypatch.setattr(settings, "llm_hedge", False)
+    model = StubChatModel(latency_median_ms=1.0, latency_sigma=0.0, tokens_per_second=0.0, output_tokens=2,
+                          error_rate=1.0, seed=0)
+    llm = gateway(model, "test-rate-limited-trial")
+    guard = get_guard("test-rate-limited-trial")
+    guard.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=RESET_SECONDS)
+
+    with pytest.raises(Exception, match="429"):
+        llm.invoke(MESSAGES)
+    assert guard.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        llm.invoke(MESSAGES)
+
+    # The trial call gets no rate limit token and never reaches the model
+    time.sleep(RESET_SECONDS * 1.5)
+    guard.bucket = TokenBucket(rate_per_second=0.001, capacity=1)
+    guard.bucket.reserve(0.0)
+    with pytest.raises(RateLimitExceeded):
+        llm.invoke(MESSAGES)
+
+    # Once tokens are available again the next call is the trial and closes the circuit
+    guard.bucket = TokenBucket(rate_per_second=100.0, capacity=10)
+    model.error_rate = 0.0
+    assert llm.invoke(MESSAGES).content
+    assert guard.breaker.state == "closed"
@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Any, Iterator
+
+import pytest
+from langchain_core.messages import HumanMessage
+from pydantic import PrivateAttr
+
+from ragchallenge.api.config import settings
+from ragchallenge.api.gateway import gateway, hedge_pool
+from ragchallenge.api.llm import StubChatModel
+
+CALLS = 150
+MAX_RATIO = 0.1
+
+
+class CountingStubChatModel(StubChatModel):
+    """Stub model that records how each of its streams ended."""
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _started: int = PrivateAttr(default=0)
+    _exhausted: int = PrivateAttr(default=0)
+    _closed: int = PrivateAttr(default=0)
+
+    def _stream(self, *args: Any, **kwargs: Any) -> Iterator:
+        with self._lock:
+            self._started += 1
+        try:
+            yield from super()._stream(*args, **kwargs)
+        except GeneratorExit:
+            with self._lock:
+                self._closed += 1
+            raise
+        with self._lock:
+            self._exhausted += 1
+
+
+@pytest.fixture
+def hedged_settings(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge", True)
+    # Hedge half of the calls if the budget allowed it, so the budget is what limits them
+    monkeypatch.setattr(settings, "llm_hedge_quantile", 0.5)
+    monkeypatch.setattr(settings, "llm_hedge_min_delay_seconds", 0.001)
+    monkeypatch.setattr(settings, "llm_hedge_min_samples", 20)
+    monkeypatch.setattr(settings, "llm_hedge_max_ratio", MAX_RATIO)
+    monkeypatch.setattr(settings, "llm_requests_per_minute", 0)
+    monkeypatch.setattr(settings, "llm_max_concurrency", 8)
+
+
+def test_hedges_stay_within_budget_and_losers_are_closed(hedged_settings):
+    model = CountingStubChatModel(latency_median_ms=5.0, latency_sigma=1.0, tokens_per_second=500.0,
+                                  output_tokens=10, seed=7)
+    llm = gateway(model, "test-hedging")
+
+    for index in range(CALLS):
+        assert llm.invoke([HumanMessage(content=f"question {index}")]).content
+
+    # Losing attempts stop on the hedge pool after their caller returned
+    deadline = time.monotonic() + 10
+    while hedge_pool()._work_queue.qsize() or model._exhausted + model._closed < model._started:
+        assert time.monotonic() < deadline, "a hedged stream was never closed"
+        time.sleep(0.01)
+
+    hedges = model._started - CALLS
+    assert 0 < hedges <= MAX_RATIO * CALLS
+    # Each hedged call has one loser: it is closed mid-stream, unless it reached its last token
+    # before the winner returned; no stream is left open
+    assert 0 < model._closed <= hedges
+    assert model._closed + model._exhausted == model._started
@@ -0,0 +1,36 @@
+from ragchallenge.api import llmcache
+from ragchallenge.api.llmcache import ACCESS_GRANULARITY_SECONDS, ResponseCache
+
+
+def accessed_at(cache, key):
+    return cache._connection.execute("SELECT accessed_at FROM responses WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_write_access_times_only_once_per_granularity(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llmcache.time, "time", lambda: now[0])
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0, max_entries=0)
+    cache.put("key", "answer", "response")
+
+    changes = cache._connection.total_changes
+    now[0] += ACCESS_GRANULARITY_SECONDS / 2
+    assert cache.get("key") == "response"
+    assert cache._connection.total_changes == changes and accessed_at(cache, "key") == 1000.0
+
+    now[0] += ACCESS_GRANULARITY_SECONDS
+    assert cache.get("key") == "response"
+    assert accessed_at(cache, "key") == now[0]
+
+
+def test_least_recently_used_entries_are_pruned(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llmcache.time, "time", lambda: now[0])
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=0, max_entries=2)
+    for key in ("old", "used", "new"):
+        cache.put(key, "answer", key)
+        now[0] += ACCESS_GRANULARITY_SECONDS
+    assert cache.get("old") == "old"
+
+    cache._prune(now[0])
+    assert cache.get("used") is None
+    assert cache.get("old") == "old" and cache.get("new") == "new"
@@ -0,0 +1,57 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("transformers")
+pytest.importorskip("langchain_huggingface")
+
+from langchain_huggingface import HuggingFaceEmbeddings
+from transformers import BertConfig, BertModel, BertTokenizerFast
+
+from ragchallenge.api.interfaces.onnxembeddings import TOLERANCE, OnnxEmbeddings, compare_embeddings
+
+TEXTS = [
+    "conda is a package manager",
+    "run git init in the project directory",
+    "regular expressions describe search patterns in text",
+    "select name from employees where salary is high",
+    "git",
+]
+
+
+@pytest.fixture(scope="module")
+def tiny_bert(tmp_path_factory):
+    """A small randomly initialized BERT with a word-level vocabulary, saved like a Hub model."""
+    model_dir = tmp_path_factory.mktemp("tiny-bert")
+    words = sorted({word for text in TEXTS for word in text.split()} | {"export", "sample"})
+    vocab_file = model_dir / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words) + "\n")
+
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=5 + len(words), hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, max_position_embeddings=64, type_vocab_size=2)
+    BertModel(config).eval().save_pretrained(model_dir)
+    BertTokenizerFast(vocab_file=str(vocab_file)).save_pretrained(model_dir)
+    return str(model_dir)
+
+
+@pytest.fixture(scope="module")
+def reference(tiny_bert):
+    return HuggingFaceEmbeddings(model_name=tiny_bert, model_kwargs={"device": "cpu"})
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_onnx_matches_torch_within_tolerance(tiny_bert, reference, tmp_path, quantize):
+    candidate = OnnxEmbeddings(model_name=tiny_bert, cache_dir=str(tmp_path), quantize=quantize, batch_size=2)
+
+    report = compare_embeddings(reference, candidate, TEXTS)
+
+    assert report["min_cosine"] >= TOLERANCE[quantize], report
+
+
+def test_export_feeds_inputs_by_forward_signature(tiny_bert, tmp_path):
+    model_path = OnnxEmbeddings.export(tiny_bert, str(tmp_path))
+
+    inputs = [model_input.name for model_input in onnx.load(model_path).graph.input]
+    assert inputs == ["input_ids", "attention_mask", "token_type_ids"]
@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from ragchallenge.api.interfaces.flatindex import FlatVectorStore
+from ragchallenge.api.interfaces.quantization import int8_scores, quantize_int8, recall_at_k, top_k
+
+ROWS = 2000
+DIMENSION = 128
+CLUSTERS = 40
+
+
+class UnusedEmbeddings:
+    """Embeddings that are never called; the tests add precomputed vectors."""
+
+    def embed_documents(self, texts):
+        raise AssertionError("not used")
+
+    def embed_query(self, text):
+        raise AssertionError("not used")
+
+
+def random_vectors(clustered: bool, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    if not clustered:
+        return rng.normal(size=(ROWS, DIMENSION)).astype(np.float32)
+    # Sentence embeddings form topical clusters; sign codes need that structure to rank well
+    centres = rng.normal(size=(CLUSTERS, DIMENSION))
+    return (centres[rng.integers(0, CLUSTERS, ROWS)] + rng.normal(scale=0.6, size=(ROWS, DIMENSION))).astype(np.float32)
+
+
+def make_store(directory, vectors: np.ndarray, quantization: str, rescore_factor: int = 8) -> FlatVectorStore:
+    store = FlatVectorStore(UnusedEmbeddings(), persist_directory=str(directory), quantization=quantization,
+                            rescore_factor=rescore_factor)
+    store.add_embeddings(texts=[f"chunk {row}" for row in range(len(vectors))], embeddings=vectors,
+                         metadatas=[{"row": row} for row in range(len(vectors))],
+                         ids=[f"id-{row}" for row in range(len(vectors))])
+    return store
+
+
+def test_int8_scores_track_exact_dot_products():
+    vectors = random_vectors(clustered=False)
+    query = vectors[0] / np.linalg.norm(vectors[0])
+    codes, scale = quantize_int8(vectors)
+
+    exact = vectors @ query
+    approximate = int8_scores(codes, scale, query)
+    assert np.abs(approximate - exact).max() < 0.02 * np.abs(exact).max()
+    assert recall_at_k(top_k(exact, 10), top_k(approximate, 10)) >= 0.9
+
+
+@pytest.mark.parametrize("quantization, clustered, threshold", [
+    ("int8", False, 0.98),
+    ("int8", True, 0.98),
+    ("binary", True, 0.95),
+])
+def test_quantized_search_recall_against_exact_search(tmp_path, quantization, clustered, threshold):
+    store = make_store(tmp_path, random_vectors(clustered), quantization)
+    report = store.check_recall(k=10, num_queries=100)
+    assert report["num_queries"] == 100
+    assert report["recall_at_k"] >= threshold
+    assert report["compression"] == (4.0 if quantization == "int8" else 32.0)
+
+
+def test_rescoring_returns_exact_scores(tmp_path):
+    vectors = random_vectors(clustered=True)
+    store = make_store(tmp_path, vectors, "binary")
+    query = FlatVectorStore.normalize(vectors[5:6])[0]
+
+    rows, scores = store._search_rows(query, 10)
+    exact_rows, exact_scores = store._search_rows(query, 10, exact=True)
+    assert rows[0] == exact_rows[0] == 5
+    np.testing.assert_allclose(scores, np.asarray(store._vectors)[rows] @ query, rtol=1e-5)
+
+
+@pytest.mark.parametrize("quantization", ["none", "int8", "binary"])
+def test_saved_store_loads_with_the_same_results(tmp_path, quantization):
+    vectors = random_vectors(clustered=True)
+    store = make_store(tmp_path, vectors, quantization)
+    store.save(str(tmp_path))
+
+    loaded = FlatVectorStore.load(str(tmp_path), UnusedEmbeddings(), quantization=quantization)
+    assert len(loaded) == ROWS and list(loaded._ids) == list(store._ids)
+    for row in (0, 999, 1999):
+        expected = store.similarity_search_with_score_by_vector(vectors[row].tolist(), k=5)
+        results = loaded.similarity_search_with_score_by_vector(vectors[row].tolist(), k=5)
+        assert [document.id for document, _ in results] == [document.id for document, _ in expected]
+        assert results[0][0].page_content == f"chunk {row}" and results[0][0].metadata == {"row": row}
+        assert [score for _, score in results] == pytest.approx([score for _, score in expected])
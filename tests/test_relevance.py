@@ -0,0 +1,27 @@
+import pytest
+from langchain_core.documents import Document
+
+from ragchallenge.api.relevance import select_adaptive
+from ragchallenge.benchmarks.relevance_gate import choose_threshold
+
+
+def scored(*scores):
+    return [(Document(page_content=f"chunk {index}"), score) for index, score in enumerate(scores)]
+
+
+def test_adaptive_selection_stops_at_a_cliff_or_the_minimum_score():
+    assert [score for _, score in select_adaptive(scored(0.91, 0.9, 0.89, 0.81), score_cliff=0.05)] == [
+        0.91, 0.9, 0.89]
+    assert [score for _, score in select_adaptive(scored(0.91, 0.9, 0.89), min_score=0.895)] == [0.91, 0.9]
+    assert select_adaptive(scored(0.7, 0.69), min_score=0.8) == []
+
+
+def test_threshold_lies_in_the_gap_between_separable_groups():
+    proposal = choose_threshold([0.86, 0.88, 0.9], [0.74, 0.78, 0.8])
+    assert proposal == {"threshold": pytest.approx(0.83), "on_topic_rejected": 0.0, "off_topic_passed": 0.0}
+
+
+def test_overlapping_groups_get_the_cut_with_fewest_mistakes():
+    proposal = choose_threshold([0.8, 0.85, 0.86, 0.87], [0.7, 0.75, 0.81, 0.82])
+    assert proposal["threshold"] == pytest.approx(0.835)
+    assert proposal["on_topic_rejected"] == 0.25 and proposal["off_topic_passed"] == 0.0
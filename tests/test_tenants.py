@@ -0,0 +1,134 @@
+import hashlib
+import tarfile
+
+import pytest
+from langchain_core.documents import Document
+
+from ragchallenge.api import catalog, compaction, deletion, snapshots, tiering
+from ragchallenge.api.config import settings
+from ragchallenge.api.stores import add_user_documents, open_tenant_chroma, open_user_vectorstore, tenant_exists
+
+ALPHA = ["conda creates isolated environments", "conda installs packages from channels"]
+BETA = ["git commits record snapshots", "git branches are movable pointers", "git merges combine histories"]
+
+
+def upload(user_id: str, name: str, texts: list, embedding_function) -> str:
+    """Store chunks the way the upload endpoint does and catalogue them; returns the upload ID."""
+    upload_id = catalog.new_upload_id()
+    documents = [Document(page_content=text, metadata={"source": name, "document_type": "uploaded_document"})
+                 for text in texts]
+    add_user_documents(user_id, documents, embedding_function, ids=catalog.chunk_ids(upload_id, len(texts)))
+    catalog.record_upload(user_id, upload_id, name, hashlib.sha256(name.encode("utf-8")).hexdigest(),
+                          len(texts), sum(len(text) for text in texts))
+    return upload_id
+
+
+def stored_ids(user_id):
+    return sorted(open_tenant_chroma(user_id, None)._collection.get(include=[])["ids"])
+
+
+def search_sources(user_id, embeddings, query, k=10):
+    store = open_user_vectorstore(user_id, embeddings)
+    return {document.metadata["source"] for document in store.similarity_search(query, k=k)}
+
+
+@pytest.fixture
+def tenant(user_id, embeddings):
+    upload(user_id, "alpha.md", ALPHA, embeddings)
+    upload(user_id, "beta.md", BETA, embeddings)
+    return user_id
+
+
+def test_catalog_lists_uploads_by_name(tenant):
+    documents = catalog.list_documents(tenant)
+    assert [(document["name"], document["chunks"]) for document in documents] == [("alpha.md", 2), ("beta.md", 3)]
+    assert catalog.catalog_stats(tenant)["total_chunks"] == 5
+    assert catalog.list_documents(tenant, limit=1, offset=1)[0]["name"] == "beta.md"
+
+
+def test_deleted_documents_are_hidden_at_once_and_purged_later(tenant, embeddings):
+    result = deletion.delete_documents(tenant, names=["beta.md", "missing.md"])
+    assert result["deleted_documents"] == ["beta.md"] and result["not_found"] == ["missing.md"]
+    assert result["tombstoned_chunks"] == 3
+
+    # Hidden from listings and searches, still on disk until the purge
+    assert [document["name"] for document in catalog.list_documents(tenant)] == ["alpha.md"]
+    assert search_sources(tenant, embeddings, "git branches") == {"alpha.md"}
+    assert len(stored_ids(tenant)) == 5
+
+    assert deletion.purge(tenant)["purged_chunks"] == 3
+    assert len(stored_ids(tenant)) == 2 and not catalog.list_tombstones(tenant)
+    assert catalog.deleted_chunks(tenant) == 3
+
+
+def test_filter_deletes_remove_matching_chunks(tenant, embeddings):
+    deletion.delete_documents(tenant, where={"source": {"$in": ["alpha.md"]}})
+    assert search_sources(tenant, embeddings, "conda environments") == {"beta.md"}
+
+    deletion.purge(tenant)
+    assert len(stored_ids(tenant)) == 3
+    assert catalog.catalog_stats(tenant)["total_chunks"] == 3
+
+
+def test_compaction_rebuilds_fragmented_stores(tenant, embeddings, monkeypatch):
+    monkeypatch.setattr(settings, "compaction_min_deleted", 1)
+    deletion.delete_documents(tenant, names=["beta.md"])
+    deletion.purge(tenant)
+    before = stored_ids(tenant)
+
+    report = compaction.fragmentation(tenant)
+    assert report["deleted_chunks"] == 3 and "deleted_ratio" in report["reasons"]
+
+    result = compaction.compact_tenant(tenant)
+    assert result["compacted"] and result["result"]["copied_chunks"] == 2
+    assert stored_ids(tenant) == before
+    assert compaction.fragmentation(tenant)["deleted_chunks"] == 0
+    assert search_sources(tenant, embeddings, "conda packages") == {"alpha.md"}
+
+
+def test_snapshot_round_trip_keeps_chunks_embeddings_and_catalog(tenant, embeddings, workdir):
+    path = workdir / "tenant.snapshot.tar"
+    manifest = snapshots.export_tenant(tenant, str(path))
+    assert manifest["count"] == 5 and manifest["dimension"] == len(embeddings.embed_query("x"))
+
+    copy = f"{tenant}-copy"
+    assert snapshots.import_tenant(copy, str(path))["imported_chunks"] == 5
+    source = open_tenant_chroma(tenant, None)._collection.get(include=["embeddings", "documents", "metadatas"])
+    target = open_tenant_chroma(copy, None)._collection.get(ids=source["ids"],
+                                                            include=["embeddings", "documents", "metadatas"])
+    assert target["ids"] == source["ids"] and target["documents"] == source["documents"]
+    assert target["metadatas"] == source["metadatas"]
+    assert (target["embeddings"] == source["embeddings"]).all()
+    assert catalog.export_documents(copy) == catalog.export_documents(tenant)
+
+    # Chunk IDs are kept, so a second import changes nothing
+    snapshots.import_tenant(copy, str(path))
+    assert stored_ids(copy) == stored_ids(tenant)
+
+
+def test_snapshot_import_rejects_corrupted_files(tenant, workdir):
+    path = workdir / "tenant.snapshot.tar"
+    snapshots.export_tenant(tenant, str(path))
+    with tarfile.open(path) as archive:
+        offset = archive.getmember(snapshots.EMBEDDINGS_FILE).offset_data
+    data = bytearray(path.read_bytes())
+    data[offset + 200] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        snapshots.import_tenant(f"{tenant}-copy", str(path))
+
+
+def test_frozen_tenants_are_restored_on_access(tenant, embeddings):
+    ids = stored_ids(tenant)
+    assert not tiering.freeze(tenant)["frozen"], "recently used stores stay hot"
+
+    result = tiering.freeze(tenant, force=True)
+    assert result["frozen"] and result["chunks"] == 5
+    assert tiering.is_cold(tenant) and not tenant_exists(tenant)
+
+    assert tiering.ensure_hot(tenant)
+    assert not tiering.is_cold(tenant)
+    assert stored_ids(tenant) == ids
+    assert [document["name"] for document in catalog.list_documents(tenant)] == ["alpha.md", "beta.md"]
+    assert search_sources(tenant, embeddings, "git merges", k=1) == {"beta.md"}